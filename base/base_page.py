@@ -13,14 +13,50 @@
 
 from config.settings import Settings
 from utils.logger import Logger
+from utils.screenshot_helper import screenshot_writer
+from utils.request_tracker import RequestTracker, url_matches
+from common.action_timing import action_timer, timed_action
 import allure
+import json
 import re
-from playwright.sync_api import Page, Locator, FrameLocator, expect
-from typing import Optional, List, Union, Literal, Dict
+import time
+from contextlib import contextmanager
+from playwright.sync_api import Page, Locator, FrameLocator, Response, expect
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from typing import Any, Callable, Optional, List, Union, Literal, Dict
 
 # 多元素索引类型：None 不处理；"first"/"last" 或 int 取第 n 个
 MultiIndex = Optional[Union[Literal["first", "last"], int]]
 
+# 接口业务码中表示成功的取值（后端统一返回 {"code": "200", "data": ..., "message": ...}）
+API_SUCCESS_CODES = ("200", "0")
+
+# Element-UI 加载遮罩（v-loading 指令与 this.$loading 服务），关闭后保留在 DOM 中但不可见
+LOADING_MASK_SELECTOR = ".el-loading-mask:visible"
+
+# 在 root 元素（整页时为 <html>）上挂 MutationObserver，只观察节点增删与文本变化，
+# 子树连续 quietMs 无变化时返回 true，超过 maxMs 返回 false
+# 不观察属性：hover/focus、过渡动画会持续改写 class/style，页面就绪后也不会静默
+_DOM_QUIET_SCRIPT = """
+(root, [quietMs, maxMs]) => new Promise((resolve) => {
+    let timer = null;
+    let deadline = null;
+    const finish = (quiet) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(deadline);
+        resolve(quiet);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(root, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(() => finish(true), quietMs);
+    deadline = setTimeout(() => finish(false), maxMs);
+})
+"""
+
 
 class BasePage:
     """
@@ -58,13 +94,26 @@ class BasePage:
         # 创建日志记录器，使用类名作为日志名称
         self.logger = Logger(self.__class__.__name__)
 
+        # 最近一次 perform_and_wait_api() 等到的响应（用于断言 HTTP 状态码等）
+        self.last_api_response: Optional[Response] = None
+
         # 设置默认超时时间
         self.page.set_default_timeout(Settings.DEFAULT_TIMEOUT)
         self.page.set_default_navigation_timeout(Settings.NAVIGATION_TIMEOUT)
 
+    @property
+    def request_tracker(self) -> RequestTracker:
+        """
+        页面请求跟踪器（同一个 Page 的所有页面对象共用），用于 wait_for_requests_settled()
+
+        首次访问时才在 Page 上挂请求监听，不使用请求等待的页面没有额外开销。
+        """
+        return RequestTracker.for_page(self.page)
+
     # ==================== 导航方法 ====================
 
     @allure.step("导航到: {url}")
+    @timed_action("navigate")
     def navigate_to(self, url: str) -> None:
         """
         导航到指定 URL
@@ -85,12 +134,14 @@ class BasePage:
             raise
 
     @allure.step("刷新页面")
+    @timed_action("refresh")
     def refresh(self) -> None:
         """刷新当前页面"""
         self.logger.info("刷新页面")
         self.page.reload(wait_until="domcontentloaded")
 
     @allure.step("返回上一页")
+    @timed_action("go_back")
     def go_back(self) -> None:
         """返回上一页"""
         self.logger.info("返回上一页")
@@ -117,6 +168,7 @@ class BasePage:
     # ==================== 元素交互方法 ====================
 
     @allure.step("点击元素")
+    @timed_action("click")
     def click_element(
         self,
         locator: Union[Locator, str],
@@ -151,6 +203,7 @@ class BasePage:
 
         try:
             self.logger.info(f"点击元素: {self._locator_to_log_str(locator)}")
+            self._wait_actionable(element, timeout, force)
 
             # 执行点击操作
             element.click(timeout=timeout, force=force)
@@ -163,6 +216,7 @@ class BasePage:
         return self
 
     @allure.step("双击元素")
+    @timed_action("double_click")
     def double_click_element(
         self,
         locator: Union[Locator, str],
@@ -182,6 +236,7 @@ class BasePage:
         element = self._resolve_locator(locator, multi)
         try:
             self.logger.info(f"双击元素: {self._locator_to_log_str(locator)}")
+            self._wait_actionable(element, timeout, force)
             element.dblclick(timeout=timeout, force=force)
         except Exception as e:
             self.logger.error(f"双击元素失败: {self._locator_to_log_str(locator)}, 错误: {str(e)}")
@@ -191,6 +246,7 @@ class BasePage:
         return self
 
     @allure.step("在输入框中填入: {text}")
+    @timed_action("fill")
     def fill_element(
         self,
         locator: Union[Locator, str],
@@ -216,6 +272,7 @@ class BasePage:
         text_str = str(text) if text is not None else ""
 
         try:
+            self._wait_actionable(element, timeout)
             if clear_first:
                 # 使用 fill() 方法会自动清空再输入
                 self.logger.info(f"填入文本: {text_str}")
@@ -238,6 +295,7 @@ class BasePage:
         return self
 
     @allure.step("清空输入框")
+    @timed_action("clear")
     def clear_input(
         self,
         locator: Union[Locator, str],
@@ -258,6 +316,7 @@ class BasePage:
         return self
 
     @allure.step("通过 FileChooser 上传文件")
+    @timed_action("upload")
     def upload_file_via_chooser(
         self,
         upload_trigger: Union[Locator, str],
@@ -286,6 +345,7 @@ class BasePage:
         return self
 
     @allure.step("选择下拉选项: {value}")
+    @timed_action("select_option")
     def select_option(
         self,
         locator: Union[Locator, str],
@@ -309,6 +369,7 @@ class BasePage:
         element = self._resolve_locator(locator, multi)
 
         try:
+            self._wait_actionable(element, timeout)
             if value is not None:
                 self.logger.info(f"按value选择: {value}")
                 element.select_option(value=value, timeout=timeout)
@@ -328,6 +389,7 @@ class BasePage:
         return self
 
     @allure.step("勾选复选框")
+    @timed_action("check")
     def check_checkbox(
         self,
         locator: Union[Locator, str],
@@ -351,6 +413,7 @@ class BasePage:
         """
         element = self._resolve_locator(locator, multi)
         self.logger.info(f"{'勾选' if check else '取消勾选'}复选框")
+        self._wait_actionable(element, timeout, force)
 
         if check:
             element.check(timeout=timeout, force=force)
@@ -360,6 +423,7 @@ class BasePage:
         return self
 
     @allure.step("悬停在元素上")
+    @timed_action("hover")
     def hover_element(self, locator: Union[Locator, str], multi: MultiIndex = None) -> "BasePage":
         """
         鼠标悬停在元素上（支持链式调用）
@@ -370,10 +434,12 @@ class BasePage:
         """
         element = self._resolve_locator(locator, multi)
         self.logger.info(f"悬停在元素: {self._locator_to_log_str(locator)}")
+        self._wait_actionable(element)
         element.hover()
         return self
 
     @allure.step("拖拽元素到目标")
+    @timed_action("drag")
     def drag_element_to(
         self,
         source: Union[Locator, str],
@@ -649,6 +715,7 @@ class BasePage:
     # ==================== 等待方法 ====================
 
     @allure.step("等待元素可见")
+    @timed_action("wait_visible", waiting=True)
     def wait_for_element_visible(
         self,
         locator: Union[Locator, str],
@@ -672,6 +739,7 @@ class BasePage:
         return element
 
     @allure.step("等待元素隐藏")
+    @timed_action("wait_hidden", waiting=True)
     def wait_for_element_hidden(
         self,
         locator: Union[Locator, str],
@@ -691,6 +759,7 @@ class BasePage:
         element.wait_for(state="hidden", timeout=timeout)
 
     @allure.step("等待页面加载完成")
+    @timed_action("wait_load_state", waiting=True)
     def wait_for_load_state(self, state: str = "load") -> None:
         """
         等待页面达到指定的加载状态
@@ -705,6 +774,7 @@ class BasePage:
         self.page.wait_for_load_state(state)
 
     @allure.step("等待URL包含: {url_part}")
+    @timed_action("wait_url", waiting=True)
     def wait_for_url(self, url_part: str, timeout: Optional[int] = None) -> None:
         """
         等待URL包含指定的字符串
@@ -716,6 +786,181 @@ class BasePage:
         self.logger.info(f"等待URL包含: {url_part}")
         self.page.wait_for_url(f"**{url_part}**", timeout=timeout)
 
+    @allure.step("等待跳转或元素出现")
+    @timed_action("wait_url_or_visible", waiting=True)
+    def wait_for_url_or_visible(
+        self,
+        url_predicate: Callable[[str], bool],
+        locator: Union[Locator, str],
+        timeout: Optional[int] = None,
+        poll_ms: int = 50
+    ) -> bool:
+        """
+        等待 URL 满足条件或元素可见，先满足者为准
+
+        用于操作结果有多种页面表现的场景，如登录：成功跳转离开登录页，失败则停留并弹出错误提示。
+        超时只记录警告，由调用方的断言方法判断结果。
+
+        Args:
+            url_predicate: 接收当前 URL，返回是否满足
+            locator: 另一种结果对应的元素
+            timeout: 超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT
+            poll_ms: 检查间隔（毫秒）
+
+        Returns:
+            URL 满足条件返回 True，元素先出现或超时返回 False
+
+        使用方法：
+            self.click_element(self.login_button)
+            self.wait_for_url_or_visible(lambda url: "/login" not in url, self.error_message)
+        """
+        element = self._get_locator(locator)
+        timeout = timeout or Settings.DEFAULT_TIMEOUT
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            if url_predicate(self.page.url):
+                return True
+            if element.is_visible():
+                return False
+            if time.monotonic() >= deadline:
+                self.logger.warning(f"{timeout}ms 内 URL 未满足条件且元素未出现，当前 URL: {self.page.url}")
+                return False
+            self.page.wait_for_timeout(poll_ms)
+
+    @allure.step("等待页面就绪")
+    @timed_action("wait_ready", waiting=True)
+    def wait_until_ready(
+        self,
+        scope: Optional[Union[Page, FrameLocator]] = None,
+        loading_mask: bool = True,
+        dom_quiet_ms: Optional[int] = None,
+        timeout: Optional[int] = None,
+        container: Optional[Locator] = None,
+        quiet_timeout: Optional[int] = None
+    ) -> "BasePage":
+        """
+        等待页面（或 iframe）就绪，替代点击后的固定等待
+
+        依次等待以下信号：
+        1. Element-UI 加载遮罩（.el-loading-mask）全部消失，最长 timeout
+        2. container（默认整个 scope 文档）内连续 dom_quiet_ms 毫秒没有节点/文本变化，最长 quiet_timeout
+
+        DOM 在 quiet_timeout 内始终有变化（如轮播、计时器）或 container 未出现时只记录警告并继续，
+        不视为失败；静默阶段有单独的短上限，不会因页面持续变化而等满 timeout。
+        需要同时等待某个接口返回时使用 expect_ready()。
+
+        Args:
+            scope: 等待的范围，Page 或 FrameLocator（iframe 内的页面），默认 self.page
+            loading_mask: 是否等待加载遮罩消失
+            dom_quiet_ms: DOM 静默时长（毫秒），默认 Settings.READY_QUIET_MS，0 表示不等待
+            timeout: 加载遮罩的超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT
+            container: 只观察该元素的子树（操作实际改变的区域，如表格），默认观察整个 scope 文档
+            quiet_timeout: 等待 DOM 静默的最长时间（毫秒），默认 Settings.READY_QUIET_TIMEOUT_MS
+
+        Returns:
+            返回 self 以支持链式调用
+
+        使用方法：
+            self.click_element(self.get_menu_locator("目标支撑"))
+            self.wait_until_ready(scope=self.iframe)
+
+            # 只等待表格重新渲染
+            self.wait_until_ready(scope=self.iframe, container=self.iframe.locator(".el-table").first)
+        """
+        scope = scope or self.page
+        timeout = timeout or Settings.DEFAULT_TIMEOUT
+        dom_quiet_ms = Settings.READY_QUIET_MS if dom_quiet_ms is None else dom_quiet_ms
+        quiet_timeout = quiet_timeout or Settings.READY_QUIET_TIMEOUT_MS
+
+        if loading_mask:
+            expect(scope.locator(LOADING_MASK_SELECTOR)).to_have_count(0, timeout=timeout)
+
+        if dom_quiet_ms > 0:
+            root = container if container is not None else scope.locator(":root")
+            try:
+                quiet = root.evaluate(_DOM_QUIET_SCRIPT, [dom_quiet_ms, quiet_timeout], timeout=quiet_timeout)
+            except PlaywrightTimeoutError:
+                self.logger.warning(f"{quiet_timeout}ms 内未找到观察的容器 {root}，跳过 DOM 静默等待")
+                return self
+            if not quiet:
+                self.logger.warning(f"DOM 在 {quiet_timeout}ms 内持续变化，未等到 {dom_quiet_ms}ms 静默，继续执行")
+        return self
+
+    @contextmanager
+    def expect_ready(
+        self,
+        response: Optional[Union[str, re.Pattern]] = None,
+        scope: Optional[Union[Page, FrameLocator]] = None,
+        loading_mask: bool = True,
+        dom_quiet_ms: Optional[int] = None,
+        timeout: Optional[int] = None,
+        container: Optional[Locator] = None
+    ):
+        """
+        执行操作并等待其引起的页面变化完成
+
+        在进入 with 块之前开始监听接口响应（避免操作太快导致错过响应），
+        退出 with 块时等待匹配 response 的接口返回，再调用 wait_until_ready()。
+
+        Args:
+            response: 需要等待返回的接口 URL（glob 字符串或正则），None 表示不等待接口
+            scope: 同 wait_until_ready()
+            loading_mask: 同 wait_until_ready()
+            dom_quiet_ms: 同 wait_until_ready()
+            timeout: 超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT
+            container: 同 wait_until_ready()
+
+        使用方法：
+            with self.expect_ready(response="**/api/target/support/list**", scope=self.iframe):
+                self.click_element(self.get_menu_locator("目标支撑"))
+        """
+        timeout = timeout or Settings.DEFAULT_TIMEOUT
+        if response is None:
+            yield
+        else:
+            with self.page.expect_response(response, timeout=timeout):
+                yield
+        self.wait_until_ready(
+            scope=scope, loading_mask=loading_mask, dom_quiet_ms=dom_quiet_ms, timeout=timeout, container=container
+        )
+
+    @allure.step("等待请求完成")
+    @timed_action("wait_requests", waiting=True)
+    def wait_for_requests_settled(
+        self,
+        patterns: Optional[List[Union[str, re.Pattern]]] = None,
+        quiet_ms: Optional[int] = None,
+        timeout: Optional[int] = None
+    ) -> "BasePage":
+        """
+        等待相关请求完成（替代 wait_for_load_state("networkidle")）
+
+        只等待匹配 patterns 的 document/xhr/fetch 请求结束，并且 quiet_ms 内没有新的匹配请求；
+        轮询、长连接等挂起超过 Settings.REQUEST_LONG_POLL_MS 的请求和
+        Settings.REQUEST_TRACKER_EXCLUDE 中的请求不参与判断。
+        请求跟踪在该页面首次访问 request_tracker 时开始：页面上第一次等待前，
+        在触发请求的操作之前先访问一次 self.request_tracker，操作发出的请求才会被计入。
+
+        Args:
+            patterns: 接口 URL 匹配规则列表（URL 片段、glob 或正则），None 表示所有跟踪的请求
+            quiet_ms: 静默时长（毫秒），默认 Settings.REQUEST_QUIET_MS
+            timeout: 超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT
+
+        Returns:
+            返回 self 以支持链式调用
+
+        使用方法：
+            self.request_tracker  # 首次使用前开始跟踪
+            self.click_element(self.login_button)
+            self.wait_for_requests_settled()
+            self.wait_for_requests_settled(patterns=["/api/course/"], quiet_ms=200)
+        """
+        pending = self.request_tracker.pending(patterns)
+        self.logger.info(f"等待请求完成: {patterns or '全部'}，当前进行中 {len(pending)} 个")
+        self.request_tracker.wait_for_settled(patterns=patterns, quiet_ms=quiet_ms, timeout=timeout)
+        return self
+
+    @timed_action("wait_timeout", waiting=True)
     def wait_for_timeout(self, milliseconds: int) -> None:
         """
         强制等待指定时间（不推荐使用，仅在特殊情况下使用）
@@ -729,6 +974,144 @@ class BasePage:
         self.logger.warning(f"强制等待 {milliseconds}ms（建议使用智能等待替代）")
         self.page.wait_for_timeout(milliseconds)
 
+    # ==================== 接口响应等待 ====================
+
+    @allure.step("执行操作并等待接口响应")
+    def perform_and_wait_api(
+        self,
+        action: Callable[[], Any],
+        url_pattern: Union[str, re.Pattern],
+        method: Optional[str] = None,
+        timeout: Optional[int] = None,
+        required: bool = True
+    ) -> Any:
+        """
+        执行操作并等待它触发的接口返回，返回解析后的 JSON
+
+        在执行 action 之前开始监听（page.expect_response），不会错过操作触发的请求；
+        iframe 内发出的请求同样能匹配到。接口返回后即可断言业务结果，无需等待 toast 渲染。
+        必须指定接口 URL：页面上的心跳、埋点等请求随时可能发出，不能把「操作后的第一个请求」当作操作结果。
+        与 WaitHelper.wait_for_api_response 不同：后者只被动等待下一个匹配的响应并返回 Response 对象。
+
+        Args:
+            action: 触发请求的操作，如 lambda: self.click_element(self.save_button)
+            url_pattern: 接口 URL 匹配规则：
+                         - 不含 * 的字符串：URL 包含该片段（与 wait_for_url 一致）
+                         - 含 * 的字符串：glob 匹配完整 URL
+                         - 正则：re.search 匹配
+            method: 请求方法（GET/POST/...），None 表示不限
+            timeout: 超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT；
+                     前端校验失败时不会发请求，required=False 时宜传较短的超时（如 Settings.EXPECT_TIMEOUT）
+            required: 为 False 时，操作成功但超时内没有匹配的响应只记录警告并返回 None；
+                      操作本身失败时总是抛出异常
+
+        Returns:
+            响应体解析后的 JSON；响应不是 JSON（或 required=False 且未等到响应）时返回 None
+
+        使用方法：
+            result = self.perform_and_wait_api(
+                lambda: self.click_element(self.create_button),
+                url_pattern="/api/user/create",
+                method="POST",
+            )
+            assert self.is_api_success(result), result
+        """
+        if not url_pattern:
+            raise ValueError("perform_and_wait_api 需要指定接口 url_pattern")
+        timeout = timeout or Settings.DEFAULT_TIMEOUT
+        method = method.upper() if method else None
+
+        def matches(response: Response) -> bool:
+            if method and response.request.method != method:
+                return False
+            return url_matches(response.url, url_pattern)
+
+        action_done = False
+        try:
+            with self.page.expect_response(matches, timeout=timeout) as response_info:
+                action()
+                action_done = True
+        except PlaywrightTimeoutError:
+            if required or not action_done:
+                raise
+            self.logger.warning(f"{timeout}ms 内未等到匹配的接口响应: {method or '*'} {url_pattern}")
+            return None
+        response = response_info.value
+        self.logger.info(f"接口响应: {response.request.method} {response.url} -> {response.status}")
+        self.last_api_response = response
+
+        try:
+            body = response.json()
+        except Exception:
+            self.logger.warning(f"接口响应不是 JSON: {response.url}")
+            return None
+        allure.attach(
+            json.dumps(body, ensure_ascii=False, indent=2),
+            name=f"{response.request.method} {response.url} ({response.status})",
+            attachment_type=allure.attachment_type.JSON,
+        )
+        return body
+
+    def click_and_wait_response(
+        self,
+        locator: Union[Locator, str],
+        url_pattern: Union[str, re.Pattern],
+        method: Optional[str] = "POST",
+        timeout: Optional[int] = None,
+        multi: MultiIndex = None,
+        required: bool = True
+    ) -> Any:
+        """
+        点击元素（如「确定」「创建」「保存」）并等待其提交的接口返回
+
+        Args:
+            locator: 元素定位器
+            url_pattern: 接口 URL 匹配规则，见 perform_and_wait_api()
+            method: 请求方法，默认 POST，None 表示不限
+            timeout: 等待接口的超时时间（毫秒）
+            multi: 多元素时取哪个，None/"first"/"last"/int
+            required: 见 perform_and_wait_api()
+
+        Returns:
+            响应体解析后的 JSON，见 perform_and_wait_api()
+
+        使用方法：
+            result = self.click_and_wait_response(self.create_user_button, "/api/user/create")
+            assert self.is_api_success(result), f"创建用户失败: {result}"
+        """
+        return self.perform_and_wait_api(
+            lambda: self.click_element(locator, multi=multi),
+            url_pattern=url_pattern,
+            method=method,
+            timeout=timeout,
+            required=required,
+        )
+
+    def is_api_success(self, body: Any, response: Optional[Response] = None) -> bool:
+        """
+        根据接口响应判断业务是否成功
+
+        - HTTP 状态码不是 2xx：失败
+        - 响应体含 code 字段：code 在 API_SUCCESS_CODES 中（字符串与数字均可）
+        - 响应体含 success 字段：success 为真
+        - 其它（None、非 JSON、无法识别的格式）：失败，并记录警告
+
+        Args:
+            body: perform_and_wait_api() 的返回值
+            response: 对应的响应，默认 self.last_api_response
+        """
+        response = response or self.last_api_response
+        if response is not None and not response.ok:
+            return False
+        if isinstance(body, dict):
+            if "code" in body:
+                return str(body["code"]) in API_SUCCESS_CODES
+            if "success" in body:
+                return bool(body["success"])
+        if body is not None:
+            self.logger.warning(f"无法从响应体判断业务结果（缺少 code/success 字段）: {body}")
+        return False
+
     # ==================== 截图方法 ====================
 
     @allure.step("截取屏幕截图")
@@ -736,7 +1119,9 @@ class BasePage:
         """
         截取当前页面截图
 
-        截图会保存到 screenshots 目录，并附加到 Allure 报告。
+        截图会保存到 screenshots 目录，并附加到当前 Allure 步骤。
+        截图字节当场挂载为附件，只有转码写文件由后台 ScreenshotWriter 完成；
+        格式、整页/可视区域、去重等由 Settings.SCREENSHOT_* 控制。
 
         Args:
             name: 截图文件名（不含扩展名）
@@ -746,23 +1131,16 @@ class BasePage:
         """
         import datetime
 
-        # 确保截图目录存在
-        Settings.SCREENSHOTS_DIR.mkdir(parents=True, exist_ok=True)
-
         # 生成带时间戳的文件名
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{name}_{timestamp}.png"
+        filename = f"{name}_{timestamp}.{screenshot_writer.extension}"
         filepath = Settings.SCREENSHOTS_DIR / filename
 
         # 截图（失败时不抛出，避免掩盖调用方的原始错误）
         try:
-            self.page.screenshot(path=str(filepath), full_page=True, timeout=5000)
-            self.logger.info(f"截图已保存: {filepath}")
-            allure.attach.file(
-                str(filepath),
-                name=name,
-                attachment_type=allure.attachment_type.PNG
-            )
+            data = self.page.screenshot(timeout=5000, **screenshot_writer.screenshot_options())
+            filepath = screenshot_writer.submit(data, filepath, name)
+            self.logger.info(f"截图已提交: {filepath}")
         except Exception as screenshot_err:
             self.logger.warning(f"截图失败（不影响原始错误）: {screenshot_err}")
 
@@ -818,6 +1196,19 @@ class BasePage:
 
     # ==================== 私有辅助方法 ====================
 
+    def _wait_actionable(self, element: Locator, timeout: Optional[float] = None, force: bool = False) -> None:
+        """
+        开启 ACTION_TIMING_SPLIT_WAIT 时先单独等待元素可见，把「等待可操作」与操作本身的耗时分开统计
+
+        默认不执行：操作耗时整体记为 wall_ms，wait_ms 记为未测量（None），不额外发起 wait_for。
+        开启后多一次往返，最长等待变为两倍超时，隐藏元素（如自定义控件里的 input）的 check/fill
+        也会先等待可见，只建议在排查慢操作时临时开启；force=True 的操作始终不等待。
+        """
+        if force or not (Settings.ACTION_TIMING and Settings.ACTION_TIMING_SPLIT_WAIT):
+            return
+        with action_timer.waiting():
+            element.wait_for(state="visible", timeout=timeout)
+
     def _get_locator(self, locator: Union[Locator, str]) -> Locator:
         """
         统一处理定位器
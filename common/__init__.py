@@ -3,13 +3,23 @@
 # ========================================
 # 存放通用工具类和函数
 # - ProcessFile: 测试进度管理
+# - DependencyState: 用例依赖状态（配合 run(depends_on=[...]) 调度）
+# - ActionTimer: 页面操作耗时统计（action_timer 为进程内共享实例）
+# - DurationHistory: 跨运行的用例/步骤耗时历史与回归检测
 # - tools: 通用工具函数（时间、路径等）
 # ========================================
 
 from common.process_file import ProcessFile
+from common.dependency import DependencyState
+from common.action_timing import ActionTimer, action_timer
+from common.duration_history import DurationHistory
 from common import tools
 
 __all__ = [
     "ProcessFile",
+    "DependencyState",
+    "ActionTimer",
+    "action_timer",
+    "DurationHistory",
     "tools",
 ]
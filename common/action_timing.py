@@ -0,0 +1,473 @@
+# ========================================
+# 页面操作耗时统计
+# ========================================
+# 记录 BasePage 每个操作（点击、输入、等待等）的耗时：
+#   总耗时、等待可操作（可见）耗时（需开启 ACTION_TIMING_SPLIT_WAIT）、定位器、页面类、用例 nodeid
+# - 未单独测量等待的操作 wait_ms 为 null（CSV 中为空），表示未测量而不是没有等待
+#
+# - BasePage 的操作方法由 @timed_action 装饰，Settings.ACTION_TIMING=false 时完全不记录
+# - 每个进程在会话结束时把原始记录写到 logs/action_timing/<worker>.json
+# - allure.step 的耗时通过 allure_commons 的 start_step/stop_step 钩子记录，
+#   按还原出的标题模板（如「导航到: {url}」）归组，格式化后的标题只作为示例保留
+# - 主进程合并所有 worker 的记录，按用例、页面类汇总直方图并导出 JSON/CSV，
+#   并生成最慢用例/步骤/定位器排行（终端汇总与钉钉报告使用）
+# ========================================
+
+import csv
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import allure_commons
+
+from config.settings import Settings
+from utils.logger import Logger
+
+logger = Logger("ActionTiming")
+
+# 直方图桶上界（毫秒），最后一个桶为 > 10000ms
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 导出 CSV 的列顺序（与单条记录的字段一致）
+RECORD_FIELDS = ("nodeid", "page", "action", "locator", "wall_ms", "wait_ms", "ok")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    计算分位数（线性插值，与 numpy.percentile 默认方式一致）
+
+    Args:
+        values: 数值列表
+        q: 分位（0-100）
+
+    Returns:
+        分位数，空列表返回 0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def histogram(values: Iterable[float]) -> Dict[str, int]:
+    """
+    按 HISTOGRAM_BUCKETS_MS 统计耗时分布
+
+    Returns:
+        {"<=50": 3, "<=100": 1, ..., ">10000": 0}
+    """
+    labels = [f"<={bound}" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+    counts = dict.fromkeys(labels, 0)
+    for value in values:
+        for bound, label in zip(HISTOGRAM_BUCKETS_MS, labels):
+            if value <= bound:
+                counts[label] += 1
+                break
+        else:
+            counts[labels[-1]] += 1
+    return counts
+
+
+def summarize(records: List[dict]) -> dict:
+    """
+    汇总一组记录：次数、总耗时、等待耗时、p50/p95/max 与直方图
+
+    等待耗时只统计测量了等待的记录（wait_measured 条），一条都没有时为 None。
+
+    Args:
+        records: 操作记录列表
+
+    Returns:
+        dict: 汇总结果（毫秒，保留 1 位小数）
+    """
+    walls = [r["wall_ms"] for r in records]
+    waits = [r["wait_ms"] for r in records if r.get("wait_ms") is not None]
+    return {
+        "count": len(records),
+        "failed": sum(1 for r in records if not r["ok"]),
+        "total_ms": round(sum(walls), 1),
+        "wait_ms": round(sum(waits), 1) if waits else None,
+        "wait_measured": len(waits),
+        "p50_ms": round(percentile(walls, 50), 1),
+        "p95_ms": round(percentile(walls, 95), 1),
+        "max_ms": round(max(walls, default=0.0), 1),
+        "histogram": histogram(walls),
+    }
+
+
+def group_by(records: List[dict], *fields: str) -> Dict[str, List[dict]]:
+    """按一个或多个字段分组，多个字段时键为 "a | b" """
+    groups: Dict[str, List[dict]] = {}
+    for record in records:
+        key = " | ".join(str(record[f]) for f in fields)
+        groups.setdefault(key, []).append(record)
+    return groups
+
+
+def slowest(records: List[dict], fields: Tuple[str, ...], top_n: int) -> List[dict]:
+    """
+    按字段分组后取最慢的 top_n 组（按 p95 降序，其次总耗时）
+
+    Args:
+        records: 操作或步骤记录
+        fields: 分组字段，如 ("title",)、("page", "action", "locator")
+        top_n: 返回条数
+
+    Returns:
+        [{"name", "count", "p50_ms", "p95_ms", "max_ms", "total_ms"}, ...]，
+        记录带 example（步骤格式化后的标题）时附上最慢一次的 example
+    """
+    rows = []
+    for name, group in group_by(records, *fields).items():
+        summary = summarize(group)
+        row = {
+            "name": name,
+            "count": summary["count"],
+            "p50_ms": summary["p50_ms"],
+            "p95_ms": summary["p95_ms"],
+            "max_ms": summary["max_ms"],
+            "total_ms": summary["total_ms"],
+        }
+        example = max(group, key=lambda r: r["wall_ms"]).get("example")
+        if example:
+            row["example"] = example
+        rows.append(row)
+    rows.sort(key=lambda row: (row["p95_ms"], row["total_ms"]), reverse=True)
+    return rows[:top_n]
+
+
+def step_template(title: str, params: Optional[Dict[str, str]]) -> str:
+    """
+    还原 allure.step 的标题模板
+
+    allure 传给钩子的标题已用参数格式化（如「导航到: 'https://...'」），同一步骤每次都不同；
+    把其中的参数值换回 {参数名}，使重复执行的步骤归为一组。with allure.step(f"...") 没有参数，原样返回。
+
+    Args:
+        title: 格式化后的步骤标题
+        params: allure 传入的参数 {参数名: 参数值的 repr}
+
+    Returns:
+        标题模板
+    """
+    # 长的值先替换，避免短值命中长值内部；self 等对象的 repr 不会出现在标题中
+    for name, value in sorted((params or {}).items(), key=lambda kv: len(kv[1] or ""), reverse=True):
+        if value and value in title:
+            title = title.replace(value, f"{{{name}}}")
+    return title
+
+
+class _AllureStepTimer:
+    """allure_commons 插件：记录每个 allure.step 的耗时（注册后对所有线程生效）"""
+
+    def __init__(self, timer: "ActionTimer"):
+        self._timer = timer
+        self._started: Dict[str, Tuple[str, str, float]] = {}
+
+    @allure_commons.hookimpl
+    def start_step(self, uuid, title, params):
+        self._started[uuid] = (step_template(title, params), title, time.perf_counter())
+
+    @allure_commons.hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        started = self._started.pop(uuid, None)
+        if started is not None:
+            template, title, start = started
+            self._timer.record_step(template, (time.perf_counter() - start) * 1000, exc_type is None, example=title)
+
+
+class ActionTimer:
+    """
+    进程内的操作耗时记录器
+
+    使用方法：
+        from common.action_timing import action_timer
+
+        action_timer.reset()                   # 主进程会话开始时
+        action_timer.start_test(item.nodeid)   # 用例开始时
+        with action_timer.measure("LoginPage", "click", "#submit") as m:
+            with action_timer.waiting():
+                element.wait_for(state="visible")
+            element.click()
+        action_timer.dump()                    # 每个进程会话结束时
+        action_timer.export()                  # 主进程合并并导出
+    """
+
+    STATE_DIR = Settings.LOGS_DIR / "action_timing"
+
+    def __init__(self):
+        self._records: List[dict] = []
+        self._steps: List[dict] = []
+        self._step_hooks: Optional[_AllureStepTimer] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.current_nodeid = ""
+
+    def reset(self) -> None:
+        """清空上一次运行留下的原始记录"""
+        self._records = []
+        self._steps = []
+        self.STATE_DIR.mkdir(parents=True, exist_ok=True)
+        for raw_file in self.STATE_DIR.glob("*.json"):
+            try:
+                raw_file.unlink()
+            except OSError:
+                pass
+
+    def start_test(self, nodeid: str) -> None:
+        """标记当前用例，之后的操作记录都归属于它"""
+        self.current_nodeid = nodeid
+
+    def end_test(self) -> None:
+        """用例结束，之后的操作（如 session fixture 清理）不再归属任何用例"""
+        self.current_nodeid = ""
+
+    def install_step_hooks(self) -> None:
+        """注册 allure.step 耗时统计插件（重复调用只注册一次）"""
+        if self._step_hooks is None:
+            self._step_hooks = _AllureStepTimer(self)
+            allure_commons.plugin_manager.register(self._step_hooks, name="action_timing_steps")
+
+    def record_step(self, title: str, wall_ms: float, ok: bool = True, example: Optional[str] = None) -> None:
+        """
+        记录一个 allure.step 的耗时
+
+        Args:
+            title: 步骤标题模板（汇总按它分组）
+            wall_ms: 耗时（毫秒）
+            ok: 是否成功
+            example: 格式化后的标题，与模板不同时保留作为示例
+        """
+        step = {"nodeid": self.current_nodeid, "title": title, "wall_ms": round(wall_ms, 2), "ok": ok}
+        if example and example != title:
+            step["example"] = example
+        with self._lock:
+            self._steps.append(step)
+
+    @property
+    def records(self) -> List[dict]:
+        """本进程已记录的操作（副本）"""
+        with self._lock:
+            return list(self._records)
+
+    @contextmanager
+    def measure(self, page: str, action: str, locator: str = "", waiting: bool = False):
+        """
+        记录一次操作的耗时
+
+        嵌套调用（操作内部又调用了其它被统计的操作）只记录最外层，避免重复计入。
+
+        Args:
+            page: 页面类名
+            action: 操作名，如 click、fill
+            locator: 定位器描述
+            waiting: 整个操作本身就是等待（如 wait_for_element_visible），等待耗时即总耗时
+
+        操作内没有 waiting() 段且 waiting=False 时，wait_ms 记为 None（未测量）。
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = {"wait": 0.0, "measured": False}
+        stack.append(frame)
+        ok = False
+        start = time.perf_counter()
+        try:
+            yield frame
+            ok = True
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            stack.pop()
+            if not stack:
+                record = {
+                    "nodeid": self.current_nodeid,
+                    "page": page,
+                    "action": action,
+                    "locator": locator,
+                    "wall_ms": round(wall_ms, 2),
+                    "wait_ms": (
+                        round(wall_ms, 2) if waiting
+                        else round(frame["wait"] * 1000, 2) if frame["measured"]
+                        else None
+                    ),
+                    "ok": ok,
+                }
+                with self._lock:
+                    self._records.append(record)
+
+    @contextmanager
+    def waiting(self):
+        """在 measure() 内标记一段「等待可操作」的时间，计入最外层操作（只有它会被记录），不在 measure 内时不记录"""
+        stack = getattr(self._local, "stack", None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if stack:
+                stack[0]["wait"] += time.perf_counter() - start
+                stack[0]["measured"] = True
+
+    def dump(self) -> Optional[Path]:
+        """
+        把本进程的原始记录写到 STATE_DIR/<worker>.json，供主进程合并
+
+        Returns:
+            写入的文件路径，没有记录时返回 None
+        """
+        with self._lock:
+            data = {"actions": list(self._records), "steps": list(self._steps)}
+        if not data["actions"] and not data["steps"]:
+            return None
+        worker = os.getenv("PYTEST_XDIST_WORKER", "master")
+        raw_file = self.STATE_DIR / f"{worker}.json"
+        try:
+            raw_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = raw_file.with_name(f"{raw_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, raw_file)
+            return raw_file
+        except Exception as e:
+            logger.warning(f"写入操作耗时记录失败: {raw_file}, 错误: {e}")
+            return None
+
+    def load_all(self, kind: str = "actions") -> List[dict]:
+        """
+        读取所有进程写入的原始记录
+
+        Args:
+            kind: actions（页面操作）或 steps（allure.step）
+        """
+        records: List[dict] = []
+        for raw_file in sorted(self.STATE_DIR.glob("*.json")):
+            try:
+                with open(raw_file, "r", encoding="utf-8") as f:
+                    records.extend(json.load(f).get(kind, []))
+            except (OSError, ValueError, AttributeError) as e:
+                logger.warning(f"读取操作耗时记录失败: {raw_file}, 错误: {e}")
+        return records
+
+    def performance_summary(
+        self,
+        test_durations: Dict[str, float],
+        top_n: Optional[int] = None,
+        names: Optional[Dict[str, str]] = None,
+    ) -> dict:
+        """
+        生成最慢用例/步骤/定位器排行（合并所有 worker 的记录）
+
+        Args:
+            test_durations: {用例 nodeid: 耗时秒数}（主进程从 pytest 报告汇总，已包含所有 worker）
+            top_n: 每类取前几名，默认 Settings.PERF_REPORT_TOP_N
+            names: {nodeid: 展示名称}，只用于输出；同名的参数化用例、不同类中的同名方法各占一行
+
+        Returns:
+            {"tests": [(名称, 秒)], "steps": [...], "locators": [...]}，后两者元素格式见 slowest()
+        """
+        top_n = Settings.PERF_REPORT_TOP_N if top_n is None else top_n
+        names = names or {}
+        tests = sorted(test_durations.items(), key=lambda kv: kv[1], reverse=True)[:top_n]
+        shown = [names.get(nodeid, nodeid) for nodeid, _ in tests]
+        # 展示名相同（参数化用例、不同类中同一 docstring）时附上 nodeid 区分
+        shown = [
+            f"{name} ({nodeid})" if shown.count(name) > 1 else name
+            for name, (nodeid, _) in zip(shown, tests)
+        ]
+        return {
+            "tests": [(name, round(seconds, 2)) for name, (_, seconds) in zip(shown, tests)],
+            "steps": slowest(self.load_all("steps"), ("title",), top_n),
+            "locators": slowest(self.load_all("actions"), ("page", "action", "locator"), top_n),
+        }
+
+    def export(self, records: Optional[List[dict]] = None, formats: Optional[str] = None) -> List[Path]:
+        """
+        导出操作耗时报告
+
+        JSON 包含总体、按用例、按页面类、按 页面类+操作+定位器 的汇总（次数、总耗时、等待耗时、
+        p50/p95/max、直方图）；CSV 为逐条原始记录，便于用表格或 pandas 再分析。
+
+        Args:
+            records: 要导出的记录，默认合并所有进程的原始记录
+            formats: 逗号分隔的格式（json/csv），默认 Settings.ACTION_TIMING_EXPORT
+
+        Returns:
+            生成的文件路径列表
+        """
+        records = self.load_all() if records is None else records
+        steps = self.load_all("steps")
+        if not records and not steps:
+            return []
+        formats = Settings.ACTION_TIMING_EXPORT if formats is None else formats
+        wanted = {fmt.strip().lower() for fmt in formats.split(",") if fmt.strip()}
+        outputs: List[Path] = []
+
+        if "json" in wanted:
+            report = {
+                "buckets_ms": list(HISTOGRAM_BUCKETS_MS),
+                "overall": summarize(records),
+                "by_test": {k: summarize(v) for k, v in group_by(records, "nodeid").items()},
+                "by_page": {k: summarize(v) for k, v in group_by(records, "page").items()},
+                "by_locator": {
+                    k: summarize(v) for k, v in group_by(records, "page", "action", "locator").items()
+                },
+                "by_step": {k: summarize(v) for k, v in group_by(steps, "title").items()},
+            }
+            json_file = Settings.LOGS_DIR / "action_timing.json"
+            with open(json_file, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            outputs.append(json_file)
+
+        if "csv" in wanted:
+            csv_file = Settings.LOGS_DIR / "action_timing.csv"
+            # utf-8-sig：Excel 直接打开中文不乱码
+            with open(csv_file, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+                writer.writeheader()
+                writer.writerows(records)
+            outputs.append(csv_file)
+
+        return outputs
+
+
+# 进程内共享的操作耗时记录器
+action_timer = ActionTimer()
+
+
+def timed_action(action: str, waiting: bool = False):
+    """
+    BasePage 操作方法的耗时统计装饰器
+
+    第一个位置参数（或 locator 关键字参数）为定位器时记录其描述；
+    Settings.ACTION_TIMING=false 时直接调用原方法。
+
+    Args:
+        action: 操作名，如 click、fill
+        waiting: 该操作本身就是等待（wait_for_* 类方法）
+
+    示例：
+        @allure.step("点击元素")
+        @timed_action("click")
+        def click_element(self, locator, ...):
+            ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not Settings.ACTION_TIMING:
+                return func(self, *args, **kwargs)
+            # 只取第一个参数（定位器/URL），不记录输入文本等可能含敏感信息的参数
+            target = args[0] if args else kwargs.get("locator", kwargs.get("source"))
+            describe = getattr(self, "_locator_to_log_str", str)
+            locator = "" if target is None else describe(target)
+            with action_timer.measure(self.__class__.__name__, action, locator, waiting=waiting):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,572 @@
+# ========================================
+# 用例依赖调度
+# ========================================
+# 通过 run 标记声明用例之间的前置依赖，替代单纯按 order 全局串行：
+#   @pytest.mark.run(order=170, depends_on=["create_dept"])
+#
+# - 依赖名默认是测试函数名去掉 test_ 前缀（test_create_major -> create_major），
+#   也可通过 run(name="xxx") 显式指定
+# - 收集阶段按依赖做拓扑排序（order 作为同层优先级），单进程下即为执行顺序
+# - xdist 下由 DependencyScheduling 调度：前置用例完成后立即把就绪用例分发给空闲 worker，
+#   就绪用例按历史耗时加权的关键路径最长优先（LPT），长用例尽早开始，缩短最慢 worker 的结束时间
+# - 每个用例执行前等待其前置用例结束；前置失败或被阻断则跳过并记为 blocked，沿依赖链向下传递，
+#   前置被普通跳过（如 skip_prod）视为满足
+# ========================================
+
+import hashlib
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+from config.settings import Settings
+from utils.logger import Logger
+
+logger = Logger("Dependency")
+
+_OUTCOME_PASSED = "passed"
+_OUTCOME_FAILED = "failed"
+_OUTCOME_SKIPPED = "skipped"
+# 因前置未通过而跳过：与普通跳过区分，依赖它的用例同样跳过
+_OUTCOME_BLOCKED = "blocked"
+_BLOCKING_OUTCOMES = (_OUTCOME_FAILED, _OUTCOME_BLOCKED)
+
+# 与 conftest 中 get_order_key 的默认值一致
+_DEFAULT_ORDER = 999999
+
+
+def dependency_name(item) -> str:
+    """
+    获取用例的依赖名
+
+    优先使用 run(name="xxx")，否则为测试函数名去掉 test_ 前缀。
+
+    Args:
+        item: pytest 用例
+
+    Returns:
+        依赖名，如 "create_major"
+    """
+    run_marker = item.get_closest_marker("run")
+    if run_marker and run_marker.kwargs.get("name"):
+        return str(run_marker.kwargs["name"])
+    name = getattr(item, "originalname", None) or item.name
+    return name[len("test_"):] if name.startswith("test_") else name
+
+
+def dependency_prerequisites(item) -> List[str]:
+    """
+    获取用例声明的前置依赖名列表（run(depends_on=[...])）
+
+    Args:
+        item: pytest 用例
+
+    Returns:
+        前置依赖名列表，未声明时为空列表
+    """
+    run_marker = item.get_closest_marker("run")
+    if not run_marker:
+        return []
+    depends_on = run_marker.kwargs.get("depends_on") or []
+    if isinstance(depends_on, str):
+        depends_on = [depends_on]
+    return [str(name) for name in depends_on]
+
+
+def _order_of(item) -> int:
+    """读取 run(order) 的值，缺省或非法时为 _DEFAULT_ORDER"""
+    run_marker = item.get_closest_marker("run")
+    if run_marker and "order" in run_marker.kwargs:
+        try:
+            return int(run_marker.kwargs["order"])
+        except (TypeError, ValueError):
+            pass
+    return _DEFAULT_ORDER
+
+
+def sort_items_by_dependency(items: list) -> list:
+    """
+    按依赖拓扑排序，同一层按 (order, nodeid) 排序
+
+    未声明依赖时结果与原先按 (order, nodeid) 全局排序完全一致。
+    依赖名不在本次收集结果中（如只跑单个文件）时忽略该依赖；存在环时告警并按原顺序追加。
+
+    Args:
+        items: pytest 收集到的用例列表
+
+    Returns:
+        排好序的新列表
+    """
+    keyed = sorted(items, key=lambda it: (_order_of(it), it.nodeid))
+    position = {id(it): idx for idx, it in enumerate(keyed)}
+
+    name_to_items: Dict[str, List] = {}
+    for it in keyed:
+        name_to_items.setdefault(dependency_name(it), []).append(it)
+
+    indegree: Dict[int, int] = {id(it): 0 for it in keyed}
+    dependents: Dict[int, List] = {id(it): [] for it in keyed}
+    for it in keyed:
+        for dep_name in dependency_prerequisites(it):
+            for dep_item in name_to_items.get(dep_name, []):
+                if dep_item is it:
+                    continue
+                dependents[id(dep_item)].append(it)
+                indegree[id(it)] += 1
+
+    heap = [(position[id(it)], it) for it in keyed if indegree[id(it)] == 0]
+    heapq.heapify(heap)
+    result = []
+    while heap:
+        _, it = heapq.heappop(heap)
+        result.append(it)
+        for dependent in dependents[id(it)]:
+            indegree[id(dependent)] -= 1
+            if indegree[id(dependent)] == 0:
+                heapq.heappush(heap, (position[id(dependent)], dependent))
+
+    if len(result) < len(keyed):
+        placed = {id(it) for it in result}
+        cyclic = [it for it in keyed if id(it) not in placed]
+        logger.warning(f"用例依赖存在环，以下用例按 order 顺序执行: {[it.nodeid for it in cyclic]}")
+        result.extend(cyclic)
+    return result
+
+
+class DependencyState:
+    """
+    跨进程的用例结果状态（每个用例一个小文件，原子替换写入）
+
+    worker 在用例结束时写入结果，其它 worker 在执行依赖它的用例前轮询读取。
+    状态目录在主进程 pytest_configure 时清空。
+
+    使用方法：
+        state = DependencyState()
+        state.reset()                                   # 主进程会话开始时
+        state.export_graph(session.items)               # 收集完成后
+        state.record(item.nodeid, "passed")             # 用例结束时
+        blocked = state.wait_for_prerequisites(item)    # 用例开始前
+    """
+
+    STATE_DIR = Settings.LOGS_DIR / "dependency_state"
+    GRAPH_FILE = "graph.json"
+
+    def __init__(self):
+        self._name_index: Optional[Dict[str, List[str]]] = None
+        self._positions: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        """清空上一次运行留下的状态"""
+        self.STATE_DIR.mkdir(parents=True, exist_ok=True)
+        for state_file in self.STATE_DIR.glob("*.json"):
+            try:
+                state_file.unlink()
+            except OSError:
+                pass
+
+    def _state_file(self, nodeid: str) -> Path:
+        digest = hashlib.sha1(nodeid.encode("utf-8")).hexdigest()
+        return self.STATE_DIR / f"{digest}.json"
+
+    def _write_atomic(self, path: Path, data: dict) -> None:
+        """先写临时文件再 os.replace，读方不会看到半截内容"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def export_graph(self, items: list) -> None:
+        """
+        导出依赖图供 xdist 主进程调度使用（主进程不收集用例，拿不到标记）
+
+        只保留指向更早用例的边，保证依赖图与收集顺序一致（无环）。
+
+        Args:
+            items: 已排序的用例列表
+        """
+        graph: Dict[str, dict] = {}
+        name_to_nodeids: Dict[str, List[str]] = {}
+        for it in items:
+            name = dependency_name(it)
+            prerequisites = [
+                nodeid
+                for dep_name in dependency_prerequisites(it)
+                for nodeid in name_to_nodeids.get(dep_name, [])
+            ]
+            graph[it.nodeid] = {"name": name, "prerequisites": prerequisites}
+            name_to_nodeids.setdefault(name, []).append(it.nodeid)
+        try:
+            self._write_atomic(self.STATE_DIR / self.GRAPH_FILE, graph)
+        except Exception as e:
+            logger.warning(f"导出用例依赖图失败: {e}")
+
+    def load_graph(self) -> Dict[str, dict]:
+        """读取依赖图，不存在时返回空字典"""
+        graph_file = self.STATE_DIR / self.GRAPH_FILE
+        try:
+            if graph_file.exists():
+                with open(graph_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"读取用例依赖图失败: {e}")
+        return {}
+
+    def record(self, nodeid: str, outcome: str) -> None:
+        """
+        记录用例最终结果
+
+        Args:
+            nodeid: pytest 用例节点 id
+            outcome: passed / failed / skipped / blocked
+        """
+        try:
+            self._write_atomic(self._state_file(nodeid), {"nodeid": nodeid, "outcome": outcome})
+        except Exception as e:
+            logger.warning(f"记录用例依赖状态失败: {nodeid}, 错误: {e}")
+
+    def forget(self, nodeid: str) -> None:
+        """删除用例结果（用例被放回队列重跑时调用，依赖它的用例重新等待）"""
+        try:
+            self._state_file(nodeid).unlink()
+        except OSError:
+            pass
+
+    def outcome_of(self, nodeid: str) -> Optional[str]:
+        """读取用例结果，未完成时返回 None"""
+        state_file = self._state_file(nodeid)
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("outcome")
+        except (OSError, ValueError):
+            return None
+
+    def _prerequisite_nodeids(self, item) -> Dict[str, List[str]]:
+        """{依赖名: [nodeid, ...]}，只包含本次会话中排在该用例之前的用例（与 export_graph 一致）"""
+        if self._name_index is None:
+            self._name_index = {}
+            self._positions = {}
+            for position, it in enumerate(item.session.items):
+                self._name_index.setdefault(dependency_name(it), []).append(it.nodeid)
+                self._positions[it.nodeid] = position
+        own_position = self._positions.get(item.nodeid, len(self._positions))
+        return {
+            dep_name: [nodeid for nodeid in self._name_index.get(dep_name, []) if self._positions[nodeid] < own_position]
+            for dep_name in dependency_prerequisites(item)
+        }
+
+    def wait_for_prerequisites(self, item, timeout: Optional[float] = None, poll_interval: float = 0.5) -> List[str]:
+        """
+        等待用例的前置依赖全部结束
+
+        Args:
+            item: pytest 用例
+            timeout: 最长等待秒数，默认 Settings.DEPENDENCY_WAIT_TIMEOUT
+            poll_interval: 轮询间隔（秒）
+
+        Returns:
+            未通过的前置依赖名列表（失败、被阻断或等待超时）；为空表示可以执行
+        """
+        pending = self._prerequisite_nodeids(item)
+        if not any(pending.values()):
+            return []
+
+        timeout = Settings.DEPENDENCY_WAIT_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        blocked: Set[str] = set()
+        waited = False
+        while True:
+            for dep_name, nodeids in list(pending.items()):
+                remaining = []
+                for nodeid in nodeids:
+                    outcome = self.outcome_of(nodeid)
+                    if outcome is None:
+                        remaining.append(nodeid)
+                    elif outcome in _BLOCKING_OUTCOMES:
+                        blocked.add(dep_name)
+                pending[dep_name] = remaining
+                if not remaining:
+                    del pending[dep_name]
+            if not pending:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f"等待前置用例超时: {list(pending)}")
+                blocked.update(f"{name}(等待超时)" for name in pending)
+                break
+            if not waited:
+                logger.info(f"等待前置用例完成: {list(pending)}")
+                waited = True
+            time.sleep(poll_interval)
+        return sorted(blocked)
+
+
+def item_final_outcome(item) -> str:
+    """
+    根据 setup/call/teardown 三个阶段的报告得到用例最终结果
+
+    需在 pytest_runtest_makereport 中把各阶段报告存为 item.rep_setup / rep_call / rep_teardown。
+    因前置未通过而跳过的用例（pytest_runtest_setup 中设置 item.dependency_blocked）记为 blocked。
+    """
+    if getattr(item, "dependency_blocked", None):
+        return _OUTCOME_BLOCKED
+    reports = [getattr(item, f"rep_{when}", None) for when in ("setup", "call", "teardown")]
+    reports = [rep for rep in reports if rep is not None]
+    if any(rep.failed for rep in reports):
+        return _OUTCOME_FAILED
+    if any(rep.skipped for rep in reports):
+        return _OUTCOME_SKIPPED
+    return _OUTCOME_PASSED
+
+
+class DependencyScheduling:
+    """
+    pytest-xdist 依赖感知调度器
+
+    在 LoadScheduling 的基础上按依赖图分发：
+    - 前置全部完成的用例为「就绪」，优先分给空闲 worker，关键路径更长的优先；
+      关键路径按 logs/duration_history.db 中的历史耗时加权（无历史的用例取已知耗时的中位数），
+      无依赖时即为最长处理时间优先（LPT）；关闭 DURATION_SCHEDULING 或无历史时按用例条数计算
+    - xdist worker 需要手里有下一条用例（或 shutdown）才会开始执行当前用例，
+      因此每个 worker 保持 2 条待执行：不足时用「前置均已分发」的用例补位，
+      该用例在 worker 侧由 DependencyState.wait_for_prerequisites 等待前置结束
+    - 只分发前置均已分发的用例，保证每个 worker 队列内顺序与依赖一致，不会死锁
+
+    由 conftest 中的 pytest_xdist_make_scheduler 在 --dist=load（-n 的默认值）时启用。
+    """
+
+    def __init__(self, config, log=None):
+        from xdist.remote import Producer
+        from xdist.workermanage import parse_tx_spec_config
+
+        self.numnodes = len(parse_tx_spec_config(config))
+        self.node2collection: Dict = {}
+        self.node2pending: Dict = {}
+        self.pending: List[int] = []
+        self.collection: Optional[List[str]] = None
+        self.config = config
+        self.log = Producer("depsched") if log is None else log.depsched
+
+        self._dispatched: Set[int] = set()
+        self._completed: Set[int] = set()
+        self._prerequisites: Dict[int, Set[int]] = {}
+        self._priority: Dict[int, float] = {}
+
+    @property
+    def nodes(self) -> list:
+        """调度器中的所有 worker"""
+        return list(self.node2pending.keys())
+
+    @property
+    def collection_is_completed(self) -> bool:
+        """所有 worker 是否都已上报收集结果"""
+        return len(self.node2collection) >= self.numnodes
+
+    @property
+    def tests_finished(self) -> bool:
+        """所有用例是否已执行完（worker 只剩最后一条时已收到 shutdown）"""
+        if not self.collection_is_completed or self.pending:
+            return False
+        return all(len(pending) < 2 for pending in self.node2pending.values())
+
+    @property
+    def has_pending(self) -> bool:
+        """是否还有未分发或未执行完的用例"""
+        return bool(self.pending) or any(self.node2pending.values())
+
+    def add_node(self, node) -> None:
+        """新增 worker"""
+        assert node not in self.node2pending
+        self.node2pending[node] = []
+
+    def add_node_collection(self, node, collection: Sequence[str]) -> None:
+        """记录 worker 的收集结果"""
+        assert node in self.node2pending
+        if self.collection_is_completed and self.collection is not None and list(collection) != self.collection:
+            self.log(f"worker {node.gateway.id} 收集结果与其它 worker 不一致，忽略该 worker 的收集结果")
+            return
+        self.node2collection[node] = list(collection)
+
+    def mark_test_complete(self, node, item_index: int, duration: float = 0) -> None:
+        """worker 执行完一条用例"""
+        self.node2pending[node].remove(item_index)
+        self._completed.add(item_index)
+        self._fill_nodes()
+
+    def mark_test_pending(self, item: str) -> None:
+        """把用例放回待分发队列（如崩溃后重跑），并清除 remove_node 记下的失败结果"""
+        assert self.collection is not None
+        index = self.collection.index(item)
+        DependencyState().forget(item)
+        self._dispatched.discard(index)
+        self._completed.discard(index)
+        self.pending.append(index)
+        self.pending.sort()
+        self._fill_nodes()
+
+    def remove_pending_tests_from_node(self, node, indices: Sequence[int]) -> None:
+        """
+        worker 交还已分发但未执行的用例，放回待分发队列重新调度
+
+        xdist 只在 worksteal 的 steal 应答（DSession.worker_unscheduled）时调用，
+        本调度器不发 steal，这里保证协议完整，交还的用例按依赖与优先级重新分发。
+        """
+        returned = set(indices)
+        self.node2pending[node] = [index for index in self.node2pending[node] if index not in returned]
+        for index in returned:
+            self._dispatched.discard(index)
+        self.pending.extend(returned)
+        self.pending.sort()
+        self._fill_nodes()
+
+    def remove_node(self, node) -> Optional[str]:
+        """
+        移除 worker（正常结束或崩溃）
+
+        Returns:
+            崩溃时正在执行的用例 nodeid，正常结束返回 None
+        """
+        pending = self.node2pending.pop(node)
+        if not pending:
+            return None
+
+        assert self.collection is not None
+        crash_index = pending.pop(0)
+        # 崩溃用例由 xdist 报告为失败，视为已完成；其余放回待分发队列
+        self._completed.add(crash_index)
+        # 崩溃的 worker 来不及写入结果：由主进程记为失败，已分发到其它 worker 的后续用例立即跳过，
+        # 不必等到 DEPENDENCY_WAIT_TIMEOUT（worker 已写入结果时保留）
+        state = DependencyState()
+        crashed = self.collection[crash_index]
+        if state.outcome_of(crashed) is None:
+            state.record(crashed, "failed")
+        for index in pending:
+            self._dispatched.discard(index)
+        self.pending.extend(pending)
+        self.pending.sort()
+        self._fill_nodes()
+        return crashed
+
+    def schedule(self) -> None:
+        """开始分发（所有 worker 收集完成后由 DSession 调用）"""
+        assert self.collection_is_completed
+
+        if self.collection is not None:
+            self._fill_nodes()
+            return
+
+        collections = list(self.node2collection.values())
+        if any(col != collections[0] for col in collections[1:]):
+            self.log("**Different tests collected, aborting run**")
+            return
+
+        self.collection = collections[0]
+        self.pending[:] = range(len(self.collection))
+        if not self.collection:
+            return
+
+        self._build_graph()
+        self._fill_nodes()
+
+    def _load_weights(self) -> List[float]:
+        """
+        每个用例的预计耗时（秒），来自历史运行记录
+
+        无历史的用例取已知耗时的中位数；完全没有历史时全部为 1，即按用例条数计算关键路径。
+        """
+        count = len(self.collection)
+        if not Settings.DURATION_SCHEDULING:
+            return [1.0] * count
+        try:
+            from common.duration_history import DurationHistory
+            expected = DurationHistory().expected_durations(Settings.ENV_CONFIG_FILE)
+        except Exception as e:
+            self.log(f"读取历史耗时失败，按用例条数调度: {e}")
+            return [1.0] * count
+        known = sorted(expected[nodeid] for nodeid in self.collection if nodeid in expected)
+        if not known:
+            return [1.0] * count
+        default = known[len(known) // 2]
+        self.log(f"历史耗时: {len(known)}/{count} 个用例有记录，其余按 {default:.1f}s 估算")
+        return [max(expected.get(nodeid, default), 0.001) for nodeid in self.collection]
+
+    def _build_graph(self) -> None:
+        """把 worker 导出的依赖图映射为用例下标，并计算按耗时加权的关键路径长度作为优先级"""
+        graph = DependencyState().load_graph()
+        index_of = {nodeid: idx for idx, nodeid in enumerate(self.collection)}
+        dependents: Dict[int, Set[int]] = {idx: set() for idx in range(len(self.collection))}
+        for idx, nodeid in enumerate(self.collection):
+            prerequisites = set()
+            for dep_nodeid in graph.get(nodeid, {}).get("prerequisites", []):
+                dep_idx = index_of.get(dep_nodeid)
+                # 只保留指向更早用例的边，与收集顺序一致
+                if dep_idx is not None and dep_idx < idx:
+                    prerequisites.add(dep_idx)
+                    dependents[dep_idx].add(idx)
+            self._prerequisites[idx] = prerequisites
+
+        weights = self._load_weights()
+        for idx in reversed(range(len(self.collection))):
+            self._priority[idx] = weights[idx] + max((self._priority[d] for d in dependents[idx]), default=0)
+
+        edges = sum(len(p) for p in self._prerequisites.values())
+        self.log(
+            f"依赖图: {len(self.collection)} 个用例, {edges} 条依赖, "
+            f"加权关键路径 {max(self._priority.values()):.1f}, 总权重 {sum(weights):.1f}"
+        )
+
+    def _is_ready(self, index: int) -> bool:
+        return self._prerequisites.get(index, set()) <= self._completed
+
+    def _is_dispatchable(self, index: int) -> bool:
+        return self._prerequisites.get(index, set()) <= self._dispatched
+
+    def _pop_next(self, ready_only: bool) -> Optional[int]:
+        """
+        取下一条要分发的用例
+
+        优先就绪用例（关键路径长的优先）；ready_only=False 时退而取最早的可分发用例用于补位。
+        """
+        ready = [idx for idx in self.pending if self._is_ready(idx)]
+        if ready:
+            chosen = max(ready, key=lambda idx: (self._priority.get(idx, 1), -idx))
+        elif ready_only:
+            return None
+        else:
+            chosen = next((idx for idx in self.pending if self._is_dispatchable(idx)), None)
+            if chosen is None:
+                return None
+        self.pending.remove(chosen)
+        return chosen
+
+    def _send(self, node, index: int) -> None:
+        self._dispatched.add(index)
+        self.node2pending[node].append(index)
+        node.send_runtest_some([index])
+
+    def _fill_nodes(self) -> None:
+        """
+        给 worker 补充用例
+
+        第一轮只给空闲 worker 发就绪用例，尽量铺开并行；第二轮把每个 worker 补到 2 条。
+        """
+        if self.collection is None:
+            return
+        active_nodes = [node for node in self.nodes if not node.shutting_down]
+        for node in active_nodes:
+            if not self.node2pending[node]:
+                index = self._pop_next(ready_only=True)
+                if index is not None:
+                    self._send(node, index)
+        for node in active_nodes:
+            while len(self.node2pending[node]) < 2:
+                index = self._pop_next(ready_only=False)
+                if index is None:
+                    break
+                self._send(node, index)
+
+        if not self.pending:
+            for node in active_nodes:
+                node.shutdown()
+        self.log("num items waiting for node:", len(self.pending))
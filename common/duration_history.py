@@ -0,0 +1,285 @@
+# ========================================
+# 用例耗时历史库
+# ========================================
+# 通过 SQLite（logs/duration_history.db，WAL 模式）跨运行保存每个用例、每个 allure.step 的耗时
+# - 每次运行一行 runs 记录（环境配置文件 + 提交号 + 开始时间）
+# - 每个用例/步骤按运行汇总为一行 durations（次数、p50、p95、总耗时）
+# - 提供趋势查询，并与最近若干次运行的 p95 中位数（滚动基线）比较，检测耗时回归
+# 只在主进程（终端汇总时）写入，UIreport 每次重建不影响历史
+# ========================================
+
+import os
+import sqlite3
+import statistics
+import subprocess
+import threading
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.settings import Settings
+from common.action_timing import group_by, percentile
+
+KIND_TEST = "test"
+KIND_STEP = "step"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    env TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS durations (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    p50_ms REAL NOT NULL,
+    p95_ms REAL NOT NULL,
+    total_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_durations_name ON durations (kind, name, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_env ON runs (env, id);
+"""
+
+
+def current_commit() -> str:
+    """
+    获取当前代码提交号
+
+    优先读取 CI 常用的环境变量（GIT_COMMIT / CI_COMMIT_SHA / GITHUB_SHA），否则执行 git rev-parse。
+
+    Returns:
+        短提交号，无法获取时为 "unknown"
+    """
+    for var in ("GIT_COMMIT", "CI_COMMIT_SHA", "GITHUB_SHA"):
+        if os.getenv(var):
+            return os.getenv(var)[:12]
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short=12", "HEAD"],
+            cwd=str(Settings.PROJECT_ROOT), capture_output=True, text=True, timeout=5,
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return "unknown"
+
+
+class DurationHistory:
+    """
+    用例/步骤耗时历史
+
+    使用方法：
+        history = DurationHistory()
+
+        # 会话结束时（主进程）记录本次运行
+        run_id = history.record_run(
+            env="gqkt/prod.yaml",
+            test_durations={"tests/test_login.py::test_login": 12.3},   # 秒
+            steps=action_timer.load_all("steps"),                       # allure.step 原始记录
+        )
+
+        # 与滚动基线比较，找出 p95 上涨超过阈值的用例/步骤
+        for alert in history.regressions(run_id):
+            print(alert["name"], alert["p95_ms"], alert["baseline_ms"])
+
+        # 某个用例最近 20 次运行的耗时趋势
+        history.trend("tests/test_login.py::test_login")
+    """
+
+    DB_FILE = Settings.LOGS_DIR / "duration_history.db"
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or self.DB_FILE
+        self._file_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（首次连接时建表并切换为 WAL 模式）"""
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_file), timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def record_run(
+        self,
+        env: str,
+        test_durations: Dict[str, float],
+        steps: Optional[List[dict]] = None,
+        commit: Optional[str] = None,
+    ) -> int:
+        """
+        记录一次运行的用例与步骤耗时
+
+        Args:
+            env: 环境标识（如 Settings.ENV_CONFIG_FILE）
+            test_durations: {用例 nodeid: 耗时秒数}，只传通过的用例：跳过、被阻断、失败、超时的耗时
+                            会拉偏回归基线与 expected_durations() 给出的调度权重
+            steps: allure.step 原始记录（含 title、wall_ms），按标题汇总，同样只传通过用例中的步骤
+            commit: 提交号，默认自动获取
+
+        Returns:
+            本次运行的 run_id
+        """
+        rows = [
+            (KIND_TEST, nodeid, 1, seconds * 1000, seconds * 1000, seconds * 1000)
+            for nodeid, seconds in test_durations.items()
+        ]
+        for title, group in group_by(steps or [], "title").items():
+            walls = [r["wall_ms"] for r in group]
+            rows.append((KIND_STEP, title, len(walls), percentile(walls, 50), percentile(walls, 95), sum(walls)))
+
+        with self._file_lock, closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (env, commit_sha, started_at) VALUES (?, ?, ?)",
+                (env, commit or current_commit(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO durations (run_id, kind, name, count, p50_ms, p95_ms, total_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows],
+            )
+        self.prune(env)
+        return run_id
+
+    def prune(self, env: str, keep_runs: Optional[int] = None) -> None:
+        """只保留该环境最近 keep_runs 次运行（默认 Settings.DURATION_HISTORY_KEEP_RUNS，0 不清理）"""
+        keep_runs = Settings.DURATION_HISTORY_KEEP_RUNS if keep_runs is None else keep_runs
+        if keep_runs <= 0:
+            return
+        with self._file_lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM runs WHERE env = ? AND id NOT IN "
+                "(SELECT id FROM runs WHERE env = ? ORDER BY id DESC LIMIT ?)",
+                (env, env, keep_runs),
+            )
+
+    def trend(self, name: str, kind: str = KIND_TEST, env: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """
+        查询某个用例/步骤最近若干次运行的耗时
+
+        Args:
+            name: 用例 nodeid 或步骤标题
+            kind: test / step
+            env: 只看某个环境，None 表示全部
+            limit: 最近几次运行
+
+        Returns:
+            按时间升序的 [{"run_id", "env", "commit", "started_at", "count", "p50_ms", "p95_ms"}]
+        """
+        sql = (
+            "SELECT r.id, r.env, r.commit_sha, r.started_at, d.count, d.p50_ms, d.p95_ms "
+            "FROM durations d JOIN runs r ON r.id = d.run_id WHERE d.kind = ? AND d.name = ?"
+        )
+        params: list = [kind, name]
+        if env is not None:
+            sql += " AND r.env = ?"
+            params.append(env)
+        sql += " ORDER BY r.id DESC LIMIT ?"
+        params.append(limit)
+        with self._file_lock, closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        keys = ("run_id", "env", "commit", "started_at", "count", "p50_ms", "p95_ms")
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+    def expected_durations(self, env: str, window: int = 5) -> Dict[str, float]:
+        """
+        估算每个用例的耗时（秒）：该环境最近 window 次运行中的耗时中位数
+
+        供 xdist 调度按耗时排序使用；没有历史数据的用例不在结果中。
+
+        Args:
+            env: 环境标识（如 Settings.ENV_CONFIG_FILE）
+            window: 取最近几次运行
+
+        Returns:
+            {用例 nodeid: 预计耗时秒数}
+        """
+        if not self.db_file.exists():
+            return {}
+        with self._file_lock, closing(self._connect()) as conn:
+            run_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM runs WHERE env = ? ORDER BY id DESC LIMIT ?", (env, window)
+            )]
+            if not run_ids:
+                return {}
+            placeholders = ",".join("?" * len(run_ids))
+            rows = conn.execute(
+                f"SELECT name, p95_ms FROM durations WHERE kind = ? AND run_id IN ({placeholders})",
+                [KIND_TEST, *run_ids],
+            ).fetchall()
+        samples: Dict[str, List[float]] = {}
+        for name, p95 in rows:
+            samples.setdefault(name, []).append(p95)
+        return {name: statistics.median(values) / 1000 for name, values in samples.items()}
+
+    def regressions(
+        self,
+        run_id: int,
+        threshold: Optional[float] = None,
+        window: Optional[int] = None,
+        min_runs: Optional[int] = None,
+        min_ms: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        检测耗时回归：本次 p95 比同环境最近 window 次运行的 p95 中位数高出 threshold 以上
+
+        Args:
+            run_id: 本次运行 id
+            threshold: 上涨比例阈值，默认 Settings.REGRESSION_THRESHOLD（0.3 即 30%）
+            window: 滚动基线取最近几次运行，默认 Settings.REGRESSION_BASELINE_RUNS
+            min_runs: 基线至少需要几次历史数据，默认 Settings.REGRESSION_MIN_RUNS
+            min_ms: 本次 p95 低于该值时忽略（毫秒级抖动不告警），默认 Settings.REGRESSION_MIN_MS
+
+        Returns:
+            按上涨比例降序的 [{"kind", "name", "p95_ms", "baseline_ms", "ratio"}]
+        """
+        threshold = Settings.REGRESSION_THRESHOLD if threshold is None else threshold
+        window = Settings.REGRESSION_BASELINE_RUNS if window is None else window
+        min_runs = Settings.REGRESSION_MIN_RUNS if min_runs is None else min_runs
+        min_ms = Settings.REGRESSION_MIN_MS if min_ms is None else min_ms
+
+        with self._file_lock, closing(self._connect()) as conn:
+            env_row = conn.execute("SELECT env FROM runs WHERE id = ?", (run_id,)).fetchone()
+            if env_row is None:
+                return []
+            baseline_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM runs WHERE env = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (env_row[0], run_id, window),
+            )]
+            current = conn.execute(
+                "SELECT kind, name, p95_ms FROM durations WHERE run_id = ?", (run_id,)
+            ).fetchall()
+            history: Dict[tuple, List[float]] = {}
+            if baseline_ids:
+                placeholders = ",".join("?" * len(baseline_ids))
+                for kind, name, p95 in conn.execute(
+                    f"SELECT kind, name, p95_ms FROM durations WHERE run_id IN ({placeholders})",
+                    baseline_ids,
+                ):
+                    history.setdefault((kind, name), []).append(p95)
+
+        alerts = []
+        for kind, name, p95 in current:
+            samples = history.get((kind, name), [])
+            if len(samples) < min_runs or p95 < min_ms:
+                continue
+            baseline = statistics.median(samples)
+            if baseline > 0 and p95 > baseline * (1 + threshold):
+                alerts.append({
+                    "kind": kind,
+                    "name": name,
+                    "p95_ms": round(p95, 1),
+                    "baseline_ms": round(baseline, 1),
+                    "ratio": round(p95 / baseline - 1, 3),
+                })
+        alerts.sort(key=lambda alert: alert["ratio"], reverse=True)
+        return alerts
@@ -1,16 +1,16 @@
 # ========================================
 # 测试进度管理类
 # ========================================
-# 通过 JSON 文件记录测试执行进度和结果
-# 支持多进程/多线程安全操作
+# 通过 SQLite（WAL 模式）以追加方式记录测试执行进度和结果
+# 每条结果只插入一行（O(1)），统计与用例列表在读取时再汇总
+# 支持多进程（pytest-xdist）/多线程安全操作
 # ========================================
 
-import json
-import os
+import sqlite3
 import threading
+from contextlib import closing
 from datetime import datetime
-from pathlib import Path
-from typing import Tuple, List, Optional, Dict, Any
+from typing import Tuple, List, Optional
 
 from config.settings import Settings
 
@@ -18,23 +18,44 @@ _OUTCOME_PASSED = "passed"
 _OUTCOME_FAILED = "failed"
 _OUTCOME_SKIPPED = "skipped"
 
+# 事件类型：计数（update_*）与用例记录（record_*_testcase）分开存储，读取时各自汇总
+_KIND_COUNT = "count"
+_KIND_CASE = "case"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    nodeid TEXT,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
 
 class ProcessFile:
     """
     测试进度管理类
 
-    使用 JSON 文件存储测试执行进度和结果，支持：
-    - 测试进度跟踪（总数、成功、失败）
-    - 测试用例名称记录
+    使用 SQLite 数据库（logs/test_process.db，WAL 模式）存储测试执行进度和结果，支持：
+    - 测试进度跟踪（总数、成功、失败、跳过）
+    - 测试用例名称记录（同一 nodeid 以最后一次结果为准）
     - 执行时间统计
 
+    写入只追加事件行，多个 xdist worker 并发写入由 SQLite 文件锁保证不丢数据；
+    get_result / get_progress / get_*_testcases 读取时再聚合。
+
     使用方法：
         process = ProcessFile()
         process.init_process(total=10)  # 初始化
         process.update_success()  # 成功+1
         process.record_success_testcase(nodeid, name)  # 按 nodeid 记录展示名
         process.update_fail()  # 失败+1
-        total, success, fail, start_time = process.get_result()  # 获取结果
+        total, success, fail, skip, start_time = process.get_result()  # 获取结果
     """
 
     # 单例实例
@@ -51,7 +72,7 @@ class ProcessFile:
         return cls._instance
 
     def __init__(self):
-        """初始化文件路径"""
+        """初始化数据库路径并建表"""
         if self._initialized:
             return
 
@@ -59,123 +80,124 @@ class ProcessFile:
         self.logs_dir = Settings.PROJECT_ROOT / "logs"
         self.logs_dir.mkdir(parents=True, exist_ok=True)
 
-        # 进度文件路径
-        self.process_file = self.logs_dir / "test_process.json"
-        # 用例记录文件路径
-        self.testcase_file = self.logs_dir / "testcase_records.json"
+        # 进度数据库路径（进度与用例记录同库）
+        self.process_file = self.logs_dir / "test_process.db"
 
-        # 线程锁
+        # 线程锁（进程间互斥由 SQLite 负责）
         self._file_lock = threading.Lock()
 
+        self._ensure_schema()
         self._initialized = True
 
-    def _read_json_file(self, file_path: Path) -> dict:
+    def _connect(self) -> sqlite3.Connection:
         """
-        读取 JSON 文件
+        打开数据库连接
 
-        Args:
-            file_path: 文件路径
+        每次操作独立连接，避免 fork 出的 worker 复用父进程连接；
+        timeout 为其它进程持有写锁时的等待时间（秒）。
+        """
+        conn = sqlite3.connect(str(self.process_file), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
 
-        Returns:
-            JSON 数据字典，文件不存在返回空字典
+    def _ensure_schema(self) -> None:
+        """建表并切换为 WAL 模式（WAL 设置持久化在数据库文件中）"""
+        try:
+            with self._file_lock, closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            print(f"初始化进度数据库失败: {self.process_file}, 错误: {e}")
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        """
+        执行一条写语句
+
+        Args:
+            sql: SQL 语句
+            params: 参数
         """
         try:
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"读取文件失败: {file_path}, 错误: {e}")
-            return {}
-
-    def _write_json_file(self, file_path: Path, data: dict) -> None:
+            with self._file_lock, closing(self._connect()) as conn:
+                conn.execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"写入进度数据库失败: {self.process_file}, 错误: {e}")
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
         """
-        写入 JSON 文件
+        执行一条查询语句
 
         Args:
-            file_path: 文件路径
-            data: 要写入的数据
+            sql: SQL 语句
+            params: 参数
+
+        Returns:
+            查询结果行列表，失败返回空列表
         """
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"写入文件失败: {file_path}, 错误: {e}")
+            with closing(self._connect()) as conn:
+                return conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"读取进度数据库失败: {self.process_file}, 错误: {e}")
+            return []
+
+    def _set_meta(self, key: str, value, overwrite: bool = True) -> None:
+        """写入一项元数据（overwrite=False 时已存在则保留原值）"""
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        self._execute(f"{verb} INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _get_meta(self, key: str, default: str = "") -> str:
+        """读取一项元数据"""
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows and rows[0][0] is not None else default
 
     def reset_all(self) -> None:
-        """清空所有进度数据"""
-        with self._file_lock:
-            # 重置进度数据
-            process_data = {
-                "total": 0,
-                "success": 0,
-                "fail": 0,
-                "skip": 0,
-                "start_time": "",
-                "end_time": "",
-                "running_status": 0
-            }
-            self._write_json_file(self.process_file, process_data)
-
-            # 清空用例记录（按 nodeid 存最终状态，避免重复与成功/失败交叉）
-            self._write_json_file(self.testcase_file, {"case_results": {}})
+        """清空所有进度数据（仅由主进程在会话开始时调用）"""
+        try:
+            with self._file_lock, closing(self._connect()) as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM events")
+                conn.execute("DELETE FROM meta")
+                conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"清空进度数据库失败: {self.process_file}, 错误: {e}")
 
     def init_process(self, total: int) -> None:
         """
         初始化测试进度
 
+        不清空已记录的结果；开始时间只在首次调用时写入（xdist 下每个 worker 都会调用）。
+
         Args:
             total: 测试用例总数
         """
-        with self._file_lock:
-            process_data = {
-                "total": total,
-                "success": 0,
-                "fail": 0,
-                "skip": 0,
-                "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "end_time": "",
-                "running_status": 1
-            }
-            self._write_json_file(self.process_file, process_data)
+        self._set_meta("total", total)
+        self._set_meta("start_time", datetime.now().strftime("%Y-%m-%d %H:%M:%S"), overwrite=False)
+        self._set_meta("running_status", 1)
+
+    def _append_event(self, kind: str, outcome: str,
+                      nodeid: Optional[str] = None, name: Optional[str] = None) -> None:
+        """追加一条事件记录"""
+        self._execute(
+            "INSERT INTO events (kind, outcome, nodeid, name) VALUES (?, ?, ?, ?)",
+            (kind, outcome, nodeid, name),
+        )
 
     def update_success(self) -> None:
         """成功用例数 +1"""
-        with self._file_lock:
-            process_data = self._read_json_file(self.process_file)
-            if not process_data:
-                process_data = {"total": 0, "success": 0, "fail": 0, "skip": 0}
-            process_data["success"] = process_data.get("success", 0) + 1
-            self._write_json_file(self.process_file, process_data)
+        self._append_event(_KIND_COUNT, _OUTCOME_PASSED)
 
     def update_fail(self) -> None:
         """失败用例数 +1"""
-        with self._file_lock:
-            process_data = self._read_json_file(self.process_file)
-            if not process_data:
-                process_data = {"total": 0, "success": 0, "fail": 0, "skip": 0}
-            process_data["fail"] = process_data.get("fail", 0) + 1
-            self._write_json_file(self.process_file, process_data)
+        self._append_event(_KIND_COUNT, _OUTCOME_FAILED)
 
     def update_skip(self) -> None:
         """跳过用例数 +1"""
-        with self._file_lock:
-            process_data = self._read_json_file(self.process_file)
-            if not process_data:
-                process_data = {"total": 0, "success": 0, "fail": 0, "skip": 0}
-            process_data["skip"] = process_data.get("skip", 0) + 1
-            self._write_json_file(self.process_file, process_data)
+        self._append_event(_KIND_COUNT, _OUTCOME_SKIPPED)
 
     def _merge_case_result(self, nodeid: str, testcase_name: str, outcome: str) -> None:
-        """同一 nodeid 后写入的结果覆盖先前结果（兼容失败重跑等场景）。"""
-        with self._file_lock:
-            testcase_data = self._read_json_file(self.testcase_file)
-            case_results: Dict[str, Any] = testcase_data.get("case_results", {})
-            if not isinstance(case_results, dict):
-                case_results = {}
-            case_results[nodeid] = {"outcome": outcome, "name": testcase_name}
-            testcase_data["case_results"] = case_results
-            self._write_json_file(self.testcase_file, testcase_data)
+        """同一 nodeid 后写入的结果覆盖先前结果（兼容失败重跑等场景），覆盖在读取时完成。"""
+        self._append_event(_KIND_CASE, outcome, nodeid, testcase_name)
 
     def record_success_testcase(self, nodeid: str, testcase_name: str) -> None:
         """
@@ -214,12 +236,15 @@ class ProcessFile:
         Returns:
             (总数, 成功数, 失败数, 跳过数, 开始时间)
         """
-        process_data = self._read_json_file(self.process_file)
-        total = process_data.get("total", 0)
-        success = process_data.get("success", 0)
-        fail = process_data.get("fail", 0)
-        skip = process_data.get("skip", 0)
-        start_time = process_data.get("start_time", "-")
+        counts = dict(self._query(
+            "SELECT outcome, COUNT(*) FROM events WHERE kind = ? GROUP BY outcome",
+            (_KIND_COUNT,),
+        ))
+        total = int(self._get_meta("total", "0") or 0)
+        success = counts.get(_OUTCOME_PASSED, 0)
+        fail = counts.get(_OUTCOME_FAILED, 0)
+        skip = counts.get(_OUTCOME_SKIPPED, 0)
+        start_time = self._get_meta("start_time", "-") or "-"
         return total, success, fail, skip, start_time
 
     def get_progress(self) -> str:
@@ -235,56 +260,36 @@ class ProcessFile:
         percentage = (success + fail + skip) / total * 100
         return f"{percentage:.1f}%"
 
-    def _case_results_map(self) -> Dict[str, Any]:
-        testcase_data = self._read_json_file(self.testcase_file)
-        raw = testcase_data.get("case_results", {})
-        if isinstance(raw, dict) and raw:
-            return raw
-        return {}
+    def _testcases_by_outcome(self, outcome: str) -> List[str]:
+        """
+        获取指定结果的用例展示名列表
+
+        每个 nodeid 只取最后一条记录，再按结果过滤，按 nodeid 排序。
+        """
+        rows = self._query(
+            "SELECT e.name FROM events e "
+            "JOIN (SELECT MAX(id) AS id FROM events WHERE kind = ? GROUP BY nodeid) last "
+            "ON e.id = last.id WHERE e.outcome = ? ORDER BY e.nodeid",
+            (_KIND_CASE, outcome),
+        )
+        return [str(row[0] or "") for row in rows]
 
     def get_success_testcases(self) -> List[str]:
         """获取成功用例展示名列表（每个 nodeid 至多一条，按 nodeid 排序）。"""
-        m = self._case_results_map()
-        if m:
-            return [
-                str(v.get("name", ""))
-                for _, v in sorted(m.items())
-                if v.get("outcome") == _OUTCOME_PASSED
-            ]
-        data = self._read_json_file(self.testcase_file)
-        return list(data.get("success_testcases", []))
+        return self._testcases_by_outcome(_OUTCOME_PASSED)
 
     def get_failed_testcases(self) -> List[str]:
         """获取失败用例展示名列表（每个 nodeid 至多一条，按 nodeid 排序）。"""
-        m = self._case_results_map()
-        if m:
-            return [
-                str(v.get("name", ""))
-                for _, v in sorted(m.items())
-                if v.get("outcome") == _OUTCOME_FAILED
-            ]
-        data = self._read_json_file(self.testcase_file)
-        return list(data.get("failed_testcases", []))
+        return self._testcases_by_outcome(_OUTCOME_FAILED)
 
     def get_skipped_testcases(self) -> List[str]:
         """获取跳过用例展示名列表（每个 nodeid 至多一条，按 nodeid 排序）。"""
-        m = self._case_results_map()
-        if m:
-            return [
-                str(v.get("name", ""))
-                for _, v in sorted(m.items())
-                if v.get("outcome") == _OUTCOME_SKIPPED
-            ]
-        data = self._read_json_file(self.testcase_file)
-        return list(data.get("skipped_testcases", []))
+        return self._testcases_by_outcome(_OUTCOME_SKIPPED)
 
     def write_end_time(self) -> None:
         """记录测试结束时间"""
-        with self._file_lock:
-            process_data = self._read_json_file(self.process_file)
-            process_data["end_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            process_data["running_status"] = 0
-            self._write_json_file(self.process_file, process_data)
+        self._set_meta("end_time", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self._set_meta("running_status", 0)
 
     def get_duration(self) -> str:
         """
@@ -293,9 +298,8 @@ class ProcessFile:
         Returns:
             格式化的耗时字符串，如 "1小时2分3秒"
         """
-        process_data = self._read_json_file(self.process_file)
-        start_time_str = process_data.get("start_time", "")
-        end_time_str = process_data.get("end_time", "")
+        start_time_str = self._get_meta("start_time")
+        end_time_str = self._get_meta("end_time")
 
         if not start_time_str or not end_time_str:
             return "未知"
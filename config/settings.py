@@ -8,8 +8,11 @@
 # - 运行配置（并行数、重试次数等）
 # ========================================
 
+import hashlib
 import os
+import re
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 # 加载 .env 环境变量文件
@@ -49,12 +52,59 @@ class Settings:
     # BROWSER_TYPE / SLOW_MO: 可由命令行 --browser、--slowmo 覆盖
     BROWSER_TYPE = os.getenv("BROWSER", "chromium")
     # 每个操作后的延迟（毫秒），0=不延迟；调大可放慢执行便于观察（如 100、300）（操作延迟）
-    SLOW_MO = int(os.getenv("SLOW_MO", "200"))
+    # 需要观察执行过程时使用 --profile=debug（SLOW_MO=200）
+    SLOW_MO = int(os.getenv("SLOW_MO", "0"))
+
+    # DISABLE_ANIMATIONS: 是否向页面注入禁用 CSS 过渡/动画的样式（Element-UI 弹窗、下拉等不再等待动画）
+    DISABLE_ANIMATIONS = os.getenv("DISABLE_ANIMATIONS", "false").lower() == "true"
 
     # 视口（浏览器窗口）大小配置
     VIEWPORT_WIDTH = int(os.getenv("VIEWPORT_WIDTH", "1920"))
     VIEWPORT_HEIGHT = int(os.getenv("VIEWPORT_HEIGHT", "1080"))
 
+    # ==================== 执行档位 ====================
+    # PROFILE: 执行档位（debug / ci / fast），也可用命令行 --profile 指定，为空时使用各项默认值
+    # 档位只覆盖未在环境变量/.env 中显式设置的配置项
+    PROFILE = os.getenv("PROFILE", "")
+    PROFILES = {
+        # 本地调试：有头、放慢操作、保留动画、整页 png 截图，失败保留 trace
+        "debug": {
+            "HEADLESS": False,
+            "SLOW_MO": 200,
+            "DISABLE_ANIMATIONS": False,
+            "DEFAULT_TIMEOUT": 30000,
+            "NAVIGATION_TIMEOUT": 30000,
+            "EXPECT_TIMEOUT": 10000,
+            "SCREENSHOT_FORMAT": "png",
+            "SCREENSHOT_FULL_PAGE": True,
+            "TRACE_MODE": "retain-on-failure",
+        },
+        # 流水线：无头、不放慢、禁用动画，超时与默认一致，jpeg 整页截图，失败保留 trace
+        "ci": {
+            "HEADLESS": True,
+            "SLOW_MO": 0,
+            "DISABLE_ANIMATIONS": True,
+            "DEFAULT_TIMEOUT": 30000,
+            "NAVIGATION_TIMEOUT": 30000,
+            "EXPECT_TIMEOUT": 10000,
+            "SCREENSHOT_FORMAT": "jpeg",
+            "SCREENSHOT_FULL_PAGE": True,
+            "TRACE_MODE": "retain-on-failure",
+        },
+        # 快速冒烟：无头、禁用动画、收紧超时，只截可视区域，不录 trace
+        "fast": {
+            "HEADLESS": True,
+            "SLOW_MO": 0,
+            "DISABLE_ANIMATIONS": True,
+            "DEFAULT_TIMEOUT": 15000,
+            "NAVIGATION_TIMEOUT": 20000,
+            "EXPECT_TIMEOUT": 8000,
+            "SCREENSHOT_FORMAT": "jpeg",
+            "SCREENSHOT_FULL_PAGE": False,
+            "TRACE_MODE": "off",
+        },
+    }
+
     # ==================== 环境配置 ====================
     # ENV: 当前运行环境（从环境变量读取，未设置时使用 prod；配置加载以 ENV_CONFIG_FILE 为准）
     ENV = os.getenv("ENV", "prod")
@@ -74,6 +124,34 @@ class Settings:
     # 用于 expect() 断言等待条件满足
     EXPECT_TIMEOUT = int(os.getenv("EXPECT_TIMEOUT", "10000"))
 
+    # READY_QUIET_MS: 页面就绪等待中「DOM 无变化」的持续时间
+    # 用于 BasePage.wait_until_ready()，替代点击菜单/切换 tab 后的固定等待
+    READY_QUIET_MS = int(os.getenv("READY_QUIET_MS", "200"))
+    # READY_QUIET_TIMEOUT_MS: 等待「DOM 无变化」的最长时间，与加载遮罩的超时分开
+    # 页面持续变化（轮播、计时器）时最多等这么久就继续，避免每次都等满 DEFAULT_TIMEOUT
+    READY_QUIET_TIMEOUT_MS = int(os.getenv("READY_QUIET_TIMEOUT_MS", "2000"))
+
+    # ==================== 请求跟踪配置 ====================
+    # 用于 BasePage.wait_for_requests_settled()，替代 networkidle
+    # REQUEST_TRACKER_TYPES: 跟踪的资源类型（逗号分隔），图片、字体等静态资源不影响就绪判断
+    REQUEST_TRACKER_TYPES = os.getenv("REQUEST_TRACKER_TYPES", "document,xhr,fetch")
+    # REQUEST_TRACKER_INCLUDE: 只跟踪匹配的 URL（逗号分隔，URL 片段或 glob），为空时不限
+    REQUEST_TRACKER_INCLUDE = os.getenv("REQUEST_TRACKER_INCLUDE", "")
+    # REQUEST_TRACKER_EXCLUDE: 不跟踪的 URL（逗号分隔，如消息轮询、埋点上报接口）
+    REQUEST_TRACKER_EXCLUDE = os.getenv("REQUEST_TRACKER_EXCLUDE", "")
+    # REQUEST_QUIET_MS: 匹配的请求全部结束后需要保持无新请求的时长（毫秒）
+    REQUEST_QUIET_MS = int(os.getenv("REQUEST_QUIET_MS", "300"))
+    # REQUEST_LONG_POLL_MS: 挂起超过该时长的请求视为长轮询/长连接，不再等待（毫秒，0 表示不忽略）
+    REQUEST_LONG_POLL_MS = int(os.getenv("REQUEST_LONG_POLL_MS", "10000"))
+
+    # ==================== 请求拦截配置 ====================
+    # 拦截规则在环境配置 config/environments/*.yaml 的 request_routing 节点中定义
+    # REQUEST_ROUTING: 总开关，false 时忽略环境配置中的拦截规则（排查页面问题时使用）
+    REQUEST_ROUTING = os.getenv("REQUEST_ROUTING", "true").lower() == "true"
+    # REQUEST_ROUTING_MEASURE: 用例结束时是否对被中断且大小未知的资源发 HEAD（带浏览器 Cookie）统计节省的字节数
+    # 默认关闭：会重新访问被拦截的地址；stub 的请求（埋点等）从不重新访问（环境配置 measure_bytes 优先）
+    REQUEST_ROUTING_MEASURE = os.getenv("REQUEST_ROUTING_MEASURE", "false").lower() == "true"
+
     # ==================== 项目路径配置 ====================
     # PROJECT_ROOT: 项目根目录的绝对路径
     # 使用 Path(__file__).parent.parent 获取当前文件的上两级目录
@@ -85,6 +163,7 @@ class Settings:
     SCREENSHOTS_DIR = PROJECT_ROOT / "screenshots"  # 失败截图目录
     VIDEOS_DIR = PROJECT_ROOT / "videos"            # 录屏文件目录
     HAR_DIR = PROJECT_ROOT / "har"                  # HAR网络日志目录
+    TRACES_DIR = PROJECT_ROOT / "traces"            # Playwright trace 目录（按用例分子目录）
     DATA_DIR = PROJECT_ROOT / "data"                # 测试数据目录
 
     # ==================== 运行配置 ====================
@@ -93,6 +172,34 @@ class Settings:
     WORKERS = int(os.getenv("WORKERS", "1"))
     RETRIES = int(os.getenv("RETRIES", "1"))
 
+    # ACTION_TIMING: 是否统计 BasePage 每个操作的耗时（会话结束导出到 logs/action_timing.*）
+    ACTION_TIMING = os.getenv("ACTION_TIMING", "true").lower() == "true"
+    # ACTION_TIMING_SPLIT_WAIT: 操作前是否单独等待元素可见，把「等待可操作」耗时单独统计（默认关闭）
+    # 开启后每个操作多一次 wait_for 往返，最长等待变为两倍超时，且隐藏元素的 check/fill 会先等待可见
+    # 关闭时操作记录的 wait_ms 为空（未测量），只有 wait_for_* 类操作记录等待耗时
+    ACTION_TIMING_SPLIT_WAIT = os.getenv("ACTION_TIMING_SPLIT_WAIT", "false").lower() == "true"
+    # ACTION_TIMING_EXPORT: 导出格式，逗号分隔的 json / csv
+    ACTION_TIMING_EXPORT = os.getenv("ACTION_TIMING_EXPORT", "json,csv")
+    # PERF_REPORT_TOP_N: 终端汇总与钉钉报告中最慢用例/步骤/定位器各列出前几名（0 表示不输出）
+    PERF_REPORT_TOP_N = int(os.getenv("PERF_REPORT_TOP_N", "5"))
+
+    # DURATION_HISTORY: 是否把每次运行的用例/步骤耗时写入 logs/duration_history.db 并检测耗时回归
+    DURATION_HISTORY = os.getenv("DURATION_HISTORY", "true").lower() == "true"
+    # DURATION_HISTORY_KEEP_RUNS: 每个环境保留最近多少次运行（0 表示不清理）
+    DURATION_HISTORY_KEEP_RUNS = int(os.getenv("DURATION_HISTORY_KEEP_RUNS", "200"))
+    # REGRESSION_THRESHOLD: p95 比滚动基线（最近 REGRESSION_BASELINE_RUNS 次运行的 p95 中位数）高出该比例即告警
+    REGRESSION_THRESHOLD = float(os.getenv("REGRESSION_THRESHOLD", "0.3"))
+    REGRESSION_BASELINE_RUNS = int(os.getenv("REGRESSION_BASELINE_RUNS", "10"))
+    # REGRESSION_MIN_RUNS: 基线至少需要的历史运行次数；REGRESSION_MIN_MS: p95 低于该毫秒数不告警（过滤抖动）
+    REGRESSION_MIN_RUNS = int(os.getenv("REGRESSION_MIN_RUNS", "3"))
+    REGRESSION_MIN_MS = float(os.getenv("REGRESSION_MIN_MS", "1000"))
+
+    # DEPENDENCY_WAIT_TIMEOUT: 用例等待前置依赖（run(depends_on=[...])）完成的最长时间（秒）
+    DEPENDENCY_WAIT_TIMEOUT = int(os.getenv("DEPENDENCY_WAIT_TIMEOUT", "3600"))
+
+    # DURATION_SCHEDULING: xdist 依赖调度时是否按历史耗时（logs/duration_history.db）让长用例优先
+    DURATION_SCHEDULING = os.getenv("DURATION_SCHEDULING", "true").lower() == "true"
+
     # ==================== 录制配置 ====================
     # RECORD_VIDEO: 是否录制测试视频
     # 建议仅在失败时录制以节省空间
@@ -102,9 +209,93 @@ class Settings:
     # HAR文件可用于分析网络问题
     RECORD_HAR = os.getenv("RECORD_HAR", "false").lower() == "true"
 
+    # ARTIFACT_PATH_TEMPLATE: 视频/HAR 按用例区分的相对路径模板（xdist 下各 worker 互不覆盖）
+    # 可用占位符：{worker}（xdist worker id，单进程为 master）、{test}（由 nodeid 生成的安全文件名）
+    ARTIFACT_PATH_TEMPLATE = os.getenv("ARTIFACT_PATH_TEMPLATE", "{worker}/{test}")
+
+    # HAR_CONTENT: 响应体记录方式 omit（不记录，最小）/ attach（单独文件，HAR 打包为 .zip）/ embed（内嵌 base64）
+    HAR_CONTENT = os.getenv("HAR_CONTENT", "omit").lower()
+    # HAR_URL_FILTER: 只记录匹配的请求，glob（如 **/api/**）；以 re: 开头按正则处理；为空记录全部
+    HAR_URL_FILTER = os.getenv("HAR_URL_FILTER", "")
+
+    # TRACE_MODE: Playwright trace 录制模式（off / on / retain-on-failure）
+    # 开启后每个用例的上下文都会记录 trace（含截图与 DOM 快照），
+    # retain-on-failure 只保留失败用例的 trace.zip（TRACES_DIR/<用例>/trace.zip，并附加到 Allure），
+    # 排查问题比常开 RECORD_VIDEO/RECORD_HAR 更省资源；可由命令行 --tracing 覆盖
+    TRACE_MODE = os.getenv("TRACE_MODE", "off").lower()
+
     # SCREENSHOT_ON_FAILURE: 失败时是否自动截图
     SCREENSHOT_ON_FAILURE = os.getenv("SCREENSHOT_ON_FAILURE", "true").lower() == "true"
 
+    # SCREENSHOT_ASYNC: 截图是否后台写盘（Allure 附件始终在调用线程立即挂到当前步骤，只有写文件在后台；
+    # false 时在调用线程同步写盘，便于排查）
+    SCREENSHOT_ASYNC = os.getenv("SCREENSHOT_ASYNC", "true").lower() == "true"
+
+    # SCREENSHOT_FORMAT: 截图格式 png / jpeg / webp；SCREENSHOT_QUALITY: jpeg/webp 质量（1-100）
+    # （screenshots/ 下的文件与 Allure 附件都按该格式保存）
+    SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "png").lower()
+    SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+    # SCREENSHOT_FULL_PAGE: take_screenshot 与失败截图是否截整页，false 只截可视区域
+    SCREENSHOT_FULL_PAGE = os.getenv("SCREENSHOT_FULL_PAGE", "true").lower() == "true"
+    # SCREENSHOT_MAX_DIMENSION: 截图长边上限（像素），超出等比缩小（文件与 Allure 附件一致）；0 表示不缩放
+    SCREENSHOT_MAX_DIMENSION = int(os.getenv("SCREENSHOT_MAX_DIMENSION", "0"))
+    # SCREENSHOT_DEDUP: 内容完全相同的截图只保存一份，后续引用已有文件
+    SCREENSHOT_DEDUP = os.getenv("SCREENSHOT_DEDUP", "true").lower() == "true"
+    # SCREENSHOT_MAX_COUNT / SCREENSHOT_MAX_SIZE_MB: 每个进程本次运行保留的截图数量/总体积上限，
+    # 超出时删除最早的截图（已附加到 Allure 的副本不受影响）；0 表示不限制
+    SCREENSHOT_MAX_COUNT = int(os.getenv("SCREENSHOT_MAX_COUNT", "0"))
+    SCREENSHOT_MAX_SIZE_MB = int(os.getenv("SCREENSHOT_MAX_SIZE_MB", "0"))
+
+    # ==================== 图像识别配置 ====================
+    # IMAGE_CACHE_SIZE: ImageRecognition 按路径加载图片的 LRU 缓存条数（0 表示不缓存）
+    IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "32"))
+    # IMAGE_HASH_CACHE_SIZE: ImageRecognition 按路径计算的感知哈希的 LRU 缓存条数（0 表示不缓存）
+    IMAGE_HASH_CACHE_SIZE = int(os.getenv("IMAGE_HASH_CACHE_SIZE", "1024"))
+
+    # VISUAL_BASELINE_DIR: 视觉回归基准图目录（按 用例/步骤.png 存放，含 index.json 哈希索引）
+    VISUAL_BASELINE_DIR = Path(os.getenv("VISUAL_BASELINE_DIR", str(PROJECT_ROOT / "tests" / "baseline")))
+    # UPDATE_BASELINE: 为 true 时用本次截图覆盖基准图（UI 有意改版后执行一次）
+    UPDATE_BASELINE = os.getenv("UPDATE_BASELINE", "false").lower() == "true"
+
+    # ==================== 认证配置 ====================
+    # AUTH_POOL_ENABLED: 是否启用会话级认证状态池
+    # 启用后同一 (用户名, 学校, 角色) 在一次 pytest 会话内只登录一次，后续用例直接复用 storage_state
+    AUTH_POOL_ENABLED = os.getenv("AUTH_POOL_ENABLED", "true").lower() == "true"
+
+    @classmethod
+    def apply_profile(cls, name: Optional[str] = None) -> dict:
+        """
+        应用执行档位
+
+        档位中的配置项只有在环境变量（含 .env）未显式设置时才生效，
+        因此 .env 里写的 HEADLESS=false 等个人习惯不会被档位覆盖。
+
+        Args:
+            name: 档位名（debug / ci / fast），默认 Settings.PROFILE；为空时不做任何修改
+
+        Returns:
+            dict: 实际生效的配置项
+
+        Raises:
+            ValueError: 档位名不存在
+
+        使用方法：
+            Settings.apply_profile("fast")
+        """
+        name = (cls.PROFILE if name is None else name or "").strip().lower()
+        if not name:
+            return {}
+        if name not in cls.PROFILES:
+            raise ValueError(f"未知的执行档位: {name}，可选: {', '.join(cls.PROFILES)}")
+        applied = {}
+        for key, value in cls.PROFILES[name].items():
+            if key in os.environ:
+                continue
+            setattr(cls, key, value)
+            applied[key] = value
+        cls.PROFILE = name
+        return applied
+
     @classmethod
     def ensure_dirs(cls):
         """
@@ -146,12 +337,81 @@ class Settings:
         }
 
     @classmethod
-    def get_context_args(cls) -> dict:
+    def artifact_path(cls, base_dir: Path, nodeid: str, suffix: str = "") -> Path:
+        """
+        按 ARTIFACT_PATH_TEMPLATE 生成用例级产物路径
+
+        Args:
+            base_dir: 产物根目录，如 VIDEOS_DIR、HAR_DIR
+            nodeid: pytest 用例 nodeid
+            suffix: 文件后缀（如 ".har"），目录传空字符串
+
+        Returns:
+            Path: 如 har/gw0/tests_gqtest_test_004_create_major.py_TestX_test_y_chromium.har
+
+        使用方法：
+            har_path = Settings.artifact_path(Settings.HAR_DIR, request.node.nodeid, ".har")
+        """
+        worker = os.getenv("PYTEST_XDIST_WORKER", "master")
+        test = re.sub(r"[^\w.-]+", "_", nodeid).strip("_") or "test"
+        if len(test) > 120:
+            # 过长的参数化 nodeid 截断后加摘要，避免超出文件名长度限制
+            test = f"{test[:100]}_{hashlib.sha1(nodeid.encode('utf-8')).hexdigest()[:8]}"
+        relative = cls.ARTIFACT_PATH_TEMPLATE.format(worker=worker, test=test)
+        return base_dir / f"{relative}{suffix}"
+
+    @classmethod
+    def get_recording_args(cls, nodeid: str) -> dict:
+        """
+        获取用例级录制参数（视频目录、HAR 路径及内容模式）
+
+        路径按 worker 与 nodeid 区分，并行时不会互相覆盖；未开启录制时返回空字典。
+
+        Args:
+            nodeid: pytest 用例 nodeid
+
+        Returns:
+            dict: 可传给 browser.new_context() 的 record_video_* / record_har_* 参数
+
+        使用方法：
+            context = browser.new_context(**Settings.get_context_args(), **Settings.get_recording_args(nodeid))
+        """
+        args = {}
+
+        # 如果启用了视频录制，每个用例一个目录
+        if cls.RECORD_VIDEO:
+            args["record_video_dir"] = str(cls.artifact_path(cls.VIDEOS_DIR, nodeid))
+            args["record_video_size"] = {
+                "width": cls.VIEWPORT_WIDTH,
+                "height": cls.VIEWPORT_HEIGHT
+            }
+
+        # 如果启用了HAR录制，每个用例一个文件；attach 模式下响应体与 HAR 一起打包为 zip
+        if cls.RECORD_HAR:
+            content = cls.HAR_CONTENT if cls.HAR_CONTENT in ("omit", "attach", "embed") else "omit"
+            suffix = ".zip" if content == "attach" else ".har"
+            har_path = cls.artifact_path(cls.HAR_DIR, nodeid, suffix)
+            har_path.parent.mkdir(parents=True, exist_ok=True)
+            args["record_har_path"] = str(har_path)
+            args["record_har_content"] = content
+            if cls.HAR_URL_FILTER:
+                url_filter = cls.HAR_URL_FILTER
+                args["record_har_url_filter"] = (
+                    re.compile(url_filter[3:]) if url_filter.startswith("re:") else url_filter
+                )
+
+        return args
+
+    @classmethod
+    def get_context_args(cls, nodeid: Optional[str] = None) -> dict:
         """
         获取浏览器上下文参数
 
         返回用于 browser.new_context() 的参数字典。
-        包含视口大小、录制配置等。
+        包含视口大小；传入 nodeid 时附加该用例的录制配置（见 get_recording_args）。
+
+        Args:
+            nodeid: pytest 用例 nodeid，为 None 时不包含录制参数
 
         Returns:
             dict: 包含 viewport、record_video_dir 等上下文参数的字典
@@ -166,17 +426,9 @@ class Settings:
                 "height": cls.VIEWPORT_HEIGHT
             },
         }
-
-        # 如果启用了视频录制，添加录制目录配置
-        if cls.RECORD_VIDEO:
-            args["record_video_dir"] = str(cls.VIDEOS_DIR)
-            args["record_video_size"] = {
-                "width": cls.VIEWPORT_WIDTH,
-                "height": cls.VIEWPORT_HEIGHT
-            }
-
-        # 如果启用了HAR录制，添加HAR路径配置
-        if cls.RECORD_HAR:
-            args["record_har_path"] = str(cls.HAR_DIR / "network.har")
-
+        # 禁用动画时同时声明减少动态效果（遵循 prefers-reduced-motion 的页面会直接关闭动画）
+        if cls.DISABLE_ANIMATIONS:
+            args["reduced_motion"] = "reduce"
+        if nodeid:
+            args.update(cls.get_recording_args(nodeid))
         return args
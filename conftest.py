@@ -10,11 +10,16 @@
 # 3. Allure 报告集成
 # 4. 测试数据加载
 # 5. 测试进度统计和汇总报告
+# 6. 用例依赖调度（run(depends_on=[...])，xdist 下按依赖图分发）
+# 7. 页面操作耗时统计（会话结束导出 logs/action_timing.json/csv）
+# 8. 耗时历史与回归告警（logs/duration_history.db）
+# 9. 请求拦截（环境配置 request_routing，按用例记录节省的流量）
 # ========================================
 
 import pytest
 import os
 import shutil
+import time
 import allure
 from datetime import datetime
 from pathlib import Path
@@ -26,16 +31,21 @@ from playwright.sync_api import Page
 from config.settings import Settings
 from config.env_config import EnvConfig
 from utils.logger import Logger
-from utils.screenshot_helper import ScreenshotHelper, ConsoleLogCollector
+from utils.screenshot_helper import ScreenshotHelper, ConsoleLogCollector, screenshot_writer
 from utils.allure_helper import AllureHelper
 from utils.data_loader import DataLoader
 from utils.dingtalk_notification import send_dingtalk_report
+from utils.request_router import RequestRouter
 from common.process_file import ProcessFile
+from common.dependency import DependencyState, DependencyScheduling, sort_items_by_dependency, item_final_outcome
+from common.action_timing import action_timer
+from common.duration_history import DurationHistory
 
 
 # ==================== 全局实例 ====================
 logger = Logger("conftest")
 process = ProcessFile()
+dependency_state = DependencyState()
 _report_printed = False  # 防止报告重复打印
 _viewport_logged = False  # 视口是否已打印（仅首次测试前打印一次）
 
@@ -82,7 +92,7 @@ def _report_display_name(rep: object) -> str:
 def _summary_from_terminal_reporter(terminalreporter) -> dict:
     """
     用 TerminalReporter 统计本次 pytest 会话（与 short summary 同源，xdist 下为主进程汇总后结果）。
-    不依赖 logs/test_process.json，避免 worker 与主进程各写各的导致汇总混入历史。
+    不依赖 logs/test_process.db，避免 worker 与主进程各写各的导致汇总混入历史。
     """
     tr = terminalreporter
     stats: dict = getattr(tr, "stats", {}) or {}
@@ -128,6 +138,75 @@ def _summary_from_terminal_reporter(terminalreporter) -> dict:
     }
 
 
+def _test_durations_from_terminal_reporter(terminalreporter) -> dict:
+    """
+    从 TerminalReporter 汇总每个用例 setup+call+teardown 的耗时
+
+    xdist 下主进程收到的是所有 worker 的报告，结果已合并；setup 中等待前置用例的时间不计入。
+
+    Returns:
+        {nodeid: (展示用名称, 耗时秒数, 是否通过)}；通过指 call 阶段通过且 setup/teardown 均未失败，
+        跳过（含前置未通过被阻断）、失败、超时的用例耗时不代表正常执行时长
+    """
+    durations: dict = {}
+    names: dict = {}
+    call_passed: set = set()
+    errored: set = set()
+    for reports in (getattr(terminalreporter, "stats", {}) or {}).values():
+        for rep in reports:
+            nodeid = getattr(rep, "nodeid", None)
+            when = getattr(rep, "when", None)
+            if not nodeid or when not in ("setup", "call", "teardown"):
+                continue
+            seconds = float(getattr(rep, "duration", 0.0) or 0.0)
+            if when == "setup":
+                # 扣除 setup 阶段等待前置用例的时间（pytest_runtest_setup 中记录）
+                seconds -= float(dict(getattr(rep, "user_properties", []) or []).get("dependency_wait_s", 0.0))
+            durations[nodeid] = durations.get(nodeid, 0.0) + max(seconds, 0.0)
+            if when == "call" or nodeid not in names:
+                names[nodeid] = _report_display_name(rep)
+            if when == "call" and getattr(rep, "passed", False):
+                call_passed.add(nodeid)
+            elif getattr(rep, "failed", False):
+                errored.add(nodeid)
+    return {
+        nodeid: (names[nodeid], seconds, nodeid in call_passed and nodeid not in errored)
+        for nodeid, seconds in durations.items()
+    }
+
+
+def _regression_report_lines(alerts: list, names: dict) -> list:
+    """把 DurationHistory.regressions() 的告警格式化为终端汇总行（names: nodeid -> 展示名）"""
+    lines = [" " * 25 + "【耗时回归告警】" + " " * 25, "-" * 80]
+    for idx, alert in enumerate(alerts, 1):
+        kind = "用例" if alert["kind"] == "test" else "步骤"
+        name = names.get(alert["name"], alert["name"])
+        lines.append(
+            f"  ⚠️  {idx:>2}. [{kind}] p95 {alert['p95_ms'] / 1000:.2f}s，"
+            f"基线 {alert['baseline_ms'] / 1000:.2f}s（+{alert['ratio'] * 100:.0f}%）  {name}"
+        )
+    lines.extend(["-" * 80, ""])
+    return lines
+
+
+def _performance_report_lines(perf: dict) -> list:
+    """把 ActionTimer.performance_summary() 的结果格式化为终端汇总行"""
+    lines = [" " * 25 + "【性能统计】" + " " * 25, "-" * 80]
+    if perf["tests"]:
+        lines.append("  🐢 最慢用例:")
+        for idx, (name, seconds) in enumerate(perf["tests"], 1):
+            lines.append(f"    {idx:>2}. {seconds:>8.2f}s  {name}")
+    for key, title in (("steps", "最慢步骤"), ("locators", "最慢定位器")):
+        if perf[key]:
+            lines.append(f"  🐢 {title}（p50 / p95 / 次数）:")
+            for idx, row in enumerate(perf[key], 1):
+                lines.append(
+                    f"    {idx:>2}. {row['p50_ms']:>8.0f}ms / {row['p95_ms']:>8.0f}ms / {row['count']:>4}  {row['name']}"
+                )
+    lines.extend(["-" * 80, ""])
+    return lines
+
+
 # ==================== pytest 钩子函数 ====================
 
 def pytest_addoption(parser):
@@ -142,6 +221,7 @@ def pytest_addoption(parser):
         pytest --config=config/environments/gqkt/education/local.yaml tests/
         pytest --base-url-override=https://example.com
         pytest tests/ykt/ --config=config/environments/ykt/prod.yaml
+        pytest tests/ --profile=ci -n auto
     """
     # 直接指定配置文件路径（支持任意目录层级，优先级高于 --env）
     parser.addoption(
@@ -182,6 +262,24 @@ def pytest_addoption(parser):
         help="覆盖环境配置中的 ykt_config_file，路径相对于 data/，如 ykt/prod_config.yaml",
     )
 
+    # 执行档位：一次性切换 SLOW_MO、有头/无头、动画、超时、截图与 trace 策略
+    parser.addoption(
+        "--profile",
+        action="store",
+        default=None,
+        choices=sorted(Settings.PROFILES),
+        help="执行档位: debug（有头+慢速）/ ci（无头+禁用动画）/ fast（无头+禁用动画+收紧超时）；"
+             "只覆盖未在环境变量/.env 中显式设置的配置",
+    )
+
+    # xdist 依赖调度（-n 时默认启用，按 run(depends_on=[...]) 分发就绪用例）
+    parser.addoption(
+        "--no-dependency-scheduling",
+        action="store_true",
+        default=False,
+        help="xdist 并行时不使用依赖调度，回退到 pytest-xdist 默认的 load 分发",
+    )
+
 
 def pytest_configure(config):
     """
@@ -207,6 +305,16 @@ def pytest_configure(config):
             Settings.ENV = env_opt
             logger.info(f"使用命令行指定的环境: {env_opt}")
 
+    # 执行档位（--profile 优先于 PROFILE 环境变量），需在读取其它 Settings 之前应用
+    profile = config.getoption("--profile", default=None) or Settings.PROFILE
+    if profile:
+        applied = Settings.apply_profile(profile)
+        if not hasattr(config, "workerinput"):
+            logger.info(f"执行档位: {profile}，生效配置: {applied}")
+
+    # Playwright trace：命令行未指定 --tracing 时使用 Settings.TRACE_MODE
+    _apply_trace_mode(config)
+
     # 检查是否只是收集测试用例
     if hasattr(config, 'option') and hasattr(config.option, 'collectonly'):
         if config.option.collectonly:
@@ -219,6 +327,16 @@ def pytest_configure(config):
     # 确保所有输出目录存在
     Settings.ensure_dirs()
 
+    # 清空上次运行的用例依赖状态与进度记录（仅主进程；worker 启动时主进程已清空）
+    if not hasattr(config, "workerinput"):
+        dependency_state.reset()
+        process.reset_all()
+        action_timer.reset()
+
+    # 每个进程都统计 allure.step 耗时（与页面操作耗时一起在会话结束时合并）
+    if Settings.ACTION_TIMING:
+        action_timer.install_step_hooks()
+
     # 清理并重建报告目录（UIreport）
     reports_dir = Settings.REPORTS_DIR
     if reports_dir.exists():
@@ -241,16 +359,58 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "search: 搜索相关测试")
     config.addinivalue_line("markers", "skip_local: 本地环境跳过")
     config.addinivalue_line("markers", "skip_remote: 远程环境跳过")
-    config.addinivalue_line("markers", "run(order): 指定用例执行顺序")
+    config.addinivalue_line("markers", "run(order, depends_on, name): 指定用例执行顺序与前置依赖")
     config.addinivalue_line("markers", "skip_prod: 生产环境跳过")
 
 
+_TRACE_MODES = ("off", "on", "retain-on-failure")
+
+
+def _apply_trace_mode(config) -> None:
+    """
+    把 Settings.TRACE_MODE 映射到 pytest-playwright 的 --tracing / --output
+
+    pytest-playwright 负责在每个用例的上下文上启动 context.tracing（screenshots/snapshots），
+    并按模式保留 trace.zip 到 --output/<用例>/ 目录；命令行显式传入 --tracing 时以命令行为准。
+    """
+    if not hasattr(config.option, "tracing"):
+        return
+    mode = Settings.TRACE_MODE
+    if mode not in _TRACE_MODES:
+        logger.warning(f"未知的 TRACE_MODE: {mode}，可选值: {'/'.join(_TRACE_MODES)}，按 off 处理")
+        return
+    if config.option.tracing == "off" and mode != "off":
+        config.option.tracing = mode
+    # 未指定 --output 时把 trace 等产物放到 Settings.TRACES_DIR（默认为 test-results）
+    if getattr(config.option, "output", None) == "test-results":
+        config.option.output = str(Settings.TRACES_DIR)
+
+
+def _attach_traces(recorder) -> None:
+    """
+    把 pytest-playwright 为该用例保留下来的 trace.zip 附加到 Allure（retain-on-failure 时失败才会保留）
+
+    Args:
+        recorder: teardown 阶段 makereport 之前从 item 上取到的 ArtifactsRecorder；
+                  pytest-playwright 的 trylast makereport 会先删除该属性再决定保留哪些产物，
+                  因此必须在 yield 之前取引用，yield 之后再读取 artifacts
+    """
+    for kind, path in getattr(recorder, "artifacts", []):
+        if kind != "trace":
+            continue
+        try:
+            allure.attach.file(path, name=f"trace: {Path(path).name}", extension="zip")
+            logger.info(f"Playwright trace 已保存: {path}（npx playwright show-trace 查看）")
+        except Exception as e:
+            logger.warning(f"附加 trace 失败: {path}, 错误: {e}")
+
+
 def pytest_collection_modifyitems(session, config, items):
     """
     修改收集到的测试项
 
     功能：
-    1. 按 order 全局排序
+    1. 按依赖拓扑排序（run(depends_on=[...])），同层按 order 排序
     2. 根据环境标记跳过测试（skip_local、skip_remote）
     """
     env_name = os.getenv("ENV", "prod")
@@ -264,67 +424,29 @@ def pytest_collection_modifyitems(session, config, items):
         elif env_name in ("dev", "test", "prod") and item.get_closest_marker("skip_remote"):
             item.add_marker(pytest.mark.skip(reason="远程环境跳过"))
 
-    # 按 order 排序
-    def get_order_key(item):
-        run_marker = item.get_closest_marker("run")
-        order = 999999
-        if run_marker and "order" in run_marker.kwargs:
-            try:
-                order = int(run_marker.kwargs["order"])
-            except (TypeError, ValueError):
-                pass
-        return (order, item.nodeid)
-
-    items.sort(key=get_order_key)
-
-
-def _parse_xdist_numprocesses(config) -> int:
-    """解析 pytest-xdist 的 -n 数量；无法解析为整数时返回 0。"""
-    try:
-        n = config.getoption("numprocesses", default=0) or 0
-    except Exception:
-        return 0
-    if n in (None, 0, False, ""):
-        return 0
-    if isinstance(n, int):
-        return n
-    s = str(n).strip()
-    if s.isdigit() or (s.startswith("-") and s[1:].isdigit()):
-        return int(s)
-    return 0
+    # 按依赖拓扑排序（未声明依赖时等价于按 (order, nodeid) 排序）
+    items[:] = sort_items_by_dependency(items)
 
 
 def pytest_collection_finish(session):
     """
     pytest 收集完测试用例后执行
 
-    初始化进度 JSON（供钉钉等仍读 process 的场景）：xdist 下子进程带 workerinput 时
-    若不再 reset 会沿用历史；对 -n1 在子进程也 reset。终端「汇总报告」已改读
-    TerminalReporter，不依赖本处数据。
+    初始化进度数据库（供钉钉等仍读 process 的场景）：清空已在主进程 pytest_configure 中完成，
+    xdist 各 worker 收集结果相同，均写入总数即可；开始时间只记录首次。终端「汇总报告」
+    读 TerminalReporter，不依赖本处数据。
     """
     if not hasattr(session, 'items') or len(session.items) == 0:
         return
 
     total = len(session.items)
-    in_xdist_worker = bool(os.environ.get("PYTEST_XDIST_WORKER"))
-    nproc = _parse_xdist_numprocesses(session.config)
-
-    if not in_xdist_worker:
-        process.reset_all()
-        process.init_process(total)
-        logger.info(f"收集到 {total} 个测试用例")
-        return
 
-    if nproc == 1:
-        process.reset_all()
-        process.init_process(total)
-        logger.info(f"收集到 {total} 个测试用例 [xdist -n1，已清空 logs 进度/用例记录]")
-        return
+    # 导出依赖图（xdist 主进程不收集用例，调度器从该文件读取依赖）
+    dependency_state.export_graph(session.items)
 
-    logger.warning(
-        "xdist 多进程（-n>1 或 -n auto）时子进程不重置 progress 文件；"
-        "终端自定义汇总已改为根据 pytest 报告，不读该文件。"
-    )
+    process.init_process(total)
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        logger.info(f"收集到 {total} 个测试用例")
 
 
 def pytest_runtest_setup(item):
@@ -338,6 +460,18 @@ def pytest_runtest_setup(item):
     logger.info("=" * 80)
     logger.info(f"{'=' * 20} 开始执行: {test_name} {'=' * 20}")
     logger.info("=" * 80)
+    action_timer.start_test(item.nodeid)
+
+    # 等待前置依赖结束；前置失败或被阻断则跳过并记为 blocked（前置被普通跳过视为满足）
+    # 等待时长记入 user_properties，统计用例耗时时扣除，避免把排队时间算进历史耗时
+    wait_start = time.monotonic()
+    blocked = dependency_state.wait_for_prerequisites(item)
+    waited = time.monotonic() - wait_start
+    if waited >= 0.01:
+        item.user_properties.append(("dependency_wait_s", round(waited, 3)))
+    if blocked:
+        item.dependency_blocked = blocked
+        pytest.skip(f"前置用例未通过: {', '.join(blocked)}")
 
 
 @pytest.hookimpl(hookwrapper=True, tryfirst=True)
@@ -350,6 +484,9 @@ def pytest_runtest_makereport(item, call):
     2. 失败时自动截图
     3. 记录测试进度
     """
+    # pytest-playwright 在它的（后执行 yield 之后部分的）makereport 中删除 recorder，这里先保留引用
+    artifacts_recorder = getattr(item, "_playwright_artifacts_recorder", None)
+
     outcome = yield
     rep = outcome.get_result()
 
@@ -410,6 +547,26 @@ def pytest_runtest_makereport(item, call):
         process.update_skip()
         process.record_skipped_testcase(item.nodeid, test_name)
 
+    # 用例结束：记录最终结果，供依赖它的用例（可能在其它 worker）判断
+    elif rep.when == "teardown":
+        dependency_state.record(item.nodeid, item_final_outcome(item))
+        # 等待本用例提交的截图写完（Allure 附件已在截图时挂到对应步骤）
+        screenshot_writer.flush()
+        _attach_traces(artifacts_recorder)
+        action_timer.end_test()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    """
+    xdist 调度器钩子：-n 默认的 --dist=load 时改用依赖调度
+
+    显式指定其它 --dist（loadscope/loadfile/worksteal 等）或 --no-dependency-scheduling 时不干预。
+    """
+    if config.getvalue("dist") != "load" or config.getoption("--no-dependency-scheduling"):
+        return None
+    return DependencyScheduling(config, log)
+
 
 def pytest_sessionfinish(session, exitstatus):
     """
@@ -417,6 +574,11 @@ def pytest_sessionfinish(session, exitstatus):
 
     记录测试结束时间（汇总报告在 pytest_terminal_summary 中生成）
     """
+    # 各进程等待后台截图写完
+    screenshot_writer.flush()
+    # 各进程写出操作耗时原始记录，主进程在下面合并导出
+    action_timer.dump()
+
     # 只在主进程中执行
     if hasattr(session.config, 'workerinput'):
         return
@@ -432,6 +594,11 @@ def pytest_sessionfinish(session, exitstatus):
     # 记录结束时间
     process.write_end_time()
 
+    # 合并各 worker 的操作耗时并导出 JSON/CSV
+    if Settings.ACTION_TIMING:
+        for output in action_timer.export():
+            logger.info(f"操作耗时统计已导出: {output}")
+
 
 def pytest_terminal_summary(terminalreporter, exitstatus, config):
     """
@@ -520,6 +687,42 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
         report_lines.append("-" * 80)
         report_lines.append("")
 
+    # 性能统计：最慢用例（pytest 报告）、最慢步骤/定位器（各 worker 的耗时记录合并）
+    perf = None
+    test_durations = _test_durations_from_terminal_reporter(terminalreporter)
+    if Settings.PERF_REPORT_TOP_N > 0:
+        try:
+            perf = action_timer.performance_summary(
+                {nodeid: seconds for nodeid, (_, seconds, _) in test_durations.items()},
+                names={nodeid: name for nodeid, (name, _, _) in test_durations.items()},
+            )
+            if any(perf.values()):
+                report_lines.extend(_performance_report_lines(perf))
+        except Exception as e:
+            logger.warning(f"生成性能统计失败: {e}")
+
+    # 耗时历史：按 环境配置 + 提交号 记录本次运行，并与滚动基线比较给出回归告警
+    if Settings.DURATION_HISTORY and executed > 0:
+        try:
+            history = DurationHistory()
+            run_id = history.record_run(
+                env=Settings.ENV_CONFIG_FILE,
+                # 只记录通过的用例：跳过/阻断的用例耗时接近 0、失败或超时的用例耗时偏长，都会拉偏基线与调度权重
+                test_durations={
+                    nodeid: seconds for nodeid, (_, seconds, passed) in test_durations.items() if passed
+                },
+                steps=[
+                    step for step in action_timer.load_all("steps")
+                    if not step.get("nodeid") or test_durations.get(step["nodeid"], (None, 0, False))[2]
+                ],
+            )
+            alerts = history.regressions(run_id)
+            if alerts:
+                names = {nodeid: name for nodeid, (name, _, _) in test_durations.items()}
+                report_lines.extend(_regression_report_lines(alerts, names))
+        except Exception as e:
+            logger.warning(f"记录耗时历史失败: {e}")
+
     # 最终状态
     report_lines.append(" " * 25 + "【最终状态】" + " " * 25)
     report_lines.append("-" * 80)
@@ -575,7 +778,8 @@ def pytest_terminal_summary(terminalreporter, exitstatus, config):
                     skipped=skip,
                     duration=duration,
                     failed_cases=failed_list,
-                    environment=env_name_value
+                    environment=env_name_value,
+                    performance=perf
                 )
 
                 if success:
@@ -667,10 +871,87 @@ def browser_context_args():
     """
     浏览器上下文参数：视口由 config/settings.py 的 VIEWPORT_WIDTH/VIEWPORT_HEIGHT 控制。
     pytest-playwright 会将该返回值传给 browser.new_context(**browser_context_args)。
+    视频/HAR 路径与用例相关，由下方 context fixture 按用例传入。
     """
     return Settings.get_context_args()
 
 
+# 禁用 CSS 过渡与动画（Element-UI 的弹窗、下拉、消息提示等依赖 transition/animation，
+# Vue 在计算出过渡时长为 0 时会立即完成进入/离开，操作不必等待动画结束）
+# 初始化脚本在文档解析前执行，此时 documentElement 可能还不存在：
+# 已有根节点时立即插入，否则用 MutationObserver 等根节点出现后插入，DOMContentLoaded 兜底
+_DISABLE_ANIMATIONS_SCRIPT = """
+(() => {
+    const STYLE_ID = "__disable_animations__";
+    const insert = () => {
+        const root = document.head || document.documentElement;
+        if (!root) {
+            return false;
+        }
+        if (!document.getElementById(STYLE_ID)) {
+            const style = document.createElement("style");
+            style.id = STYLE_ID;
+            style.textContent = `
+                *, *::before, *::after {
+                    transition: none !important;
+                    transition-duration: 0s !important;
+                    animation: none !important;
+                    animation-duration: 0s !important;
+                    scroll-behavior: auto !important;
+                }
+            `;
+            root.appendChild(style);
+        }
+        return true;
+    };
+    if (insert()) {
+        return;
+    }
+    const observer = new MutationObserver(() => {
+        if (insert()) {
+            observer.disconnect();
+        }
+    });
+    observer.observe(document, { childList: true, subtree: true });
+    document.addEventListener("DOMContentLoaded", () => {
+        observer.disconnect();
+        insert();
+    }, { once: true });
+})();
+"""
+
+
+@pytest.fixture
+def context(new_context, request, env_config):
+    """
+    覆盖 pytest-playwright 的 context：
+
+    1. 按 worker 与 nodeid 传入视频/HAR 录制路径（未开启 RECORD_VIDEO / RECORD_HAR 时与默认行为一致）
+    2. Settings.DISABLE_ANIMATIONS 为 True（ci / fast 档位）时注入禁用过渡与动画的样式
+    3. 按环境配置 request_routing 拦截不需要的请求，用例结束时记录拦截数量与节省的字节数
+    """
+    browser_context = new_context(**Settings.get_recording_args(request.node.nodeid))
+    if Settings.DISABLE_ANIMATIONS:
+        browser_context.add_init_script(_DISABLE_ANIMATIONS_SCRIPT)
+    router = RequestRouter(env_config.get("request_routing", {})).install(browser_context)
+
+    yield browser_context
+
+    if router.enabled:
+        stats = router.summary(browser_context)
+        if stats["blocked"]:
+            # 浏览器请求通常不带 Content-Length，未开启 measure_bytes 时多数大小未知，不能记为 0
+            saved = f"节省约 {stats['bytes'] / 1024:.1f} KB" if stats["bytes"] else "节省流量未统计"
+            if stats["unmeasured"]:
+                saved += f"（{stats['unmeasured']} 个中断请求大小未知，measure_bytes 开启后统计）"
+            if stats["bytes"]:
+                request.node.user_properties.append(("route_saved_bytes", stats["bytes"]))
+            logger.info(
+                f"请求拦截: {request.node.name} 拦截 {stats['blocked']} 个请求"
+                f"（stub {stats['stubbed']} 个，{stats['by_type']}），{saved}"
+            )
+
+
 @pytest.fixture(scope="function")
 def screenshot_helper(page: Page) -> ScreenshotHelper:
     """获取截图助手实例"""
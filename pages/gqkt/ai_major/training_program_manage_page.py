@@ -8,6 +8,7 @@ from typing import Optional
 
 from base.base_page import BasePage
 from config.env_config import EnvConfig
+from pages.gqkt.api import API_PATH
 
 
 # 目标支撑可选值
@@ -93,6 +94,8 @@ class TrainingProgramManagePage(BasePage):
         # ====目标支撑====
         # 目标支撑选择下拉框
         self.target_support_select = self.iframe.get_by_text("选择")
+        # 目标支撑表格（选择支撑等级后只有表格重新渲染，就绪等待只观察这里）
+        self.target_support_table = self.iframe.locator(".el-table").first
         # 支撑关系保存成功提示
         self.success_target_support_message = self.iframe.locator("xpath=//p[contains(text(),'支撑关系保存成功')]")
         # ====课程体系====
@@ -212,9 +215,11 @@ class TrainingProgramManagePage(BasePage):
 
     def click_menu(self, menu_name: str):
         """点击菜单"""
+        self.request_tracker  # 点击前开始跟踪，tab 发出的接口才会被计入
         self.click_element(self.get_menu_locator(menu_name))  # 点击菜单
-        # 因为不等待经常报错，所以等待500ms
-        self.wait_for_timeout(500)
+        self.wait_for_requests_settled(patterns=[API_PATH])  # 等待 tab 数据接口返回
+        # 等待 tab 内容渲染完成（加载遮罩消失且 DOM 不再变化），否则后续操作经常报错
+        self.wait_until_ready(scope=self.iframe)
 
     # ==================== 业务方法 ====================
 
@@ -250,8 +255,7 @@ class TrainingProgramManagePage(BasePage):
 
     def add_training_goal(self, training_goal: str):
         """添加培养目标"""
-        self.click_menu("培养目标")  # 保证在“培养目标”tab
-        self.wait_for_load_state("load")
+        self.click_menu("培养目标")  # 保证在“培养目标”tab（click_menu 已等待接口返回与渲染完成）
         self.click_element(self.add_training_goal_button)     # 点击添加目标按钮
         self.fill_element(self.training_program_major_training_goal_description_input, training_goal)  # 输入培养目标描述
         self.click_element(self.confirm_edit_button)          # 点击局部保存按钮
@@ -315,14 +319,14 @@ class TrainingProgramManagePage(BasePage):
         for i, support in zip(indices, support_list):
             self.click_element(self.target_support_select.nth(i))  # 点击目标支撑选择下拉框
             self.click_element(self.get_target_support_option_locator(support))  # 选择目标支撑
-            self.wait_for_timeout(500)
+            self.wait_until_ready(scope=self.iframe, container=self.target_support_table)  # 等待下拉框收起、表格重新渲染
         self.click_element(self.confirm_edit_button)  # 点击保存按钮
 
     def add_course(self, course_name: str):
         """添加课程"""
         self.click_menu("课程体系")  # 点击课程体系菜单
         self.click_element(self.add_course_button)  # 点击添加课程按钮
-        self.wait_for_load_state()
+        self.wait_for_requests_settled(patterns=[API_PATH])  # 等待课程列表接口返回
         self.fill_element(self.course_search_input, course_name)  # 输入课程名称或代码
         self.click_element(self.get_course_checkbox_locator(course_name))  # 点击课程复选框
         self.click_element(self.confirm_add_course_button)  # 点击确认添加课程按钮
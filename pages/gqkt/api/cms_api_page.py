@@ -10,6 +10,9 @@ import allure
 
 from base.base_api import BaseAPI
 
+# 后端接口前缀：与前端同源（base_url 下的 /api/），UI 页面等待接口完成时按该前缀匹配
+API_PATH = "/api/"
+
 
 class CmsApiPage(BaseAPI):
     """
@@ -26,7 +29,7 @@ class CmsApiPage(BaseAPI):
     """
     
     # 注册接口路径
-    REGISTER_ENDPOINT = "/api/auth/register"
+    REGISTER_ENDPOINT = f"{API_PATH}auth/register"
     
     def __init__(self, base_url: str, timeout: int = 30):
         """
@@ -2,11 +2,15 @@
 # 用户管理页面
 # ========================================
 
+import re
+
 from playwright.sync_api import Page
 from typing import Optional
 
 from base.base_page import BasePage
 from config.env_config import EnvConfig
+from config.settings import Settings
+from pages.gqkt.api import API_PATH
 
 
 class UserManagePage(BasePage):
@@ -16,6 +20,9 @@ class UserManagePage(BasePage):
     提供用户管理相关的操作方法。
     """
 
+    # 点击「创建用户」后提交的接口：后端接口前缀下的 POST（排除登录鉴权 auth/，避免令牌刷新被当作创建结果）
+    CREATE_USER_API = re.compile(re.escape(API_PATH) + r"(?!auth/)")
+
     def __init__(self, page: Page):
         super().__init__(page)
         self.iframe = page.frame_locator("iframe#app-iframe-2006")
@@ -47,6 +54,8 @@ class UserManagePage(BasePage):
         # 所属行政班选择框
         self.create_user_admin_class_select = self.iframe.get_by_text("请选择行政班").last
 
+        # 最近一次创建用户的接口返回（未等到接口响应时为 None）
+        self.create_user_result = None
         # 创建成功提示
         self.create_success_message = self.iframe.locator("xpath=//p[contains(text(),'创建成功')]")
         # =========绑定页面=========
@@ -118,7 +127,10 @@ class UserManagePage(BasePage):
         if admin_class_name:  # 如果行政班名称不为空，则选择所属行政班
             self.click_element(self.create_user_admin_class_select)  # 点击所属行政班选择框
             self.click_element(self._get_admin_class_select_locator(admin_class_name))  # 选择所属行政班
-        self.click_element(self.create_user_button)  # 点击创建用户按钮
+        # 点击创建用户按钮并等待创建接口返回（前端校验失败不会发请求，只等 EXPECT_TIMEOUT）
+        self.create_user_result = self.click_and_wait_response(
+            self.create_user_button, self.CREATE_USER_API, timeout=Settings.EXPECT_TIMEOUT, required=False
+        )
 
     def bind_user(self, code: str, platform_user_id: str):
         """绑定用户"""
@@ -130,7 +142,13 @@ class UserManagePage(BasePage):
     # ==================== 断言方法 ====================
 
     def is_create_user_success(self) -> bool:
-        """检查是否创建用户成功"""
+        """检查是否创建用户成功（等到创建接口时按接口返回判断，不等 toast；否则按成功提示文案判断）"""
+        if self.create_user_result is not None:
+            if self.is_api_success(self.create_user_result):
+                self.logger.info("✓ 创建用户成功")
+                return True
+            self.logger.error(f"✗ 创建用户失败: {self.create_user_result}")
+            return False
         try:
             self.wait_for_element_visible(self.create_success_message)
             self.logger.info("✓ 创建用户成功")
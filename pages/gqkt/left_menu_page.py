@@ -8,6 +8,7 @@ from typing import Optional
 
 from base.base_page import BasePage
 from config.env_config import EnvConfig
+from pages.gqkt.api import API_PATH
 
 URL_PATH = "/console"
 
@@ -46,6 +47,7 @@ class LeftMenuPage(BasePage):
     @allure.step("点击左侧菜单项: {menu_name}")
     def click_left_menu_item(self, menu_name: str) -> "LeftMenuPage":
         """点击左侧菜单项"""
+        self.request_tracker  # 点击前开始跟踪，菜单页面发出的接口才会被计入
         self.click_element(self._get_left_menu_item(menu_name))
-        self.wait_for_load_state("load")
+        self.wait_for_requests_settled(patterns=[API_PATH])  # 等待菜单页面的接口返回
         return self
@@ -11,6 +11,7 @@ from base.base_page import BasePage
 import allure
 
 from config.env_config import EnvConfig
+from pages.gqkt.api import API_PATH
 
 
 class GqktLoginPage(BasePage):
@@ -46,6 +47,8 @@ class GqktLoginPage(BasePage):
         self.username_input = page.get_by_placeholder("请输入您的账户")
         self.password_input = page.get_by_placeholder("请输入您的密码")
         self.login_button = page.get_by_role("button", name="登录")
+        # 登录失败提示
+        self.error_message = page.locator(".el-message--error, .error-message")
         # ========== 重置密码页面元素 ==========
         # 新密码输入框
         self.new_password_input = page.get_by_role("textbox", name="新密码")
@@ -55,6 +58,8 @@ class GqktLoginPage(BasePage):
         self.reset_password_button = page.get_by_role("button", name="确认修改")
         # 密码修改成功提示框
         self.reset_password_success_message = page.locator("xpath=//p[contains(text(),'密码修改成功')]")
+        # 点击登录后停留在登录页的结果：错误提示或首次登录的重置密码表单
+        self.login_stay_result = self.error_message.or_(self.new_password_input).first
     # ==================== 页面导航 ====================
 
     @allure.step("打开登录页面")
@@ -81,7 +86,8 @@ class GqktLoginPage(BasePage):
     def click_login(self) -> "GqktLoginPage":
         """点击登录按钮"""
         self.click_element(self.login_button)
-        self.wait_for_load_state("networkidle")
+        # 控制台有轮询和长连接，不等请求静默；以跳转离开登录页为准，失败或首次登录时以页面提示为准
+        self.wait_for_url_or_visible(lambda url: self.LOGIN_PATH not in url, self.login_stay_result)
         return self
 
     # ==================== 业务方法 ====================
@@ -97,8 +103,9 @@ class GqktLoginPage(BasePage):
         """
         self.enter_username(username)
         self.enter_password(password)
+        self.request_tracker  # 点击前开始跟踪，登录与控制台首屏接口才会被计入
         self.click_login()
-        self.wait_for_load_state("load")
+        self.wait_for_requests_settled(patterns=[API_PATH])  # 等待登录与控制台首屏接口返回
         return self
 
     @allure.step("重置密码: {username}")
@@ -123,9 +130,8 @@ class GqktLoginPage(BasePage):
 
     def get_error_message(self) -> str:
         """获取错误提示信息"""
-        error_element = self.page.locator(".el-message--error, .error-message")
-        if error_element.is_visible():
-            return error_element.inner_text()
+        if self.error_message.is_visible():
+            return self.error_message.inner_text()
         return ""
 
     def is_reset_password_success(self) -> bool:
@@ -86,7 +86,7 @@ class KnowledgeGraphPage(CourseWorkbenchPage):
         """
         node_locator = self.get_node_locator_by_name(node_name)
         self.hover_element(node_locator)
-        self.wait_for_load_state()
+        # 悬停只显示按钮、不发请求，点击时等待按钮可操作即可
         self.click_element(self.new_sub_node_button)
 
     # ==================== 业务方法 ====================
@@ -25,7 +25,8 @@ class OverviewPage(CourseResourcePage):
     # =================== 操作方法 ===================
     def get_resource_count(self) -> int:
         """获取资源数量"""
-        # 等待资源数量展示
-        self.wait_for_timeout(1000)
+        # 等待统计数据加载完成（资源数由接口异步返回后渲染）
+        self.wait_for_element_visible(self.resource_count_display)
+        self.wait_until_ready(scope=self.iframe)
         a = self.get_text(self.resource_count_display)
         return int(a)
@@ -5,14 +5,16 @@
 # 通过实例化使用，无需继承
 #
 # 支持认证状态持久化（免登录）
+# 支持会话级认证状态池（同一用户/学校/角色只登录一次）
 # ========================================
 
 import allure
 from playwright.sync_api import Page
 
+from config.settings import Settings
 from pages import GqktLoginPage
 from pages.gqkt import TopMenuPage, LeftMenuPage
-from utils.auth_helper import AuthHelper
+from utils.auth_helper import AuthHelper, AuthStatePool
 
 
 class TestContextHelper:
@@ -23,6 +25,7 @@ class TestContextHelper:
     - 登录并初始化（登录 + 切换学校 + 切换角色）
     - 单独的登录、切换学校、切换角色方法
     - 认证状态保存和加载（免登录）
+    - 会话级认证状态池：同一 (用户名, 学校, 角色) 在本次会话内复用 storage_state，跳过登录与切换
 
     使用示例：
         def test_example(self, page, base_url, initial_admin, gqkt_data):
@@ -38,6 +41,7 @@ class TestContextHelper:
     def __init__(self):
         """初始化助手"""
         self.auth_helper = AuthHelper()
+        self.auth_pool = AuthStatePool()
 
     def login_and_init(
         self,
@@ -55,6 +59,8 @@ class TestContextHelper:
 
         这是一个便捷方法，一次性完成登录、切换学校和切换角色三个操作。
         支持免登录：如果之前保存过认证状态，会自动尝试加载。
+        启用 Settings.AUTH_POOL_ENABLED 时，优先复用本次会话内同一 (用户名, 学校, 角色) 的
+        storage_state，直接进入 /console，不再登录和切换学校/角色。
 
         Args:
             page: Playwright 页面对象
@@ -63,7 +69,7 @@ class TestContextHelper:
             password: 登录密码
             school_name: 学校名称，建议从 gqkt_data["school_name"] 获取以支持多环境，默认"智慧大学"
             role_name: 角色名称，默认"机构管理员"
-            use_saved_auth: 是否尝试使用保存的认证状态（免登录），默认True
+            use_saved_auth: 是否尝试使用保存的认证状态（会话池 + 免登录文件），默认True
             save_auth: 登录成功后是否保存认证状态，默认True
 
         Returns:
@@ -86,6 +92,13 @@ class TestContextHelper:
         """
         # 生成认证状态的唯一标识（用户名 + 学校 + 角色）
         user_key = f"{username}_{school_name}"
+        pool_key = AuthStatePool.make_key(username, school_name, role_name)
+
+        # 优先复用会话池中的状态（已完成学校和角色切换）
+        if use_saved_auth and Settings.AUTH_POOL_ENABLED and self.auth_pool.has_state(pool_key):
+            with allure.step(f"复用会话认证状态: {username}"):
+                if self._try_restore_pooled_auth(page, base_url, pool_key):
+                    return GqktLoginPage(page, base_url), TopMenuPage(page, base_url)
 
         # 尝试使用保存的认证状态（免登录）
         if use_saved_auth and self.auth_helper.is_auth_valid(user_key):
@@ -97,6 +110,7 @@ class TestContextHelper:
                         top_menu_page = self.switch_school(page, school_name)
                     with allure.step(f"切换角色: {role_name}"):
                         self.switch_role(page, role_name)
+                    self._capture_pooled_auth(page, pool_key)
                     return login_page, top_menu_page
 
         # 正常登录流程
@@ -114,8 +128,45 @@ class TestContextHelper:
             with allure.step("保存认证状态"):
                 self.auth_helper.save_auth_state(page, user_key)
 
+        self._capture_pooled_auth(page, pool_key)
         return login_page, top_menu_page
 
+    def _try_restore_pooled_auth(self, page: Page, base_url: str, pool_key: tuple) -> bool:
+        """
+        从会话认证状态池恢复登录态
+
+        Args:
+            page: Playwright 页面对象
+            base_url: 基础URL
+            pool_key: 状态池 key（用户名, 学校, 角色）
+
+        Returns:
+            True 恢复成功且登录有效，False 恢复失败（已撤销注入的 cookies/storage 并从池中移除该状态）
+        """
+        try:
+            if not self.auth_pool.seed_context(page.context, pool_key):
+                return False
+
+            login_page = GqktLoginPage(page, base_url)
+            login_page.navigate_to(base_url.rstrip("/") + "/console")
+            if login_page.is_login_success():
+                allure.attach("会话池复用成功", "使用会话内缓存的认证状态", allure.attachment_type.TEXT)
+                return True
+
+            # 状态已失效：撤销注入的 cookies/storage，避免混入随后的重新登录
+            self.auth_pool.discard(page, pool_key)
+            return False
+
+        except Exception as e:
+            allure.attach(str(e), "会话池复用失败", allure.attachment_type.TEXT)
+            self.auth_pool.discard(page, pool_key)
+            return False
+
+    def _capture_pooled_auth(self, page: Page, pool_key: tuple) -> None:
+        """登录和切换完成后，把当前状态放入会话认证状态池"""
+        if Settings.AUTH_POOL_ENABLED:
+            self.auth_pool.capture(page, pool_key)
+
     def _try_restore_auth(self, page: Page, base_url: str, user_key: str) -> bool:
         """
         尝试恢复认证状态
@@ -66,7 +66,7 @@ class TestSetInitialUser:
             assert user_manage_page.is_create_user_success(), "创建专业负责人失败"
             screenshot_helper.capture_viewport("创建专业负责人成功")
 
-    @pytest.mark.run(order=120)
+    @pytest.mark.run(order=120, depends_on=["create_user"])
     @pytest.mark.skip_local
     @allure.title("注册CMS账户并绑定用户")
     def test_bind_user(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
@@ -118,7 +118,7 @@ class TestSetInitialUser:
             assert user_manage_page.is_bind_user_success(), "绑定专业负责人失败"
             screenshot_helper.capture_viewport("绑定专业负责人成功")
 
-    @pytest.mark.run(order=130)
+    @pytest.mark.run(order=130, depends_on=["bind_user"])
     @pytest.mark.skip_prod
     @allure.title("重置密码")
     def test_reset_password(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
@@ -150,7 +150,7 @@ class TestSetInitialUser:
             assert login_page.is_reset_password_success(), "重置专业负责人密码失败"
             screenshot_helper.capture_viewport("重置专业负责人密码成功")
 
-    @pytest.mark.run(order=140)
+    @pytest.mark.run(order=140, depends_on=["reset_password"])
     @allure.title("分配角色")
     def test_assign_role(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
         """
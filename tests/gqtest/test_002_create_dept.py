@@ -19,7 +19,7 @@ class TestCreateDept:
     创建部门测试类
     """
 
-    @pytest.mark.run(order=150)
+    @pytest.mark.run(order=150, depends_on=["assign_role"])
     @allure.title("创建院系")
     def test_create_dept(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
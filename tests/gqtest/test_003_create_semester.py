@@ -20,7 +20,7 @@ class TestCreateSemester:
     """
 
     # @pytest.mark.skip(reason="临时跳过创建学期用例")
-    @pytest.mark.run(order=160)
+    @pytest.mark.run(order=160, depends_on=["assign_role"])
     @allure.title("创建学期")
     def test_create_semester(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -19,7 +19,7 @@ class TestCreateMajor:
     创建专业测试类
     """
 
-    @pytest.mark.run(order=170)
+    @pytest.mark.run(order=170, depends_on=["create_dept"])
     @allure.title("创建专业")
     def test_create_major(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
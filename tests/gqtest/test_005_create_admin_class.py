@@ -19,7 +19,7 @@ class TestCreateAdminClass:
     创建行政班测试类
     """
 
-    @pytest.mark.run(order=180)
+    @pytest.mark.run(order=180, depends_on=["create_major"])
     @allure.title("创建行政班")
     def test_create_admin_class(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
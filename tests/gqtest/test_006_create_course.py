@@ -20,7 +20,7 @@ class TestCreateCourse:
     创建课程测试类
     """
 
-    @pytest.mark.run(order=190)
+    @pytest.mark.run(order=190, depends_on=["create_dept"])
     @allure.title("创建课程")
     def test_create_course(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
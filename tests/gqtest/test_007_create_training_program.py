@@ -19,7 +19,7 @@ class TestCreateTrainingProgram:
     创建培养方案测试类
     """
 
-    @pytest.mark.run(order=200)
+    @pytest.mark.run(order=200, depends_on=["create_major"])
     @allure.title("创建培养方案")
     def test_create_training_program(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -20,7 +20,7 @@ class TestReviseTrainingProgram:
     修订培养方案测试类
     """
 
-    @pytest.mark.run(order=210)
+    @pytest.mark.run(order=210, depends_on=["create_training_program", "create_course"])
     @allure.title("修订培养方案")
     def test_revise_training_program(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
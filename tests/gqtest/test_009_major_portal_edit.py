@@ -19,7 +19,7 @@ class TestMajorPortalEdit:
     专业门户编辑测试类
     """
 
-    @pytest.mark.run(order=220)
+    @pytest.mark.run(order=220, depends_on=["create_major"])
     @allure.title("专业门户编辑")
     def test_major_portal_edit(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
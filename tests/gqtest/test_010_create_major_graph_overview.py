@@ -19,7 +19,7 @@ class TestCreateMajorGraphOverview:
     创建专业图谱概览测试类
     """
 
-    @pytest.mark.run(order=230)
+    @pytest.mark.run(order=230, depends_on=["create_major"])
     @allure.title("创建专业图谱概览")
     def test_create_major_graph_overview(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -21,7 +21,7 @@ class TestCreateKnowledgeGraph:
     新建知识图谱测试类
     """
 
-    @pytest.mark.run(order=240)
+    @pytest.mark.run(order=240, depends_on=["create_course"])
     @allure.title("新建知识图谱")
     def test_create_knowledge_graph(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
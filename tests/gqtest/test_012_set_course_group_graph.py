@@ -20,7 +20,7 @@ class TestSetCourseGroupGraph:
     设置专业课程群图谱测试类
     """
 
-    @pytest.mark.run(order=250)
+    @pytest.mark.run(order=250, depends_on=["create_knowledge_graph", "revise_training_program"])
     @allure.title("设置专业课程群图谱")
     def test_set_course_group_graph(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
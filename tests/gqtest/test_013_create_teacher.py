@@ -22,7 +22,7 @@ class TestCreateTeacher:
     创建教师测试类
     """
 
-    @pytest.mark.run(order=260)
+    @pytest.mark.run(order=260, depends_on=["create_dept"])
     @allure.title("创建教师")
     def test_create_teacher(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
         """
@@ -51,7 +51,7 @@ class TestCreateTeacher:
             screenshot_helper.capture_viewport("创建教师成功")
 
     # TODO: 可能注册失败
-    @pytest.mark.run(order=270)
+    @pytest.mark.run(order=270, depends_on=["create_teacher"])
     @pytest.mark.skip_local
     @allure.title("注册CMS账户并绑定教师")
     def test_bind_teacher(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
@@ -85,7 +85,7 @@ class TestCreateTeacher:
             assert user_manage_page.is_bind_user_success(), "绑定教师失败"
             screenshot_helper.capture_viewport("绑定教师成功")
 
-    @pytest.mark.run(order=280)
+    @pytest.mark.run(order=280, depends_on=["bind_teacher"])
     @pytest.mark.skip_prod
     @allure.title("重置教师密码")
     def test_reset_teacher_password(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
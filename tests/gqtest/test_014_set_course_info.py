@@ -21,7 +21,7 @@ class TestSetCourseInfo:
     设置课程信息测试类
     """
 
-    @pytest.mark.run(order=290)
+    @pytest.mark.run(order=290, depends_on=["create_course"])
     @allure.title("设置课程信息")
     def test_set_course_info(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -21,7 +21,7 @@ class TestSetCourseObjective:
     设置课程目标测试类
     """
 
-    @pytest.mark.run(order=290)
+    @pytest.mark.run(order=290, depends_on=["revise_training_program"])
     @allure.title("设置课程目标")
     def test_set_course_objective(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -21,7 +21,7 @@ class TestSetCourseTeam:
     设置课程团队测试类
     """
 
-    @pytest.mark.run(order=300)
+    @pytest.mark.run(order=300, depends_on=["create_course", "reset_teacher_password"])
     @allure.title("设置课程团队")
     def test_set_course_team(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
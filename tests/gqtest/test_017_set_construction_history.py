@@ -21,7 +21,7 @@ class TestSetConstructionHistory:
     设置建设历程测试类
     """
 
-    @pytest.mark.run(order=310)
+    @pytest.mark.run(order=310, depends_on=["create_course"])
     @allure.title("设置建设历程")
     def test_set_construction_history(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
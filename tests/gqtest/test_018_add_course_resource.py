@@ -24,7 +24,7 @@ class TestAddCourseResource:
     添加课程资源测试类
     """
 
-    @pytest.mark.run(order=320)
+    @pytest.mark.run(order=320, depends_on=["set_course_team"])
     @allure.title("添加课程资源")
     def test_add_course_resource(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -21,7 +21,7 @@ class TestCreateTeachingClass:
     创建教学班测试类
     """
 
-    @pytest.mark.run(order=330)
+    @pytest.mark.run(order=330, depends_on=["set_course_team", "create_semester"])
     @allure.title("创建教学班并设置主讲教师")
     def test_create_teaching_class(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
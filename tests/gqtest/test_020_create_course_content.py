@@ -21,7 +21,7 @@ class TestCreateCourseContent:
     创建课程内容测试类
     """
 
-    @pytest.mark.run(order=340)
+    @pytest.mark.run(order=340, depends_on=["add_course_resource"])
     @allure.title("创建课程内容")
     def test_create_course_content(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -22,7 +22,7 @@ class TestCreateStudent:
     创建学生测试类
     """
 
-    @pytest.mark.run(order=353)
+    @pytest.mark.run(order=353, depends_on=["create_admin_class"])
     @allure.title("创建学生")
     def test_create_student(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
         """
@@ -60,7 +60,7 @@ class TestCreateStudent:
             screenshot_helper.capture_viewport("创建学生成功")
 
     # TODO: 可能注册失败
-    @pytest.mark.run(order=355)
+    @pytest.mark.run(order=355, depends_on=["create_student"])
     @pytest.mark.skip_local
     @allure.title("注册CMS账户并绑定学生")
     def test_bind_student(self, page: Page, screenshot_helper, base_url, initial_admin, gqkt_data: dict):
@@ -94,7 +94,7 @@ class TestCreateStudent:
             assert user_manage_page.is_bind_user_success(), "绑定学生失败"
             screenshot_helper.capture_viewport("绑定学生成功")
 
-    @pytest.mark.run(order=357)
+    @pytest.mark.run(order=357, depends_on=["bind_student"])
     @pytest.mark.skip_prod
     @allure.title("重置学生密码")
     def test_reset_student_password(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
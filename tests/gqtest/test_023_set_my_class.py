@@ -21,7 +21,7 @@ class TestSetMyClass:
     设置我的班级测试类
     """
 
-    @pytest.mark.run(order=360)
+    @pytest.mark.run(order=360, depends_on=["create_teaching_class", "create_chapter", "reset_student_password"])
     @allure.title("设置我的班级")
     def test_set_my_class(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
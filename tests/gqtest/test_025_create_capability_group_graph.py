@@ -20,7 +20,7 @@ class TestCreateCapabilityGroupGraph:
     创建能力 group graph 测试类
     """
 
-    @pytest.mark.run(order=380)
+    @pytest.mark.run(order=380, depends_on=["set_course_team", "create_knowledge_graph"])
     @allure.title("创建能力图谱并添加一级能力及子能力")
     def test_create_capability_group_graph(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
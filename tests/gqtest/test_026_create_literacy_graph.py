@@ -20,7 +20,7 @@ class TestCreateLiteracyGraph:
     创建素质图谱测试类
     """
 
-    @pytest.mark.run(order=390)
+    @pytest.mark.run(order=390, depends_on=["set_course_team", "create_knowledge_graph"])
     @allure.title("创建素质图谱并添加一级素质及子素质")
     def test_create_literacy_graph(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
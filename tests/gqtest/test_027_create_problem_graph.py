@@ -21,7 +21,7 @@ class TestCreateProblemGraph:
     创建问题图谱测试类
     """
 
-    @pytest.mark.run(order=400)
+    @pytest.mark.run(order=400, depends_on=["set_course_team", "create_knowledge_graph"])
     @allure.title("创建问题图谱并添加层级与问题")
     def test_create_problem_graph(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
@@ -20,7 +20,7 @@ class TestCoursePortalManage:
     课程门户管理测试类
     """
 
-    @pytest.mark.run(order=410)
+    @pytest.mark.run(order=410, depends_on=["set_course_team"])
     @allure.title("进入课程门户管理并编辑页面")
     def test_course_portal_manage(self, page: Page, screenshot_helper, base_url, gqkt_data: dict):
         """
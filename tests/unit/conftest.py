@@ -0,0 +1,17 @@
+# ========================================
+# 框架单元测试 fixtures
+# ========================================
+# tests/unit 下的用例只测试框架自身的纯逻辑（调度、统计、图像算法等），不启动浏览器。
+# 根 conftest 的自动 fixture test_setup_teardown 依赖 page，这里覆盖为空实现。
+#
+# 使用方法：
+#   pytest tests/unit
+# ========================================
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def test_setup_teardown():
+    """覆盖根 conftest 的同名 fixture：单元测试不需要浏览器页面"""
+    yield
@@ -0,0 +1,68 @@
+# ========================================
+# 操作耗时统计单元测试：等待耗时未测量标记、步骤标题模板还原、最慢用例按 nodeid 排行
+# ========================================
+
+import pytest
+
+from common.action_timing import ActionTimer, slowest, step_template, summarize
+
+
+@pytest.fixture
+def timer(tmp_path, monkeypatch):
+    monkeypatch.setattr(ActionTimer, "STATE_DIR", tmp_path / "action_timing")
+    return ActionTimer()
+
+
+@pytest.mark.parametrize("title, params, template", [
+    ("导航到: 'https://a.com/x'", {"self": "<LoginPage>", "url": "'https://a.com/x'"}, "导航到: {url}"),
+    ("在输入框中填入: 'ab'", {"locator": "'#name'", "text": "'ab'"}, "在输入框中填入: {text}"),
+    ("刷新页面", {"self": "<LoginPage>"}, "刷新页面"),
+    ("点击登录", None, "点击登录"),
+])
+def test_step_template_restores_placeholders(title, params, template):
+    assert step_template(title, params) == template
+
+
+def test_parameterised_steps_share_one_group(timer):
+    for url, ms in (("'https://a.com/1'", 100), ("'https://a.com/2'", 300)):
+        timer.record_step(step_template(f"导航到: {url}", {"url": url}), ms, example=f"导航到: {url}")
+
+    (row,) = slowest(timer._steps, ("title",), top_n=5)
+    assert (row["name"], row["count"], row["example"]) == ("导航到: {url}", 2, "导航到: 'https://a.com/2'")
+
+
+def test_slowest_tests_keyed_by_nodeid(timer):
+    durations = {
+        "tests/a.py::TestA::test_create": 3.0,
+        "tests/b.py::TestB::test_create": 2.0,
+        "tests/c.py::test_other": 1.0,
+    }
+    names = {nodeid: "创建" for nodeid in durations}
+    names["tests/c.py::test_other"] = "其它"
+
+    tests = timer.performance_summary(durations, top_n=3, names=names)["tests"]
+
+    assert tests == [
+        ("创建 (tests/a.py::TestA::test_create)", 3.0),
+        ("创建 (tests/b.py::TestB::test_create)", 2.0),
+        ("其它", 1.0),
+    ]
+
+
+def test_wait_is_unmeasured_without_waiting_section(timer):
+    with timer.measure("LoginPage", "click", "#submit"):
+        pass
+    with timer.measure("LoginPage", "fill", "#name"):
+        with timer.measure("LoginPage", "click", "#name"):
+            with timer.waiting():
+                pass
+    with timer.measure("LoginPage", "wait_visible", "#ok", waiting=True):
+        pass
+
+    click, fill, wait = timer.records
+    assert click["wait_ms"] is None
+    assert fill["wait_ms"] is not None
+    assert wait["wait_ms"] == wait["wall_ms"]
+    summary = summarize([click, fill, wait])
+    assert summary["wait_measured"] == 2
+    assert summarize([click])["wait_ms"] is None
@@ -0,0 +1,193 @@
+# ========================================
+# 接口响应等待单元测试：perform_and_wait_api / click_and_wait_response / is_api_success / 创建用户按接口结果断言
+# ========================================
+# 用 Page 替身模拟 page.expect_response：操作期间「发出」的响应按谓词筛选，无匹配时超时，不启动浏览器。
+# ========================================
+
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from base.base_page import BasePage
+from pages.gqkt.dean_manage.user_manage_page import UserManagePage
+
+
+class _Response:
+    def __init__(self, url, body=None, method="POST", status=200):
+        self.url = url
+        self.status = status
+        self.ok = 200 <= status < 300
+        self.request = SimpleNamespace(method=method)
+        self._body = body
+
+    def json(self):
+        if self._body is None:
+            raise ValueError("not json")
+        return self._body
+
+
+class _Page:
+    """只实现 BasePage 用到的方法；emitted 为下一次操作期间发出的响应"""
+
+    def __init__(self):
+        self.emitted = []
+        self.timeouts = []
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    def on(self, event, handler):
+        pass
+
+    def frame_locator(self, selector):
+        return MagicMock(name=selector)
+
+    @contextmanager
+    def expect_response(self, predicate, timeout=None):
+        info = SimpleNamespace(value=None)
+        yield info
+        self.timeouts.append(timeout)
+        info.value = next((r for r in self.emitted if predicate(r)), None)
+        if info.value is None:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+
+
+@pytest.fixture
+def fake_page():
+    return _Page()
+
+
+@pytest.fixture
+def base_page(fake_page):
+    return BasePage(fake_page)
+
+
+def test_waits_for_matching_endpoint_not_first_request(fake_page, base_page):
+    fake_page.emitted = [
+        _Response("https://x.test/api/heartbeat", {"code": 200}),
+        _Response("https://x.test/api/user/list", {"code": 200}, method="GET"),
+        _Response("https://x.test/api/user/create", {"code": 0, "data": {"id": 1}}),
+    ]
+
+    body = base_page.perform_and_wait_api(lambda: None, "/api/user/create", method="post")
+
+    assert body == {"code": 0, "data": {"id": 1}}
+    assert base_page.last_api_response.url.endswith("/api/user/create")
+    assert base_page.is_api_success(body)
+
+
+@pytest.mark.parametrize("pattern", ["**/api/user/*", re.compile(r"/api/user/\w+$")])
+def test_glob_and_regex_patterns(fake_page, base_page, pattern):
+    fake_page.emitted = [_Response("https://x.test/api/user/list", {"code": 200}, method="GET")]
+
+    assert base_page.perform_and_wait_api(lambda: None, pattern, method="GET") == {"code": 200}
+
+
+def test_url_pattern_is_required(base_page):
+    with pytest.raises(ValueError):
+        base_page.perform_and_wait_api(lambda: None, "")
+
+
+def test_timeout_when_required(fake_page, base_page):
+    fake_page.emitted = [_Response("https://x.test/api/heartbeat", {"code": 200})]
+
+    with pytest.raises(PlaywrightTimeoutError):
+        base_page.perform_and_wait_api(lambda: None, "/api/user/create", timeout=100)
+    assert fake_page.timeouts == [100]
+
+
+def test_optional_response_returns_none(fake_page, base_page):
+    assert base_page.perform_and_wait_api(lambda: None, "/api/user/create", required=False) is None
+
+
+def test_failed_action_always_raises(fake_page, base_page):
+    def action():
+        raise PlaywrightTimeoutError("click timeout")
+
+    with pytest.raises(PlaywrightTimeoutError, match="click timeout"):
+        base_page.perform_and_wait_api(action, "/api/user/create", required=False)
+
+
+def test_non_json_response_returns_none(fake_page, base_page):
+    fake_page.emitted = [_Response("https://x.test/api/export", None)]
+
+    assert base_page.perform_and_wait_api(lambda: None, "/api/export") is None
+
+
+def test_click_and_wait_response_defaults_to_post(fake_page, base_page, monkeypatch):
+    clicked = []
+    monkeypatch.setattr(base_page, "click_element", lambda locator, multi=None: clicked.append((locator, multi)))
+    fake_page.emitted = [
+        _Response("https://x.test/api/question/create", {"code": 500}, method="GET"),
+        _Response("https://x.test/api/question/create", {"success": True}),
+    ]
+
+    body = base_page.click_and_wait_response("button.create", "/api/question/create", multi="last")
+
+    assert clicked == [("button.create", "last")]
+    assert body == {"success": True}
+
+
+@pytest.mark.parametrize("body, status, expected", [
+    ({"code": 200}, 200, True),
+    ({"code": "0"}, 200, True),
+    ({"code": 500, "msg": "err"}, 200, False),
+    ({"success": True}, 200, True),
+    ({"success": False}, 200, False),
+    ({"code": 200}, 500, False),
+    ({"data": 1}, 200, False),
+    (None, 200, False),
+])
+def test_is_api_success(base_page, body, status, expected):
+    response = _Response("https://x.test/api/any", body, status=status)
+
+    assert base_page.is_api_success(body, response) is expected
+
+
+# ==================== 页面对象：创建用户 ====================
+
+@pytest.fixture
+def user_manage_page(fake_page, monkeypatch):
+    page = UserManagePage(fake_page)
+    monkeypatch.setattr(page, "click_element", lambda locator, multi=None: None)
+    monkeypatch.setattr(page, "hover_element", lambda locator, multi=None: None)
+    monkeypatch.setattr(page, "fill_element", lambda locator, text, *args, **kwargs: None)
+    return page
+
+
+def test_create_user_checks_api_result_not_toast(fake_page, user_manage_page, monkeypatch):
+    """创建接口返回后直接按 JSON 判断，不等待成功提示；令牌刷新等 auth 接口不会被当作创建结果"""
+    monkeypatch.setattr(user_manage_page, "wait_for_element_visible", MagicMock(side_effect=AssertionError))
+    fake_page.emitted = [
+        _Response("https://x.test/api/auth/refresh", {"code": "200"}),
+        _Response("https://x.test/api/user/list", {"code": "200"}, method="GET"),
+        _Response("https://x.test/api/user/create", {"code": "500", "message": "工号已存在"}),
+    ]
+
+    user_manage_page.create_user("创建教师", "张三", "T001")
+
+    assert user_manage_page.create_user_result == {"code": "500", "message": "工号已存在"}
+    assert user_manage_page.is_create_user_success() is False
+
+    fake_page.emitted = [_Response("https://x.test/api/user/create", {"code": "200", "data": {"id": 1}})]
+    user_manage_page.create_user("创建教师", "张三", "T002")
+    assert user_manage_page.is_create_user_success() is True
+
+
+def test_create_user_falls_back_to_toast_without_api_response(fake_page, user_manage_page, monkeypatch):
+    """前端校验失败等未发出创建请求时，按成功提示判断"""
+    toast = MagicMock()
+    monkeypatch.setattr(user_manage_page, "wait_for_element_visible", toast)
+
+    user_manage_page.create_user("创建教师", "张三", "T001")
+
+    assert user_manage_page.create_user_result is None
+    assert user_manage_page.is_create_user_success() is True
+    toast.assert_called_once_with(user_manage_page.create_success_message)
@@ -0,0 +1,97 @@
+# ========================================
+# 会话认证状态池单元测试：注入与失效撤销（上下文/页面替身，不需要浏览器）
+# ========================================
+
+import pytest
+
+from utils.auth_helper import AuthStatePool
+
+KEY = AuthStatePool.make_key("admin", "智慧大学", "机构管理员")
+STATE = {
+    "cookies": [{"name": "token", "value": "t", "domain": "example.com", "path": "/"}],
+    "origins": [{"origin": "https://example.com", "localStorage": [{"name": "user", "value": "admin"}]}],
+    "sessionStorage": {"https://example.com": {"role": "机构管理员"}},
+}
+
+
+class _InitScript:
+    def __init__(self):
+        self.disposed = False
+
+    def dispose(self):
+        self.disposed = True
+
+
+class _Context:
+    def __init__(self, disposable=True):
+        self.cookies = []
+        self.init_scripts = []
+        self._disposable = disposable
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    def clear_cookies(self):
+        self.cookies.clear()
+
+    def add_init_script(self, script=None):
+        self.init_scripts.append(script)
+        return _InitScript() if self._disposable else None
+
+
+class _Page:
+    def __init__(self, context):
+        self.context = context
+        self.scripts = []
+
+    def evaluate(self, script):
+        self.scripts.append(script)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(AuthStatePool, "_instance", None)
+    instance = AuthStatePool()
+    instance._states[KEY] = STATE
+    return instance
+
+
+def test_seed_context_injects_once(pool):
+    context = _Context()
+
+    assert pool.seed_context(context, KEY)
+    assert pool.seed_context(context, KEY)
+    assert context.cookies == STATE["cookies"]
+    assert len(context.init_scripts) == 1
+    assert not pool.seed_context(context, ("other", "智慧大学", "教师"))
+
+
+def test_discard_reverts_context_and_invalidates(pool):
+    context = _Context()
+    page = _Page(context)
+    pool.seed_context(context, KEY)
+    init_script = context._auth_pool_init_script
+
+    pool.discard(page, KEY)
+
+    assert context.cookies == []
+    assert init_script.disposed
+    assert context._auth_pool_key is None
+    assert "localStorage.clear()" in page.scripts[0] and "sessionStorage.clear()" in page.scripts[0]
+    assert not pool.has_state(KEY)
+    # 上下文已释放，可再次注入（如重新登录后采集的新状态）
+    pool._states[KEY] = STATE
+    assert pool.seed_context(context, KEY)
+
+
+def test_discard_without_disposable_init_script(pool):
+    """旧版 Playwright 的 add_init_script 没有返回值，仍清空 cookies/storage 并移除状态"""
+    context = _Context(disposable=False)
+    page = _Page(context)
+    pool.seed_context(context, KEY)
+
+    pool.discard(page, KEY)
+
+    assert context.cookies == []
+    assert "__auth_pool_seeded__" in page.scripts[0]
+    assert not pool.has_state(KEY)
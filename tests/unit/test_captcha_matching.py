@@ -0,0 +1,87 @@
+# ========================================
+# 点字验证码匹配单元测试：候选字概率 + 最小代价指派（不加载模型、不需要浏览器）
+# ========================================
+
+import pytest
+
+from utils import click_captcha_ddddocr as captcha
+from utils.click_captcha_ddddocr import CaptchaLowConfidenceError, match_click_targets
+
+
+def _item(x, candidates=None, text="", confidence=1.0):
+    """构造一个 10x10 的检测框，中心为 (x + 5, 5)"""
+    return {"text": text, "bbox": [x, 0, x + 10, 10], "confidence": confidence, "candidates": candidates or {}}
+
+
+def test_assignment_beats_greedy():
+    # 贪心会让「甲」先占走第 0 个框（0.9），导致「乙」只能落在 0.1 的框上；
+    # 指派后整体概率 0.8 * 0.7 远高于 0.9 * 0.1
+    items = [
+        _item(0, {"甲": 0.9, "乙": 0.7}),
+        _item(20, {"甲": 0.8, "乙": 0.1}),
+    ]
+    centers, confidence = match_click_targets(["甲", "乙"], items)
+
+    assert centers == [(25.0, 5.0), (5.0, 5.0)]
+    assert confidence == pytest.approx(0.8 * 0.7)
+
+
+def test_centers_follow_target_order():
+    items = [_item(0, {"丙": 0.9}), _item(20, {"乙": 0.8}), _item(40, {"甲": 0.7})]
+    centers, confidence = match_click_targets(["甲", "乙", "丙"], items)
+
+    assert centers == [(45.0, 5.0), (25.0, 5.0), (5.0, 5.0)]
+    assert confidence == pytest.approx(0.9 * 0.8 * 0.7)
+
+
+def test_repeated_target_uses_distinct_boxes():
+    items = [_item(0, {"甲": 0.9}), _item(20, {"甲": 0.6}), _item(40, {"乙": 0.9})]
+    centers, confidence = match_click_targets(["甲", "甲"], items)
+
+    assert sorted(centers) == [(5.0, 5.0), (25.0, 5.0)]
+    assert confidence == pytest.approx(0.9 * 0.6)
+
+
+def test_falls_back_to_text_without_candidates():
+    items = [_item(0, text="乙", confidence=0.5), _item(20, text="甲", confidence=0.8)]
+    centers, confidence = match_click_targets(["甲", "乙"], items)
+
+    assert centers == [(25.0, 5.0), (5.0, 5.0)]
+    assert confidence == pytest.approx(0.8 * 0.5)
+
+
+def test_unmatched_target_gives_near_zero_confidence():
+    centers, confidence = match_click_targets(["甲"], [_item(0, {"乙": 0.9})])
+
+    assert centers == [(5.0, 5.0)]
+    assert confidence == 0.0
+
+
+def test_empty_targets():
+    assert match_click_targets([], [_item(0, {"甲": 0.9})]) == ([], 1.0)
+
+
+def test_fewer_boxes_than_targets_raises():
+    with pytest.raises(ValueError, match="检测框数量不足"):
+        match_click_targets(["甲", "乙"], [_item(0, {"甲": 0.9})])
+
+
+def test_solve_raises_on_low_confidence(monkeypatch):
+    items = [_item(0, {"甲": 0.4}), _item(20, {"乙": 0.9})]
+    monkeypatch.setattr(captcha, "detect_and_classify_items", lambda *args, **kwargs: items)
+
+    centers, confidence = captcha.solve_click_captcha(b"", "请依次点击：甲 乙")
+    assert centers == [(5.0, 5.0), (25.0, 5.0)]
+
+    with pytest.raises(CaptchaLowConfidenceError) as exc_info:
+        captcha.solve_click_captcha(b"", "请依次点击：甲 乙", min_confidence=0.5)
+    assert exc_info.value.confidence == pytest.approx(confidence)
+
+
+@pytest.mark.parametrize("results, covered", [
+    ([{"text": "甲", "confidence": 0.95}, {"text": "乙", "confidence": 0.95}], True),
+    ([{"text": "甲", "confidence": 0.95}, {"text": "乙", "confidence": 0.5}], False),
+    ([{"text": "甲", "confidence": 0.95}], False),
+])
+def test_targets_covered(results, covered):
+    assert captcha._targets_covered(["甲", "乙"], results, 0.9) is covered
@@ -0,0 +1,54 @@
+# ========================================
+# 点字验证码模型注册表单元测试（使用仓库根目录的 image.png，不需要浏览器）
+# ========================================
+
+from pathlib import Path
+
+import pytest
+
+from utils import click_captcha_ddddocr as captcha
+
+IMAGE = Path(__file__).resolve().parents[2] / "image.png"
+INSTRUCTION = "请依次点击：靶 尝 财"
+
+
+@pytest.fixture(scope="module")
+def image_bytes():
+    return IMAGE.read_bytes()
+
+
+def test_registry_loads_one_classifier_for_all_pools(image_bytes):
+    """不同字符池共用一个分类模型，注册表中只有检测与分类两个模型"""
+    for pool in ("靶尝财", "骋捕颁", "一二三四五"):
+        captcha.detect_and_classify_items(image_bytes, pool)
+    assert sorted(captcha.model_registry._models) == ["det", "ocr"]
+
+
+def test_pool_mask_limits_output_to_pool(image_bytes):
+    """字符池作为 logits 掩码：识别文本与候选字都只会出现池内字符"""
+    pool = "靶尝财"
+    items = captcha.detect_and_classify_items(image_bytes, pool)
+    assert items
+    for item in items:
+        assert set(item["text"]) <= set(pool)
+        assert set(item["candidates"]) <= set(pool)
+
+
+def test_solve_matches_legacy_implementation(image_bytes):
+    """与改动前的实现给出相同的点击中心"""
+    centers, confidence = captcha.solve_click_captcha(image_bytes, INSTRUCTION)
+    assert centers == captcha._legacy_ordered_click_centers(image_bytes, INSTRUCTION)
+    assert 0 < confidence <= 1
+
+
+def test_valid_index_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(captcha, "VALID_CACHE_SIZE", 2)
+    registry = captcha.model_registry
+    charset = ["", "甲", "乙", "丙"]
+    monkeypatch.setattr(registry, "_char_index", None)
+    monkeypatch.setattr(registry, "_valid_cache", type(registry._valid_cache)())
+    assert registry._valid_indices("乙甲", charset) == frozenset({0, 1, 2})
+    registry._valid_indices("丙", charset)
+    registry._valid_indices("甲", charset)
+    assert list(registry._valid_cache) == ["丙", "甲"]
+    assert registry._valid_indices(None, charset) is None
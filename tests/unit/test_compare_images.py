@@ -0,0 +1,100 @@
+# ========================================
+# 图片比较单元测试：SSIM 与 skimage 一致、uint8 MSE 不回绕、相同/预检提前结束、分块分数
+# ========================================
+
+import cv2
+import numpy as np
+import pytest
+from skimage.metrics import structural_similarity
+
+from utils.image_recognition import ImageRecognition
+
+
+@pytest.fixture(scope="module")
+def noisy_pair():
+    """随机灰度图与其加噪版本"""
+    rng = np.random.default_rng(0)
+    img1 = rng.integers(0, 256, size=(120, 160), dtype=np.uint8)
+    noise = rng.integers(-40, 41, size=img1.shape)
+    img2 = np.clip(img1.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return img1, img2
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_ssim_matches_skimage(seed):
+    rng = np.random.default_rng(seed)
+    img1 = rng.integers(0, 256, size=(90, 130), dtype=np.uint8)
+    img2 = cv2.GaussianBlur(img1, (5, 5), 0)
+
+    score, _ = ImageRecognition._score(img1, img2, "ssim")
+
+    assert score == pytest.approx(structural_similarity(img1, img2), abs=1e-4)
+
+
+def test_ssim_map_mean_matches_skimage_full_map(noisy_pair):
+    img1, img2 = noisy_pair
+    _, expected = structural_similarity(img1, img2, full=True)
+
+    ssim_map = ImageRecognition._ssim_map(img1, img2)
+
+    assert ssim_map.shape == img1.shape
+    assert float(ssim_map.mean()) == pytest.approx(float(expected.mean()), abs=1e-4)
+
+
+def test_uint8_mse_does_not_wrap():
+    black = np.zeros((1, 1), dtype=np.uint8)
+    white = np.full((1, 1), 255, dtype=np.uint8)
+
+    assert cv2.norm(black, white, cv2.NORM_L2SQR) == 65025
+    assert ImageRecognition._score(black, white, "mse")[0] == 65025
+    assert ImageRecognition.compare_images(np.zeros((8, 8), np.uint8), np.full((8, 8), 255, np.uint8),
+                                           method="mse") == 65025
+
+
+@pytest.mark.parametrize("method, score", [("ssim", 1.0), ("mse", 0.0)])
+def test_identical_images_exit_early(noisy_pair, method, score):
+    img1, _ = noisy_pair
+
+    detail = ImageRecognition.compare_images_detailed(img1, img1.copy(), method=method, tiles=(2, 3))
+
+    assert detail["early_exit"] == "identical"
+    assert detail["score"] == score
+    assert detail["tiles"].shape == (2, 3)
+
+
+@pytest.mark.parametrize("method", ["ssim", "mse"])
+def test_precheck_exits_early_for_clearly_different_large_images(method):
+    # 平滑渐变与其反色：缩小后差异仍然明显（随机噪声缩小后会被平均成一片灰）
+    img1 = np.tile(np.linspace(0, 255, 1920).astype(np.uint8), (1080, 1))
+    img2 = 255 - img1
+
+    detail = ImageRecognition.compare_images_detailed(img1, img2, method=method, precheck=True)
+
+    assert detail["early_exit"] == "precheck"
+
+
+def test_precheck_falls_through_for_similar_images(noisy_pair):
+    img1, _ = noisy_pair
+    large = cv2.resize(img1, (1600, 1200), interpolation=cv2.INTER_NEAREST)
+    changed = large.copy()
+    changed[:20, :20] = 0
+
+    detail = ImageRecognition.compare_images_detailed(large, changed, precheck=True)
+
+    assert detail["early_exit"] is None
+
+
+@pytest.mark.parametrize("method", ["ssim", "mse"])
+def test_tiles_single_out_changed_region(method):
+    rng = np.random.default_rng(5)
+    img1 = rng.integers(0, 256, size=(120, 160), dtype=np.uint8)
+    img2 = img1.copy()
+    # 只改动 3x4 分块中第 2 行第 3 列（40x40 块）
+    img2[40:80, 80:120] = 255 - img2[40:80, 80:120]
+
+    detail = ImageRecognition.compare_images_detailed(img1, img2, method=method, tiles=(3, 4))
+    tiles = detail["tiles"]
+
+    assert tiles.shape == (3, 4)
+    pick = tiles.argmin() if method == "ssim" else tiles.argmax()
+    assert np.unravel_index(pick, tiles.shape) == (1, 2)
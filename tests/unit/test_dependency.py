@@ -0,0 +1,282 @@
+# ========================================
+# 用例依赖调度单元测试：拓扑排序、跨进程状态、xdist 关键路径调度
+# ========================================
+
+from types import SimpleNamespace
+
+import pytest
+
+from common import dependency
+from common.dependency import DependencyScheduling, DependencyState, item_final_outcome, sort_items_by_dependency
+
+
+class _Marker:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+class _Item:
+    """只实现依赖模块用到的属性：nodeid / name / originalname / get_closest_marker / session"""
+
+    def __init__(self, name, order=None, depends_on=None, session=None):
+        self.name = self.originalname = name
+        self.nodeid = f"tests/test_demo.py::{name}"
+        kwargs = {}
+        if order is not None:
+            kwargs["order"] = order
+        if depends_on is not None:
+            kwargs["depends_on"] = depends_on
+        self._marker = _Marker(**kwargs) if kwargs else None
+        self.session = session
+
+    def get_closest_marker(self, name):
+        return self._marker if name == "run" else None
+
+
+def _names(items):
+    return [it.name for it in items]
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(DependencyState, "STATE_DIR", tmp_path / "dependency_state")
+    return tmp_path / "dependency_state"
+
+
+# ==================== sort_items_by_dependency ====================
+
+def test_sort_without_dependencies_follows_order_then_nodeid():
+    items = [_Item("test_c", 2), _Item("test_b"), _Item("test_a", 2), _Item("test_d", 1)]
+    assert _names(sort_items_by_dependency(items)) == ["test_d", "test_a", "test_c", "test_b"]
+
+
+def test_sort_moves_prerequisite_before_dependent():
+    items = [
+        _Item("test_create_major", order=10, depends_on=["create_dept"]),
+        _Item("test_create_dept", order=20),
+        _Item("test_other", order=15),
+    ]
+    assert _names(sort_items_by_dependency(items)) == ["test_other", "test_create_dept", "test_create_major"]
+
+
+def test_sort_ignores_missing_and_appends_cycles():
+    items = [
+        _Item("test_a", order=1, depends_on="b"),
+        _Item("test_b", order=2, depends_on=["a"]),
+        _Item("test_c", order=3, depends_on=["not_collected"]),
+    ]
+    assert _names(sort_items_by_dependency(items)) == ["test_c", "test_a", "test_b"]
+
+
+# ==================== DependencyState ====================
+
+def test_state_records_and_exports_graph(state_dir):
+    state = DependencyState()
+    items = [_Item("test_a"), _Item("test_b", depends_on=["a"])]
+    state.export_graph(items)
+    state.record(items[0].nodeid, "passed")
+
+    assert state.outcome_of(items[0].nodeid) == "passed"
+    assert state.outcome_of(items[1].nodeid) is None
+    assert state.load_graph()[items[1].nodeid] == {"name": "b", "prerequisites": [items[0].nodeid]}
+
+    state.reset()
+    assert state.outcome_of(items[0].nodeid) is None
+
+
+@pytest.mark.parametrize("outcome, blocked", [
+    ("passed", []),
+    ("skipped", []),
+    ("failed", ["a"]),
+    ("blocked", ["a"]),
+])
+def test_wait_for_prerequisites_by_outcome(state_dir, outcome, blocked):
+    session = SimpleNamespace(items=[])
+    session.items[:] = [_Item("test_a", session=session), _Item("test_b", depends_on=["a"], session=session)]
+    state = DependencyState()
+    state.record(session.items[0].nodeid, outcome)
+
+    assert state.wait_for_prerequisites(session.items[1], timeout=1, poll_interval=0.01) == blocked
+
+
+def test_blocked_outcome_propagates_down_chain(state_dir):
+    """a 失败 -> b 被阻断跳过并记为 blocked -> c 同样跳过，不会在缺数据的情况下执行"""
+    session = SimpleNamespace(items=[])
+    a = _Item("test_a", session=session)
+    b = _Item("test_b", depends_on=["a"], session=session)
+    c = _Item("test_c", depends_on=["b"], session=session)
+    session.items[:] = [a, b, c]
+    state = DependencyState()
+    state.record(a.nodeid, "failed")
+
+    # 与 conftest 一致：setup 中阻断时打标记，teardown 按 item_final_outcome 记录
+    b.dependency_blocked = state.wait_for_prerequisites(b, timeout=1, poll_interval=0.01)
+    b.rep_setup = SimpleNamespace(failed=False, skipped=True)
+    assert b.dependency_blocked == ["a"]
+    assert item_final_outcome(b) == "blocked"
+    state.record(b.nodeid, item_final_outcome(b))
+
+    assert state.wait_for_prerequisites(c, timeout=1, poll_interval=0.01) == ["b"]
+
+
+def test_wait_for_prerequisites_times_out(state_dir):
+    session = SimpleNamespace(items=[])
+    session.items[:] = [_Item("test_a", session=session), _Item("test_b", depends_on=["a"], session=session)]
+
+    assert DependencyState().wait_for_prerequisites(session.items[1], timeout=0.05, poll_interval=0.01) == [
+        "a(等待超时)"
+    ]
+
+
+def test_prerequisite_declared_later_is_ignored(state_dir):
+    """只等待排在自己之前的前置用例（与 export_graph 的无环约束一致）"""
+    session = SimpleNamespace(items=[])
+    session.items[:] = [_Item("test_b", depends_on=["a"], session=session), _Item("test_a", session=session)]
+
+    assert DependencyState().wait_for_prerequisites(session.items[0], timeout=0) == []
+
+
+# ==================== DependencyScheduling ====================
+
+class _Node:
+    """xdist WorkerController 的最小替身"""
+
+    def __init__(self, name):
+        self.gateway = SimpleNamespace(id=name)
+        self.shutting_down = False
+        self.sent = []
+
+    def send_runtest_some(self, indices):
+        self.sent.extend(indices)
+
+    def shutdown(self):
+        self.shutting_down = True
+
+
+def _scheduler(monkeypatch, state_dir, collection, graph, weights, numnodes=2):
+    """按给定依赖图与耗时构造调度器，并完成收集与首次分发"""
+    import xdist.workermanage
+
+    monkeypatch.setattr(xdist.workermanage, "parse_tx_spec_config", lambda config: ["popen"] * numnodes)
+    monkeypatch.setattr(DependencyScheduling, "_load_weights", lambda self: list(weights))
+    DependencyState()._write_atomic(
+        state_dir / DependencyState.GRAPH_FILE,
+        {nodeid: {"name": nodeid, "prerequisites": graph.get(nodeid, [])} for nodeid in collection},
+    )
+    sched = DependencyScheduling(config=None, log=SimpleNamespace(depsched=lambda *args: None))
+    nodes = [_Node(f"gw{i}") for i in range(numnodes)]
+    for node in nodes:
+        sched.add_node(node)
+        sched.add_node_collection(node, collection)
+    sched.schedule()
+    return sched, nodes
+
+
+def test_scheduler_sends_longest_processing_time_first(monkeypatch, state_dir):
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c", "d"], {}, [1, 5, 3, 2])
+
+    # 空闲 worker 先各拿最长的就绪用例，再补到每个 worker 2 条
+    assert gw0.sent == [1, 3]
+    assert gw1.sent == [2, 0]
+    assert sched.pending == []
+    assert gw0.shutting_down and gw1.shutting_down
+
+
+def test_scheduler_prioritises_critical_path(monkeypatch, state_dir):
+    # a -> b 的链总耗时 1 + 10，长于独立用例 c（5），a 应先于 c 分发
+    sched, (gw0,) = _scheduler(monkeypatch, state_dir, ["a", "b", "c"], {"b": ["a"]}, [1, 10, 5], numnodes=1)
+
+    assert sched._priority == {0: 11, 1: 10, 2: 5}
+    assert gw0.sent == [0, 2]
+
+    sched.mark_test_complete(gw0, 0)
+    assert gw0.sent == [0, 2, 1]
+    assert sched.pending == []
+
+
+def test_scheduler_only_fills_with_dispatched_prerequisites(monkeypatch, state_dir):
+    # c 依赖 b，b 依赖 a：首轮只有 a 就绪，补位时 b 的前置已分发可补，c 的前置 b 未分发前不能补
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c"], {"b": ["a"], "c": ["b"]}, [1, 1, 1])
+
+    assert gw0.sent == [0, 1]
+    assert gw1.sent == [2]
+    assert not sched.tests_finished
+
+    for index in (0, 1):
+        sched.mark_test_complete(gw0, index)
+    sched.mark_test_complete(gw1, 2)
+    assert sched.tests_finished
+    assert not sched.has_pending
+
+
+def test_remove_pending_tests_from_node_requeues(monkeypatch, state_dir):
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c", "d", "e"], {}, [5, 4, 3, 2, 1])
+    assert sched.node2pending == {gw0: [0, 2], gw1: [1, 3]}
+    assert sched.pending == [4]
+
+    gw1.shutting_down = True  # 交还后不应再发回同一个 worker
+    sched.remove_pending_tests_from_node(gw1, [3])
+
+    assert sched.node2pending[gw1] == [1]
+    assert 3 not in sched._dispatched
+    assert sorted(sched.pending) == [3, 4]
+
+    sched.mark_test_complete(gw0, 0)
+    assert sched.node2pending[gw0] == [2, 3]
+
+
+def test_remove_node_requeues_all_but_crashed(monkeypatch, state_dir):
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c", "d", "e"], {}, [5, 4, 3, 2, 1])
+    gw0.shutting_down = True
+
+    crashed = sched.remove_node(gw1)
+
+    assert crashed == "b"
+    assert 1 in sched._completed
+    assert gw1 not in sched.node2pending
+    assert sorted(sched.pending) == [3, 4]
+    # 崩溃用例记为失败，依赖它的用例不用等到超时
+    assert DependencyState().outcome_of("b") == "failed"
+
+
+def test_crashed_prerequisite_unblocks_dependents_immediately(monkeypatch, state_dir):
+    session = SimpleNamespace(items=[])
+    session.items[:] = [_Item("test_a", session=session), _Item("test_b", depends_on=["a"], session=session)]
+    prerequisite, dependent = session.items
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, [prerequisite.nodeid, dependent.nodeid], {}, [1, 1])
+
+    assert sched.remove_node(gw0) == prerequisite.nodeid
+    assert DependencyState().wait_for_prerequisites(dependent, timeout=5, poll_interval=0.01) == ["a"]
+
+
+def test_remove_node_keeps_outcome_recorded_by_worker(monkeypatch, state_dir):
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c"], {}, [3, 2, 1])
+    DependencyState().record("a", "passed")
+
+    assert sched.remove_node(gw0) == "a"
+    assert DependencyState().outcome_of("a") == "passed"
+
+
+def test_mark_test_pending_forgets_crash_outcome(monkeypatch, state_dir):
+    sched, (gw0, gw1) = _scheduler(monkeypatch, state_dir, ["a", "b", "c"], {}, [3, 2, 1])
+    crashed = sched.remove_node(gw0)
+
+    sched.mark_test_pending(crashed)
+
+    assert DependencyState().outcome_of(crashed) is None
+    assert 0 not in sched._completed
+
+
+def test_load_weights_uses_median_for_unknown(monkeypatch, state_dir):
+    from common import duration_history
+
+    monkeypatch.setattr(dependency.Settings, "DURATION_SCHEDULING", True)
+    monkeypatch.setattr(
+        duration_history.DurationHistory, "expected_durations",
+        lambda self, env: {"a": 2.0, "b": 8.0, "c": 4.0},
+    )
+    sched = object.__new__(DependencyScheduling)
+    sched.collection = ["a", "b", "c", "x"]
+    sched.log = lambda *args: None
+
+    assert sched._load_weights() == [2.0, 8.0, 4.0, 4.0]
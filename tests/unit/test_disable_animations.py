@@ -0,0 +1,83 @@
+# ========================================
+# 禁用动画初始化脚本测试：文档解析前（根节点为空）不报错，根节点出现后插入一次样式
+# ========================================
+# 使用 Playwright 自带的 node 执行脚本，用最小的 document 替身模拟初始化脚本的执行时机，不启动浏览器。
+# ========================================
+
+import json
+import subprocess
+
+from playwright._impl._driver import compute_driver_executable
+
+import conftest as root_conftest
+
+# 最小 DOM 替身：documentElement/head 初始为空，可手动触发 MutationObserver 与 DOMContentLoaded
+_HARNESS = """
+const inserted = [];
+const observers = [];
+const listeners = {};
+const makeRoot = (name) => ({
+    name,
+    appendChild(node) { inserted.push({ root: name, id: node.id }); node.parent = name; },
+});
+global.document = {
+    head: null,
+    documentElement: %(root)s,
+    createElement: (tag) => ({ tag, id: "", textContent: "" }),
+    getElementById: (id) => inserted.find((item) => item.id === id) || null,
+    addEventListener: (type, fn) => { listeners[type] = fn; },
+};
+global.MutationObserver = class {
+    constructor(callback) { this.callback = callback; this.connected = false; observers.push(this); }
+    observe() { this.connected = true; }
+    disconnect() { this.connected = false; }
+};
+const snapshot = () => ({
+    inserted: inserted.slice(),
+    observing: observers.some((o) => o.connected),
+    hasListener: "DOMContentLoaded" in listeners,
+});
+const result = {};
+%(script)s
+result.initial = snapshot();
+if (!document.documentElement) {
+    observers.forEach((o) => o.connected && o.callback([]));
+    result.stillEmpty = snapshot();
+    document.documentElement = makeRoot("html");
+    observers.forEach((o) => o.connected && o.callback([]));
+    result.rootAppeared = snapshot();
+    document.head = makeRoot("head");
+    listeners.DOMContentLoaded && listeners.DOMContentLoaded();
+    result.loaded = snapshot();
+}
+console.log(JSON.stringify(result));
+"""
+
+
+def _run(root: str) -> dict:
+    node, _ = compute_driver_executable()
+    script = _HARNESS % {"root": root, "script": root_conftest._DISABLE_ANIMATIONS_SCRIPT}
+    completed = subprocess.run([node, "-e", script], capture_output=True, text=True, timeout=30)
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout)
+
+
+def test_inserts_immediately_when_root_exists():
+    result = _run('makeRoot("html")')
+
+    assert result["initial"]["inserted"] == [{"root": "html", "id": "__disable_animations__"}]
+    assert not result["initial"]["observing"]
+
+
+def test_waits_for_root_before_document_is_parsed():
+    result = _run("null")
+
+    # 根节点为空时不报错，也不插入，转为监听
+    assert result["initial"]["inserted"] == []
+    assert result["initial"]["observing"] and result["initial"]["hasListener"]
+    assert result["stillEmpty"]["inserted"] == []
+
+    # 根节点出现后插入一次并停止监听；DOMContentLoaded 兜底时不重复插入
+    assert result["rootAppeared"]["inserted"] == [{"root": "html", "id": "__disable_animations__"}]
+    assert not result["rootAppeared"]["observing"]
+    assert result["loaded"]["inserted"] == result["rootAppeared"]["inserted"]
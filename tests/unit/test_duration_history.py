@@ -0,0 +1,150 @@
+# ========================================
+# 用例耗时历史单元测试：记录、趋势、预计耗时、滚动基线回归检测（临时数据库）
+# ========================================
+
+from types import SimpleNamespace
+
+import pytest
+
+import conftest as root_conftest
+from common.duration_history import KIND_STEP, KIND_TEST, DurationHistory
+
+ENV = "gqkt/test.yaml"
+LOGIN = "tests/test_login.py::test_login"
+SEARCH = "tests/test_search.py::test_search"
+
+
+@pytest.fixture
+def history(tmp_path):
+    return DurationHistory(db_file=tmp_path / "duration_history.db")
+
+
+def _record(history, durations, env=ENV, steps=None):
+    return history.record_run(env=env, test_durations=durations, steps=steps, commit="abc123")
+
+
+def test_record_run_aggregates_steps(history):
+    steps = [{"title": "点击登录", "wall_ms": ms} for ms in (100, 200, 300)]
+    run_id = _record(history, {LOGIN: 1.5}, steps=steps)
+
+    (test,) = history.trend(LOGIN)
+    assert {key: test[key] for key in ("run_id", "env", "commit", "count", "p50_ms", "p95_ms")} == {
+        "run_id": run_id, "env": ENV, "commit": "abc123", "count": 1, "p50_ms": 1500.0, "p95_ms": 1500.0,
+    }
+    (step,) = history.trend("点击登录", kind=KIND_STEP)
+    assert step["count"] == 3
+    assert step["p50_ms"] == pytest.approx(200)
+
+
+def test_trend_filters_env_and_limits(history):
+    for seconds in (1, 2, 3):
+        _record(history, {LOGIN: seconds})
+    _record(history, {LOGIN: 9}, env="gqkt/prod.yaml")
+
+    assert [row["p95_ms"] for row in history.trend(LOGIN, env=ENV, limit=2)] == [2000, 3000]
+    assert len(history.trend(LOGIN)) == 4
+
+
+def test_prune_keeps_recent_runs_per_env(history):
+    for seconds in (1, 2, 3):
+        _record(history, {LOGIN: seconds})
+    _record(history, {LOGIN: 9}, env="gqkt/prod.yaml")
+
+    history.prune(ENV, keep_runs=2)
+
+    assert [row["p95_ms"] for row in history.trend(LOGIN, env=ENV)] == [2000, 3000]
+    assert len(history.trend(LOGIN, env="gqkt/prod.yaml")) == 1
+
+
+def test_expected_durations_median_of_window(history):
+    for seconds in (100, 1, 2, 3):
+        _record(history, {LOGIN: seconds, SEARCH: 5})
+    _record(history, {LOGIN: 50}, env="gqkt/prod.yaml")
+
+    # 最近 3 次：1、2、3 秒，中位数 2 秒；更早的 100 秒与其它环境不计入
+    assert history.expected_durations(ENV, window=3) == {LOGIN: 2.0, SEARCH: 5.0}
+
+
+def test_expected_durations_without_history(tmp_path):
+    history = DurationHistory(db_file=tmp_path / "missing.db")
+    assert history.expected_durations(ENV) == {}
+    assert not (tmp_path / "missing.db").exists()
+    _record(history, {LOGIN: 1}, env="gqkt/prod.yaml")
+    assert history.expected_durations(ENV) == {}
+
+
+def test_regressions_against_rolling_baseline(history):
+    for seconds in (1.0, 1.2, 1.1):
+        _record(history, {LOGIN: seconds, SEARCH: 2.0})
+    run_id = _record(history, {LOGIN: 2.0, SEARCH: 2.2})
+
+    alerts = history.regressions(run_id, threshold=0.3, window=5, min_runs=3, min_ms=0)
+
+    assert alerts == [{"kind": KIND_TEST, "name": LOGIN, "p95_ms": 2000.0, "baseline_ms": 1100.0, "ratio": 0.818}]
+
+
+def test_regressions_sorted_by_ratio(history):
+    for _ in range(3):
+        _record(history, {LOGIN: 1.0, SEARCH: 1.0})
+    run_id = _record(history, {LOGIN: 1.5, SEARCH: 3.0})
+
+    alerts = history.regressions(run_id, threshold=0.3, window=5, min_runs=3, min_ms=0)
+
+    assert [alert["name"] for alert in alerts] == [SEARCH, LOGIN]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"min_runs": 4},        # 基线次数不足
+    {"min_ms": 5000},       # 本次耗时低于告警下限
+    {"threshold": 1.0},     # 上涨未超过阈值
+])
+def test_regressions_suppressed(history, kwargs):
+    for _ in range(3):
+        _record(history, {LOGIN: 1.0})
+    run_id = _record(history, {LOGIN: 1.8})
+
+    options = {"threshold": 0.3, "window": 5, "min_runs": 3, "min_ms": 0, **kwargs}
+    assert history.regressions(run_id, **options) == []
+
+
+def test_regressions_baseline_only_uses_same_env_and_earlier_runs(history):
+    for _ in range(3):
+        _record(history, {LOGIN: 1.0})
+    _record(history, {LOGIN: 10.0}, env="gqkt/prod.yaml")
+    run_id = _record(history, {LOGIN: 2.0})
+    _record(history, {LOGIN: 10.0})
+
+    (alert,) = history.regressions(run_id, threshold=0.3, window=5, min_runs=3, min_ms=0)
+    assert alert["baseline_ms"] == 1000.0
+
+
+def test_regressions_unknown_run(history):
+    assert history.regressions(999) == []
+
+
+def _report(nodeid, when, outcome, duration=1.0):
+    return SimpleNamespace(
+        nodeid=nodeid, when=when, duration=duration, description=nodeid, user_properties=[],
+        passed=outcome == "passed", failed=outcome == "failed", skipped=outcome == "skipped",
+    )
+
+
+def test_terminal_durations_flag_only_passed_tests():
+    """跳过（含被阻断）、失败、teardown 出错的用例标记为未通过，不写入历史"""
+    blocked = "tests/test_b.py::test_blocked"
+    failed = "tests/test_c.py::test_failed"
+    teardown_error = "tests/test_d.py::test_teardown_error"
+    reporter = SimpleNamespace(stats={
+        "passed": [_report(LOGIN, "call", "passed"), _report(teardown_error, "call", "passed")],
+        "skipped": [_report(blocked, "setup", "skipped", 0.001)],
+        "failed": [_report(failed, "call", "failed", 30.0), _report(teardown_error, "teardown", "failed")],
+        "": [_report(nodeid, when, "passed", 0.1) for nodeid in (LOGIN, failed, teardown_error)
+             for when in ("setup", "teardown") if not (nodeid == teardown_error and when == "teardown")],
+    })
+
+    durations = root_conftest._test_durations_from_terminal_reporter(reporter)
+
+    assert {nodeid: passed for nodeid, (_, _, passed) in durations.items()} == {
+        LOGIN: True, blocked: False, failed: False, teardown_error: False,
+    }
+    assert durations[LOGIN][1] == pytest.approx(1.2)
@@ -0,0 +1,67 @@
+# ========================================
+# ImageRecognition 缓存单元测试：load_image 的副本语义、哈希缓存上限与哈希索引单次解码
+# ========================================
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from config.settings import Settings
+from utils.image_recognition import ImageRecognition
+
+IMAGE = Path(__file__).resolve().parents[2] / "result.jpg"
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    ImageRecognition.clear_cache()
+    yield
+    ImageRecognition.clear_cache()
+
+
+def test_load_image_returns_writable_copy_by_default():
+    first = ImageRecognition.load_image(IMAGE)
+    first[0, 0] = 255 - first[0, 0]
+
+    second = ImageRecognition.load_image(IMAGE)
+    assert second.flags.writeable
+    assert (second[0, 0] != first[0, 0]).any()
+
+
+def test_load_image_copy_false_shares_read_only_cache():
+    shared = ImageRecognition.load_image(IMAGE, copy=False)
+    assert ImageRecognition.load_image(IMAGE, copy=False) is shared
+    with pytest.raises(ValueError):
+        shared[0, 0] = 0
+
+
+def test_hash_cache_is_bounded(monkeypatch, tmp_path):
+    pytest.importorskip("imagehash")
+    monkeypatch.setattr(Settings, "IMAGE_HASH_CACHE_SIZE", 2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.jpg"
+        shutil.copy(IMAGE, path)
+        paths.append(path)
+        ImageRecognition.get_image_hash(path)
+
+    cached = [key[0] for key in ImageRecognition._hash_cache]
+    assert cached == [str(paths[1]), str(paths[2])]
+
+
+def test_indexed_hash_decodes_once(monkeypatch, tmp_path):
+    pytest.importorskip("imagehash")
+    path = tmp_path / "baseline.jpg"
+    shutil.copy(IMAGE, path)
+    expected = {name: ImageRecognition._compute_hash(str(path), name) for name in ("phash", "dhash", "ahash")}
+    opened = []
+    original = ImageRecognition._open_pil.__func__
+    monkeypatch.setattr(ImageRecognition, "_open_pil",
+                        classmethod(lambda cls, image: opened.append(image) or original(cls, image)))
+
+    assert ImageRecognition.get_image_hash(path, "ahash", use_index=True) == expected["ahash"]
+
+    assert len(opened) == 1
+    index = ImageRecognition._read_hash_index(tmp_path / ImageRecognition.HASH_INDEX_FILENAME)
+    assert {name: index[path.name][name] for name in expected} == expected
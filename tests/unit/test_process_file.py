@@ -0,0 +1,105 @@
+# ========================================
+# 测试进度日志单元测试：追加写入、按 nodeid 取最后结果、多进程并发计数
+# ========================================
+
+import multiprocessing
+
+import pytest
+
+from common.process_file import ProcessFile
+from config.settings import Settings
+
+
+@pytest.fixture
+def process(tmp_path, monkeypatch):
+    """指向临时目录的全新实例（测试结束后恢复原单例）"""
+    monkeypatch.setattr(Settings, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(ProcessFile, "_instance", None)
+    instance = ProcessFile()
+    instance.reset_all()
+    return instance
+
+
+def _update_success_many(times):
+    process = ProcessFile()
+    for _ in range(times):
+        process.update_success()
+
+
+def test_journal_uses_wal(process):
+    assert process.process_file.parent == Settings.PROJECT_ROOT / "logs"
+    assert process._query("PRAGMA journal_mode") == [("wal",)]
+
+
+def test_counts_and_progress(process):
+    process.init_process(total=4)
+    process.update_success()
+    process.update_success()
+    process.update_fail()
+
+    total, success, fail, skip, start_time = process.get_result()
+    assert (total, success, fail, skip) == (4, 2, 1, 0)
+    assert start_time != "-"
+    assert process.get_progress() == "75.0%"
+
+
+def test_init_process_keeps_results_and_first_start_time(process):
+    process.init_process(total=2)
+    process._set_meta("start_time", "2024-01-01 00:00:00")
+    process.update_skip()
+
+    process.init_process(total=3)  # 另一个 worker 再次初始化
+
+    assert process.get_result() == (3, 0, 0, 1, "2024-01-01 00:00:00")
+
+
+def test_last_result_per_nodeid_wins(process):
+    process.record_failed_testcase("tests/test_a.py::test_a", "用例A")
+    process.record_success_testcase("tests/test_b.py::test_b", "用例B")
+    process.record_skipped_testcase("tests/test_c.py::test_c", "用例C")
+    process.record_success_testcase("tests/test_a.py::test_a", "用例A")  # 失败重跑后通过
+
+    assert process.get_success_testcases() == ["用例A", "用例B"]
+    assert process.get_failed_testcases() == []
+    assert process.get_skipped_testcases() == ["用例C"]
+
+
+def test_reset_all_clears_events_and_meta(process):
+    process.init_process(total=1)
+    process.update_fail()
+    process.record_failed_testcase("tests/test_a.py::test_a", "用例A")
+
+    process.reset_all()
+
+    assert process.get_result() == (0, 0, 0, 0, "-")
+    assert process.get_failed_testcases() == []
+    assert process.get_progress() == "0%"
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2024-01-01 00:00:00", "2024-01-01 00:00:05", "5秒"),
+    ("2024-01-01 00:00:00", "2024-01-01 00:02:03", "2分3秒"),
+    ("2024-01-01 00:00:00", "2024-01-01 01:02:03", "1小时2分3秒"),
+])
+def test_get_duration(process, start, end, expected):
+    process._set_meta("start_time", start)
+    process._set_meta("end_time", end)
+    assert process.get_duration() == expected
+
+
+def test_get_duration_without_end_time(process):
+    process.init_process(total=1)
+    assert process.get_duration() == "未知"
+
+
+def test_concurrent_processes_do_not_lose_updates(process):
+    """模拟多个 xdist worker 同时追加计数，结果不丢失"""
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_update_success_many, args=(25,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert [worker.exitcode for worker in workers] == [0, 0, 0, 0]
+    assert process.get_result()[1] == 100
@@ -0,0 +1,163 @@
+# ========================================
+# 请求拦截统计测试
+# ========================================
+
+import re
+
+import pytest
+
+from utils import request_router
+from utils.request_router import RequestRouter, route_regex
+
+CONFIG = {
+    "enabled": True,
+    "allow_urls": ["captcha"],
+    "rules": [
+        {"resource_types": ["media"], "action": "abort"},
+        {"urls": ["*hm.baidu.com*"], "action": "stub"},
+    ],
+}
+
+
+class _Request:
+    def __init__(self, url, resource_type, headers=None):
+        self.url = url
+        self.resource_type = resource_type
+        self.headers = headers or {}
+
+
+class _Route:
+    def __init__(self):
+        self.action = None
+
+    def fallback(self):
+        self.action = "fallback"
+
+    def abort(self, error_code=None):
+        self.action = "abort"
+
+    def fulfill(self, **kwargs):
+        self.action = "stub"
+
+
+class _Response:
+    def __init__(self, size):
+        self.headers = {"content-length": str(size)}
+
+    def dispose(self):
+        pass
+
+
+class _Context:
+    """记录 HEAD 请求的浏览器上下文"""
+
+    def __init__(self, size=1000):
+        self.heads = []
+        self.request = self
+        self.size = size
+
+    def head(self, url, **kwargs):
+        self.heads.append(url)
+        return _Response(self.size)
+
+
+@pytest.fixture(autouse=True)
+def empty_size_cache(monkeypatch):
+    monkeypatch.setattr(RequestRouter, "_size_cache", type(RequestRouter._size_cache)())
+
+
+def _route(router, url, resource_type, headers=None):
+    route = _Route()
+    router._handle(route, _Request(url, resource_type, headers))
+    return route.action
+
+
+def test_rules_and_allow_list():
+    router = RequestRouter(CONFIG)
+    assert _route(router, "https://cdn/a.mp4", "media") == "abort"
+    assert _route(router, "https://hm.baidu.com/hm.gif?si=1&u=x", "image") == "stub"
+    assert _route(router, "https://cdn/captcha.mp4", "media") == "fallback"
+    assert _route(router, "https://cdn/app.js", "script") == "fallback"
+    assert router.summary()["blocked"] == 2
+
+
+def test_measurement_is_off_by_default_and_never_touches_stubs():
+    router = RequestRouter(CONFIG)
+    context = _Context()
+    _route(router, "https://cdn/a.mp4", "media")
+    _route(router, "https://hm.baidu.com/hm.gif?si=1", "image")
+
+    stats = router.summary(context)
+
+    assert context.heads == []
+    assert stats == {"blocked": 2, "stubbed": 1, "bytes": 0, "unmeasured": 1, "by_type": {"media": 1, "image": 1}}
+
+
+def test_exposed_size_is_used_without_head():
+    router = RequestRouter(dict(CONFIG, measure_bytes=True))
+    context = _Context()
+    _route(router, "https://cdn/a.mp4", "media", {"range": "bytes=0-1023"})
+
+    stats = router.summary(context)
+    assert (stats["bytes"], stats["unmeasured"]) == (1024, 0)
+    assert context.heads == []
+
+
+def test_request_content_length_and_open_range_are_not_response_size():
+    """请求的 Content-Length 是上传体大小，bytes=0- 没有上界，都记为大小未知"""
+    router = RequestRouter({"enabled": True, "rules": [{"urls": ["/api/track"], "action": "abort"},
+                                                       {"resource_types": ["media"], "action": "abort"}]})
+    _route(router, "https://x/api/track", "xhr", {"content-length": "2048"})
+    _route(router, "https://cdn/a.mp4", "media", {"range": "bytes=0-"})
+
+    stats = router.summary()
+    assert (stats["bytes"], stats["unmeasured"]) == (0, 2)
+
+
+def test_measure_heads_only_aborted_urls_once():
+    router = RequestRouter(dict(CONFIG, measure_bytes=True))
+    context = _Context(size=500)
+    for _ in range(2):
+        _route(router, "https://cdn/a.mp4", "media")
+    _route(router, "https://hm.baidu.com/hm.gif?si=1", "image")
+
+    assert router.summary(context)["bytes"] == 1000
+    assert context.heads == ["https://cdn/a.mp4"]
+
+
+def test_size_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(request_router, "SIZE_CACHE_MAX", 3)
+    for i in range(5):
+        RequestRouter._cache_size(f"https://cdn/{i}.mp4", i)
+
+    assert list(RequestRouter._size_cache) == [f"https://cdn/{i}.mp4" for i in (2, 3, 4)]
+
+
+def test_route_pattern_is_narrowed_to_rule_urls():
+    router = RequestRouter({
+        "enabled": True,
+        "rules": [
+            {"urls": ["re:\\.mp4(\\?|$)"], "action": "abort"},
+            {"urls": ["*hm.baidu.com*", "cnzz.com"], "action": "stub"},
+        ],
+    })
+    pattern = router.route_pattern()
+
+    for url in ("https://cdn/a.mp4?t=1", "https://hm.baidu.com/hm.js?x", "https://s4.cnzz.com/z.js"):
+        assert pattern.search(url)
+    for url in ("https://cdn/app.js", "https://cdn/a.mp4.map"):
+        assert not pattern.search(url)
+
+
+def test_route_pattern_falls_back_to_all_for_type_only_rules():
+    assert RequestRouter(CONFIG).route_pattern() == "**/*"
+
+
+@pytest.mark.parametrize("pattern, url, matched", [
+    ("*hm.baidu.com*", "https://hm.baidu.com/hm.gif", True),
+    ("https://cdn/*.mp?", "https://cdn/v/a.mp4", True),
+    ("https://cdn/*.mp4", "https://cdn/a.mp4?t=1", False),
+    ("a+b", "https://x/a+b.js", True),
+])
+def test_route_regex_matches_like_url_matches(pattern, url, matched):
+    assert bool(re.search(route_regex(pattern), url)) is matched
@@ -0,0 +1,92 @@
+# ========================================
+# 请求跟踪器单元测试：按需挂监听、URL 活动记录上限、静默等待（Page 替身，不启动浏览器）
+# ========================================
+
+import pytest
+
+from base.base_page import BasePage
+from config.settings import Settings
+from utils.request_tracker import RequestTracker
+
+
+class _Page:
+    """记录 page.on 挂载的事件处理器，emit 模拟请求事件"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, request):
+        for handler in self.handlers.get(event, []):
+            handler(request)
+
+    def wait_for_timeout(self, ms):
+        pass
+
+
+class _Request:
+    def __init__(self, url, resource_type="xhr"):
+        self.url = url
+        self.resource_type = resource_type
+
+
+@pytest.fixture
+def fake_page(monkeypatch):
+    monkeypatch.setattr(Settings, "REQUEST_TRACKER_INCLUDE", "")
+    monkeypatch.setattr(Settings, "REQUEST_TRACKER_EXCLUDE", "")
+    monkeypatch.setattr(Settings, "REQUEST_TRACKER_TYPES", "document,xhr,fetch")
+    return _Page()
+
+
+def test_page_object_attaches_listeners_only_on_first_use(fake_page):
+    first, second = BasePage(fake_page), BasePage(fake_page)
+    assert fake_page.handlers == {}
+
+    assert first.request_tracker is second.request_tracker
+    assert {event: len(handlers) for event, handlers in fake_page.handlers.items()} == {
+        "request": 1, "requestfinished": 1, "requestfailed": 1,
+    }
+
+
+def test_last_activity_is_capped(fake_page, monkeypatch):
+    monkeypatch.setattr(RequestTracker, "MAX_TRACKED_URLS", 3)
+    tracker = RequestTracker(fake_page)
+
+    for i in range(5):
+        request = _Request(f"https://x.test/api/item/{i}")
+        fake_page.emit("request", request)
+        fake_page.emit("requestfinished", request)
+    fake_page.emit("request", _Request("https://x.test/api/item/2"))
+
+    assert list(tracker._last_activity) == [
+        "https://x.test/api/item/3", "https://x.test/api/item/4", "https://x.test/api/item/2",
+    ]
+
+
+def test_wait_for_settled_ignores_untracked_and_finishes(fake_page):
+    tracker = RequestTracker(fake_page, exclude=["/heartbeat"])
+    fake_page.emit("request", _Request("https://x.test/heartbeat"))
+    fake_page.emit("request", _Request("https://x.test/logo.png", resource_type="image"))
+    request = _Request("https://x.test/api/course/list")
+    fake_page.emit("request", request)
+
+    assert tracker.pending() == ["https://x.test/api/course/list"]
+    fake_page.emit("requestfinished", request)
+    assert tracker.pending() == []
+    tracker.wait_for_settled(quiet_ms=0, timeout=1000)
+
+
+def test_wait_for_settled_times_out(fake_page):
+    tracker = RequestTracker(fake_page)
+    fake_page.emit("request", _Request("https://x.test/api/slow"))
+
+    with pytest.raises(TimeoutError):
+        tracker.wait_for_settled(quiet_ms=0, timeout=50)
@@ -0,0 +1,118 @@
+# ========================================
+# 截图写入器单元测试：Allure 附件在调用线程同步挂载（按配置转码/缩放），只有写盘在后台
+# ========================================
+
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from config.settings import Settings
+from utils import screenshot_helper
+from utils.screenshot_helper import ScreenshotHelper, ScreenshotWriter
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    calls = []
+
+    def fake_attach(body, name=None, attachment_type=None, extension=None):
+        calls.append({"name": name, "thread": threading.current_thread(), "extension": extension, "body": body})
+
+    monkeypatch.setattr(screenshot_helper.allure, "attach", fake_attach)
+    monkeypatch.setattr(ScreenshotWriter, "_instance", None)  # 每个用例独立的去重索引
+    monkeypatch.setattr(Settings, "SCREENSHOT_ASYNC", True)
+    monkeypatch.setattr(Settings, "SCREENSHOT_FORMAT", "png")
+    monkeypatch.setattr(Settings, "SCREENSHOT_MAX_DIMENSION", 0)
+    monkeypatch.setattr(Settings, "SCREENSHOT_DEDUP", True)
+    return calls
+
+
+def test_submit_attaches_in_calling_thread(attached, tmp_path):
+    writer = ScreenshotWriter()
+    path = writer.submit(PNG_BYTES, tmp_path / "step_shot.png", name="step_shot")
+
+    # 返回前已挂载，flush 之前就能出现在调用方的步骤中
+    assert [(c["name"], c["thread"], c["extension"]) for c in attached] == [
+        ("step_shot", threading.current_thread(), "png")
+    ]
+    writer.flush()
+    assert (tmp_path / "step_shot.png").read_bytes() == PNG_BYTES
+    assert path == str(tmp_path / "step_shot.png")
+
+
+def test_duplicate_is_attached_again_but_written_once(attached, tmp_path):
+    writer = ScreenshotWriter()
+    data = PNG_BYTES + b"dup"
+    first = writer.submit(data, tmp_path / "a.png", name="a")
+    second = writer.submit(data, tmp_path / "b.png", name="b")
+    writer.flush()
+
+    assert [c["name"] for c in attached] == ["a", "b"]
+    assert second == first
+    assert not (tmp_path / "b.png").exists()
+
+
+def test_attach_to_allure_false_only_writes(attached, tmp_path):
+    writer = ScreenshotWriter()
+    writer.submit(PNG_BYTES + b"quiet", tmp_path / "quiet.png", name="quiet", attach_to_allure=False)
+    writer.flush()
+
+    assert attached == []
+    assert (tmp_path / "quiet.png").exists()
+
+
+@pytest.mark.parametrize("fmt, extension", [("webp", "webp"), ("jpeg", "jpg"), ("png", "png")])
+def test_attachment_uses_configured_format_and_size(attached, tmp_path, monkeypatch, fmt, extension):
+    """SCREENSHOT_FORMAT / SCREENSHOT_MAX_DIMENSION 同样作用于 Allure 附件，附件与落盘文件一致"""
+    monkeypatch.setattr(Settings, "SCREENSHOT_FORMAT", fmt)
+    monkeypatch.setattr(Settings, "SCREENSHOT_MAX_DIMENSION", 400)
+    rng = np.random.default_rng(0)
+    page = rng.integers(0, 256, size=(1000, 1600, 3), dtype=np.uint8)
+    data = cv2.imencode(".png", page)[1].tobytes()
+
+    writer = ScreenshotWriter()
+    path = writer.submit(data, tmp_path / "big.png", name="big")
+    writer.flush()
+
+    (call,) = attached
+    assert call["extension"] == extension
+    assert cv2.imdecode(np.frombuffer(call["body"], np.uint8), cv2.IMREAD_COLOR).shape[:2] == (250, 400)
+    assert path == str(tmp_path / f"big.{extension}")
+    assert (tmp_path / f"big.{extension}").read_bytes() == call["body"]
+
+
+class _Locator:
+    """记录 screenshot() 参数的元素定位器替身"""
+
+    def __init__(self):
+        self.options = None
+
+    def wait_for(self, **kwargs):
+        pass
+
+    def screenshot(self, **options):
+        self.options = options
+        return PNG_BYTES + b"element"
+
+
+def test_capture_element_goes_through_writer(attached, tmp_path, monkeypatch):
+    """元素截图同样按 SCREENSHOT_FORMAT/QUALITY 截取，并经写入器转码、去重、写盘"""
+    monkeypatch.setattr(Settings, "SCREENSHOT_FORMAT", "jpeg")
+    monkeypatch.setattr(Settings, "SCREENSHOT_QUALITY", 70)
+    writer = ScreenshotWriter()
+    monkeypatch.setattr(screenshot_helper, "screenshot_writer", writer)
+    locator = _Locator()
+    helper = ScreenshotHelper(page=None, output_dir=tmp_path)
+
+    first = helper.capture_element(locator, "chart")
+    second = helper.capture_element(locator, "chart_again")
+    writer.flush()
+
+    assert locator.options == {"type": "jpeg", "quality": 70}
+    assert first.endswith(".jpg") and second == first
+    assert [c["name"] for c in attached] == ["chart", "chart_again"]
+    assert len(list(tmp_path.glob("*.jpg"))) == 1
@@ -0,0 +1,94 @@
+# ========================================
+# 模板匹配单元测试：大图小模板定位、非极大值抑制与 find_all_templates 返回类型
+# ========================================
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.image_recognition import MATCH_DTYPE, ImageRecognition
+
+
+@pytest.fixture(scope="module")
+def scene():
+    """灰底上三个相同的带十字图标（两个相邻、一个远处），返回 (源图, 模板)"""
+    rng = np.random.default_rng(0)
+    source = rng.integers(100, 140, size=(200, 300), dtype=np.uint8)
+    icon = np.zeros((20, 20), dtype=np.uint8)
+    icon[8:12, :] = 255
+    icon[:, 8:12] = 255
+    for x, y in ((20, 30), (60, 30), (200, 150)):
+        source[y:y + 20, x:x + 20] = icon
+    return source, icon
+
+
+@pytest.fixture(scope="module")
+def textured_page():
+    """3000x1920 的细密纹理大图（模拟高分辨率长截图），缩小一半后小模板的特征基本丢失"""
+    rng = np.random.default_rng(1)
+    return rng.integers(0, 256, size=(1920, 3000), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("options", [{}, {"pyramid": True}], ids=["default", "pyramid"])
+def test_small_templates_on_large_source_match_full_resolution(textured_page, options):
+    """24x24 小模板应定位到与全分辨率匹配相同的位置（开启金字塔时粗搜索漏检会回退全分辨率）"""
+    rng = np.random.default_rng(2)
+    for x, y in zip(rng.integers(0, 3000 - 24, 12), rng.integers(0, 1920 - 24, 12)):
+        template = textured_page[y:y + 24, x:x + 24].copy()
+        full = cv2.minMaxLoc(cv2.matchTemplate(textured_page, template, cv2.TM_CCOEFF_NORMED))[3]
+
+        position = ImageRecognition.find_template(textured_page, template, threshold=0.8, **options)
+
+        assert position is not None
+        assert (position["x"], position["y"]) == full == (x, y)
+
+
+def test_pyramid_finds_large_template(textured_page):
+    template = textured_page[700:900, 1500:1800].copy()
+
+    position = ImageRecognition.find_template(textured_page, template, threshold=0.9, pyramid=True)
+
+    assert (position["x"], position["y"]) == (1500, 700)
+    assert position["confidence"] > 0.99
+
+
+def test_nms_keeps_highest_and_drops_overlaps():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [50, 50, 10, 10], [2, 0, 10, 10]])
+    scores = np.array([0.8, 0.95, 0.7, 0.9])
+
+    keep = ImageRecognition._non_max_suppression(boxes, scores, iou_threshold=0.3)
+
+    assert keep.tolist() == [1, 2]
+
+
+def test_nms_threshold_controls_overlap():
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 10, 10]])  # IoU = 50 / 150
+    scores = np.array([0.9, 0.8])
+
+    assert ImageRecognition._non_max_suppression(boxes, scores, 0.3).tolist() == [0]
+    assert ImageRecognition._non_max_suppression(boxes, scores, 0.5).tolist() == [0, 1]
+
+
+def test_find_all_templates_returns_one_dict_per_match(scene):
+    source, icon = scene
+
+    positions = ImageRecognition.find_all_templates(source, icon, threshold=0.9)
+
+    assert isinstance(positions, list)
+    assert sorted((p["x"], p["y"]) for p in positions) == [(20, 30), (60, 30), (200, 150)]
+    first = positions[0]
+    assert set(first) == {"x", "y", "width", "height", "confidence", "scale"}
+    assert type(first["x"]) is int and type(first["confidence"]) is float
+    assert ImageRecognition.find_all_templates(source, icon, threshold=0.9, max_results=1) == positions[:1]
+
+
+def test_find_all_template_matches_returns_structured_array(scene):
+    source, icon = scene
+
+    matches = ImageRecognition.find_all_template_matches(source, icon, threshold=0.9)
+
+    assert matches.dtype == MATCH_DTYPE
+    assert len(matches) == 3
+    assert (np.diff(matches["confidence"]) <= 0).all()
+    checker = (np.indices((20, 20)).sum(axis=0) % 2 * 255).astype(np.uint8)
+    assert len(ImageRecognition.find_all_template_matches(source, checker, threshold=0.9)) == 0
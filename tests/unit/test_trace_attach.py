@@ -0,0 +1,108 @@
+# ========================================
+# 失败用例 trace 附件测试
+# ========================================
+# 用真实的 pytest-playwright makereport 钩子（trylast）和根 conftest 的钩子（tryfirst）
+# 按 pluggy 的真实顺序执行 teardown 阶段的 makereport，验证 trace.zip 被附加到 Allure。
+# ========================================
+
+import allure
+import pluggy
+import pytest
+import pytest_playwright.pytest_playwright as pw_plugin
+from _pytest import hookspec
+from _pytest.reports import TestReport
+
+import conftest as root_conftest
+
+
+class _FakeRecorder:
+    """模拟 pytest-playwright 的 ArtifactsRecorder：失败时把 trace 保留到输出目录"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.finished = False
+        self.artifacts = []
+
+    def did_finish_test(self, failed: bool) -> None:
+        self.finished = True
+        if failed:
+            trace = self.output_dir / "trace.zip"
+            trace.write_bytes(b"PK")
+            self.artifacts.append(("trace", str(trace)))
+
+
+class _Item:
+    nodeid = "tests/unit/test_fake.py::test_fail"
+    name = "test_fail"
+
+    def __init__(self, config):
+        self.config = config
+        self.function = lambda: None
+
+
+def _report(item, when: str, outcome: str) -> TestReport:
+    return TestReport(item.nodeid, ("test_fake.py", 1, item.name), {}, outcome, None, when, user_properties=[])
+
+
+class _ReportMaker:
+    """makereport 的最终实现：返回预先构造好的报告"""
+
+    def __init__(self, report):
+        self.report = report
+
+    @pytest.hookimpl
+    def pytest_runtest_makereport(self, item, call):
+        return self.report
+
+
+def _run_teardown_makereport(item, report):
+    pm = pluggy.PluginManager("pytest")
+    pm.add_hookspecs(hookspec)
+    pm.register(_ReportMaker(report), "report_maker")
+    pm.register(pw_plugin, "playwright")
+    pm.register(root_conftest, "root_conftest")
+    pm.hook.pytest_runtest_makereport(item=item, call=None)
+
+
+@pytest.fixture
+def attached(monkeypatch):
+    """收集 allure.attach.file 的调用"""
+    calls = []
+    monkeypatch.setattr(allure.attach, "file", lambda path, **kwargs: calls.append(path))
+    monkeypatch.setattr(root_conftest.dependency_state, "record", lambda *args: None)
+    return calls
+
+
+def test_trace_of_failed_call_is_attached(pytestconfig, tmp_path, attached):
+    """用例执行失败：recorder 在 fixture 清理时已保留 trace，teardown 报告时附加"""
+    item = _Item(pytestconfig)
+    item.rep_call = _report(item, "call", "failed")
+    recorder = _FakeRecorder(tmp_path)
+    recorder.did_finish_test(failed=True)
+    item._playwright_artifacts_recorder = recorder
+
+    _run_teardown_makereport(item, _report(item, "teardown", "passed"))
+
+    assert attached == [str(tmp_path / "trace.zip")]
+    assert not hasattr(item, "_playwright_artifacts_recorder")
+
+
+def test_trace_of_failed_teardown_is_attached(pytestconfig, tmp_path, attached):
+    """teardown 失败：由 pytest-playwright 的 makereport 决定保留 trace，之后仍能附加"""
+    item = _Item(pytestconfig)
+    item.rep_call = _report(item, "call", "passed")
+    item._playwright_artifacts_recorder = _FakeRecorder(tmp_path)
+
+    _run_teardown_makereport(item, _report(item, "teardown", "failed"))
+
+    assert attached == [str(tmp_path / "trace.zip")]
+
+
+def test_passed_test_attaches_nothing(pytestconfig, tmp_path, attached):
+    item = _Item(pytestconfig)
+    item.rep_call = _report(item, "call", "passed")
+    item._playwright_artifacts_recorder = _FakeRecorder(tmp_path)
+
+    _run_teardown_makereport(item, _report(item, "teardown", "passed"))
+
+    assert attached == []
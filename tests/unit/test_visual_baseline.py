@@ -0,0 +1,113 @@
+# ========================================
+# 视觉回归基准库单元测试：创建、哈希判定、分块 SSIM 判定、无法计算哈希（临时基准目录）
+# ========================================
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.image_recognition import ImageRecognition
+from utils.visual_baseline import VisualBaseline
+
+NODEID = "tests/test_demo.py::test_page"
+
+
+def _page() -> np.ndarray:
+    """1920x1080 的列表页示意图：白底上多行灰色文本块"""
+    rng = np.random.default_rng(0)
+    image = np.full((1080, 1920, 3), 255, np.uint8)
+    for y in range(40, 1040, 36):
+        for x in range(60, 1800, 240):
+            cv2.rectangle(image, (x, y), (x + int(rng.integers(80, 220)), y + 14), (90, 90, 90), -1)
+    return image
+
+
+@pytest.fixture(scope="module")
+def page_image():
+    return _page()
+
+
+@pytest.fixture
+def baseline(tmp_path, page_image):
+    """已保存 page_image 作为基准的基准库"""
+    vb = VisualBaseline(baseline_dir=tmp_path / "baseline", update=False)
+    vb.diff_dir = tmp_path / "visual_diff"
+    assert vb.check(page_image, "列表", nodeid=NODEID, attach=False)["status"] == "created"
+    return vb
+
+
+def _check(vb, image, **kwargs):
+    return vb.check(image, "列表", nodeid=NODEID, attach=False, **kwargs)
+
+
+def test_created_then_index_written(baseline):
+    key = VisualBaseline.make_key(NODEID, "列表")
+    entry = baseline._read_index()[key]
+
+    assert baseline.baseline_path(key).exists()
+    assert (entry["width"], entry["height"]) == (1920, 1080)
+    assert entry["phash"] and entry["dhash"]
+
+
+def test_identical_is_hash_match(baseline, page_image):
+    result = _check(baseline, page_image.copy())
+
+    assert result["passed"] and result["status"] == "hash_match"
+    assert result["distance"] == 0 and result["ssim"] is None
+
+
+def test_unrelated_image_is_hash_mismatch(baseline):
+    rng = np.random.default_rng(1)
+    other = rng.integers(0, 256, size=(1080, 1920, 3), dtype=np.uint8)
+
+    result = _check(baseline, other)
+
+    assert not result["passed"] and result["status"] == "hash_mismatch"
+    assert result["diff_path"]
+
+
+def test_pixel_noise_is_ssim_match(baseline, page_image):
+    rng = np.random.default_rng(2)
+    noisy = np.clip(page_image.astype(int) + rng.integers(-3, 4, page_image.shape), 0, 255).astype(np.uint8)
+
+    result = _check(baseline, noisy, hash_match_distance=-1)
+
+    assert result["passed"] and result["status"] == "ssim_match"
+    assert result["ssim_min_tile"] >= VisualBaseline.SSIM_THRESHOLD
+
+
+@pytest.mark.parametrize("change", ["block", "removed_row"])
+def test_local_regression_is_ssim_mismatch(baseline, page_image, change):
+    """哈希距离很小、整图 SSIM 仍高于阈值的局部改动，也应判定不通过"""
+    actual = page_image.copy()
+    if change == "block":
+        cv2.rectangle(actual, (900, 500), (940, 570), (0, 0, 0), -1)
+    else:
+        actual[500:536] = 255
+
+    result = _check(baseline, actual)
+
+    assert not result["passed"] and result["status"] == "ssim_mismatch"
+    assert 0 < result["distance"] < VisualBaseline.HASH_MISMATCH_DISTANCE
+    assert result["ssim"] >= VisualBaseline.SSIM_THRESHOLD > result["ssim_min_tile"]
+
+
+def test_size_mismatch(baseline, page_image):
+    result = _check(baseline, page_image[:540])
+
+    assert not result["passed"] and result["status"] == "size_mismatch"
+
+
+def test_unreadable_hash_is_mismatch(baseline, page_image, monkeypatch):
+    monkeypatch.setattr(ImageRecognition, "get_image_hash", lambda image, hash_type="phash", **kwargs: None)
+
+    result = _check(baseline, page_image.copy())
+
+    assert not result["passed"] and result["status"] == "hash_mismatch"
+    assert result["distance"] == VisualBaseline.HASH_BITS
+
+
+def test_hamming_with_missing_hash():
+    assert VisualBaseline._hamming("ff00", "ff01") == 1
+    assert VisualBaseline._hamming(None, "ff00") == VisualBaseline.HASH_BITS
+    assert VisualBaseline._hamming("ff00", None) == VisualBaseline.HASH_BITS
@@ -5,6 +5,8 @@
 # - logger.py: 日志管理（分级日志、彩色输出）
 # - data_loader.py: 测试数据加载（YAML、JSON）
 # - wait_helper.py: 自定义等待助手
+# - request_tracker.py: 页面请求跟踪（替代 networkidle）
+# - request_router.py: 请求拦截（屏蔽埋点、媒体等资源）
 # - screenshot_helper.py: 截图和录屏管理
 # - allure_helper.py: Allure 报告增强
 # ========================================
@@ -12,6 +14,8 @@
 from utils.logger import Logger, get_logger
 from utils.data_loader import DataLoader, load_yaml, load_json
 from utils.wait_helper import WaitHelper
+from utils.request_tracker import RequestTracker
+from utils.request_router import RequestRouter
 from utils.screenshot_helper import ScreenshotHelper
 from utils.allure_helper import AllureHelper
 
@@ -19,6 +23,8 @@ __all__ = [
     'Logger', 'get_logger',
     'DataLoader', 'load_yaml', 'load_json',
     'WaitHelper',
+    'RequestTracker',
+    'RequestRouter',
     'ScreenshotHelper',
     'AllureHelper'
 ]
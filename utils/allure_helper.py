@@ -115,6 +115,21 @@ class AllureHelper:
         )
         self.logger.debug(f"已附加图片: {name}")
     
+    def attach_image_bytes(self, name: str, image_bytes: bytes) -> None:
+        """
+        附加内存中的 PNG 图片到报告（无需先写文件）
+        
+        Args:
+            name: 附件名称
+            image_bytes: PNG 图片字节，如 page.screenshot() 的返回值
+        """
+        allure.attach(
+            image_bytes,
+            name=name,
+            attachment_type=AttachmentType.PNG
+        )
+        self.logger.debug(f"已附加图片: {name}")
+    
     def attach_video(self, name: str, video_path: str) -> None:
         """
         附加视频到报告
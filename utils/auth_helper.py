@@ -6,11 +6,12 @@
 # ========================================
 
 import json
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, Tuple
 from datetime import datetime, timedelta
 
-from playwright.sync_api import Page, BrowserContext
+from playwright.sync_api import Page, Browser, BrowserContext
 
 from config.settings import Settings
 from utils.logger import Logger
@@ -346,6 +347,265 @@ class AuthHelper:
             return None
 
 
+# ==================== 会话级认证状态池 ====================
+
+# 注入 localStorage/sessionStorage 的初始化脚本（按 origin 匹配；同一标签页只注入一次，避免覆盖页面后续写入）
+_SEED_STORAGE_SCRIPT = """(() => {
+    const seed = %s;
+    const marker = "__auth_pool_seeded__";
+    try {
+        const entry = seed[window.location.origin];
+        if (!entry || window.sessionStorage.getItem(marker)) {
+            return;
+        }
+        for (const [key, value] of Object.entries(entry.localStorage || {})) {
+            window.localStorage.setItem(key, value);
+        }
+        for (const [key, value] of Object.entries(entry.sessionStorage || {})) {
+            window.sessionStorage.setItem(key, value);
+        }
+        window.sessionStorage.setItem(marker, "1");
+    } catch (e) {}
+})();"""
+
+AuthKey = Tuple[str, str, str]
+
+
+class AuthStatePool:
+    """
+    会话级认证状态池（进程内单例）
+
+    按 (用户名, 学校, 角色) 缓存 Playwright storage_state（cookies + localStorage），
+    并额外记录 sessionStorage（storage_state 不包含该部分）。同一 key 在一次 pytest
+    会话内只需完整登录、切换学校、切换角色一次，之后每个用例的新上下文直接注入该状态。
+
+    xdist 下每个 worker 是独立进程，各自维护一份池，互不干扰。
+
+    使用示例：
+        pool = AuthStatePool()
+        key = AuthStatePool.make_key("admin", "智慧大学", "机构管理员")
+
+        # 登录并切换完成后采集
+        pool.capture(page, key)
+
+        # 新用例：向当前上下文注入状态后直接进入业务页
+        if pool.seed_context(page.context, key):
+            page.goto(base_url + "/console")
+            if not logged_in(page):
+                pool.discard(page, key)  # 状态已失效：撤销注入的 cookies/storage 并移除，再走正常登录
+
+        # 或直接创建一个已注入状态的新上下文
+        context = pool.new_context(browser, key, **Settings.get_context_args())
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式，确保进程内只有一个状态池"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化状态存储"""
+        if self._initialized:
+            return
+        self._states: Dict[AuthKey, dict] = {}
+        self._state_lock = threading.Lock()
+        self._initialized = True
+
+    @staticmethod
+    def make_key(username: str, school_name: str, role_name: str) -> AuthKey:
+        """
+        生成状态池 key
+
+        Args:
+            username: 登录用户名
+            school_name: 学校名称
+            role_name: 角色名称
+
+        Returns:
+            (username, school_name, role_name)
+        """
+        return str(username), str(school_name), str(role_name)
+
+    def has_state(self, key: AuthKey) -> bool:
+        """检查指定 key 是否已缓存状态"""
+        with self._state_lock:
+            return key in self._states
+
+    def capture(self, page: Page, key: AuthKey) -> bool:
+        """
+        采集当前页面所在上下文的认证状态
+
+        应在登录、切换学校、切换角色全部完成后调用。
+
+        Args:
+            page: 已登录的 Playwright 页面对象
+            key: 状态池 key
+
+        Returns:
+            True 采集成功，False 采集失败
+        """
+        try:
+            state = page.context.storage_state()
+            origin = page.evaluate("() => window.location.origin")
+            session_storage = page.evaluate("""() => {
+                const items = {};
+                for (let i = 0; i < sessionStorage.length; i++) {
+                    const key = sessionStorage.key(i);
+                    if (key !== "__auth_pool_seeded__") {
+                        items[key] = sessionStorage.getItem(key);
+                    }
+                }
+                return items;
+            }""")
+            state["sessionStorage"] = {origin: session_storage or {}}
+            with self._state_lock:
+                self._states[key] = state
+            logger.info(f"认证状态已加入会话池: {key}")
+            return True
+        except Exception as e:
+            logger.warning(f"采集会话认证状态失败: {key}, 错误: {e}")
+            return False
+
+    def seed_context(self, context: BrowserContext, key: AuthKey) -> bool:
+        """
+        向已存在的上下文注入缓存状态（cookies 立即生效，storage 在下次导航时生效）
+
+        同一上下文只允许注入一个 key，避免多份初始化脚本互相覆盖。
+
+        Args:
+            context: Playwright 浏览器上下文
+            key: 状态池 key
+
+        Returns:
+            True 注入成功，False 无缓存或该上下文已注入其它 key
+        """
+        with self._state_lock:
+            state = self._states.get(key)
+        if state is None:
+            return False
+
+        seeded_key = getattr(context, "_auth_pool_key", None)
+        if seeded_key is not None:
+            return seeded_key == key
+
+        try:
+            cookies = state.get("cookies", [])
+            if cookies:
+                context.add_cookies(cookies)
+            # 新版 Playwright 返回可撤销的句柄（旧版为 None），恢复失败时由 discard 撤销
+            context._auth_pool_init_script = context.add_init_script(
+                script=_SEED_STORAGE_SCRIPT % json.dumps(self._storage_seed(state), ensure_ascii=False)
+            )
+            context._auth_pool_key = key
+            logger.info(f"已从会话池注入认证状态: {key}")
+            return True
+        except Exception as e:
+            logger.warning(f"注入会话认证状态失败: {key}, 错误: {e}")
+            return False
+
+    def new_context(self, browser: Browser, key: AuthKey, **context_args) -> Optional[BrowserContext]:
+        """
+        创建一个已注入缓存状态的新上下文
+
+        Args:
+            browser: Playwright 浏览器对象
+            key: 状态池 key
+            **context_args: 透传给 browser.new_context 的参数（如 Settings.get_context_args()）
+
+        Returns:
+            新的 BrowserContext，无缓存时返回 None
+        """
+        with self._state_lock:
+            state = self._states.get(key)
+        if state is None:
+            return None
+
+        context = browser.new_context(
+            storage_state={"cookies": state.get("cookies", []), "origins": state.get("origins", [])},
+            **context_args
+        )
+        # cookies/localStorage 已由 storage_state 注入，这里只补 sessionStorage
+        session_seed = {origin: {"sessionStorage": items} for origin, items in state.get("sessionStorage", {}).items()}
+        context._auth_pool_init_script = context.add_init_script(
+            script=_SEED_STORAGE_SCRIPT % json.dumps(session_seed, ensure_ascii=False)
+        )
+        context._auth_pool_key = key
+        return context
+
+    def discard(self, page: Page, key: AuthKey) -> None:
+        """
+        撤销注入到当前上下文的状态，并移除池中该 key（复用失败、回退到重新登录前调用）
+
+        依次清空上下文 cookies、撤销初始化脚本（旧版 Playwright 不支持撤销时，
+        在当前页写入已注入标记使脚本跳过）、清空当前页 localStorage/sessionStorage，
+        避免失效的状态混入随后的重新登录。
+
+        Args:
+            page: 注入过状态的 Playwright 页面对象
+            key: 状态池 key
+        """
+        context = page.context
+        try:
+            context.clear_cookies()
+        except Exception as e:
+            logger.warning(f"清空上下文 cookies 失败: {key}, 错误: {e}")
+
+        init_script = getattr(context, "_auth_pool_init_script", None)
+        if init_script is not None and hasattr(init_script, "dispose"):
+            try:
+                init_script.dispose()
+            except Exception as e:
+                logger.warning(f"撤销会话池初始化脚本失败: {key}, 错误: {e}")
+        context._auth_pool_init_script = None
+        context._auth_pool_key = None
+
+        try:
+            page.evaluate("""() => {
+                try {
+                    window.localStorage.clear();
+                    window.sessionStorage.clear();
+                    window.sessionStorage.setItem("__auth_pool_seeded__", "1");
+                } catch (e) {}
+            }""")
+        except Exception as e:
+            logger.warning(f"清空页面 storage 失败: {key}, 错误: {e}")
+
+        self.invalidate(key)
+
+    def invalidate(self, key: AuthKey) -> None:
+        """移除指定 key 的缓存状态（如服务端会话已失效）"""
+        with self._state_lock:
+            self._states.pop(key, None)
+        logger.info(f"会话认证状态已失效: {key}")
+
+    def clear(self) -> None:
+        """清空状态池"""
+        with self._state_lock:
+            self._states.clear()
+
+    @staticmethod
+    def _storage_seed(state: dict) -> Dict[str, dict]:
+        """将 storage_state 的 origins 与 sessionStorage 合并为 {origin: {localStorage, sessionStorage}}"""
+        seed: Dict[str, dict] = {}
+        for origin_state in state.get("origins", []):
+            origin = origin_state.get("origin")
+            if not origin:
+                continue
+            seed.setdefault(origin, {})["localStorage"] = {
+                item["name"]: item["value"] for item in origin_state.get("localStorage", [])
+            }
+        for origin, items in state.get("sessionStorage", {}).items():
+            seed.setdefault(origin, {})["sessionStorage"] = items
+        return seed
+
+
 # ==================== 便捷函数 ====================
 
 def save_auth(page: Page, user_key: str, expire_hours: int = 24) -> bool:
@@ -2,47 +2,311 @@
 # 点字类验证码：ddddocr 检测框 + 分类 + 按题目顺序得到点击中心点
 # ========================================
 # 逻辑与项目根目录 test.py 中实验代码一致，供 Page/用例复用。
+# 检测模型与分类模型由进程级 DdddocrModelRegistry 各加载一次后复用，候选字符池以 logits 掩码实现。
+# 各检测框的裁剪图直接以内存图片在小线程池中并行分类，题目字全部高置信命中后提前结束。
+# 题目字与检测框按候选字概率做最小代价指派（匈牙利算法），并给出整体置信度。
 # ========================================
 
 from __future__ import annotations
 
 import io
 import re
-from typing import Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import ddddocr
+import numpy as np
 from PIL import Image
+from scipy.optimize import linear_sum_assignment
+
+# 分类线程数（onnxruntime 推理期间释放 GIL，少量线程即可并行）
+CLASSIFY_WORKERS = 4
+# 提前结束所需的最低置信度（识别出的每个字在其帧上的 softmax 概率）
+EARLY_EXIT_CONFIDENCE = 0.9
+# 每个检测框保留的候选字个数（供题目字与检测框的最优匹配使用）
+TOP_K_CANDIDATES = 5
+# 候选中没有题目字时的保底分数，避免 -log(0)
+_MIN_MATCH_SCORE = 1e-6
+# 字符池下标集合的缓存条目数（LRU）
+VALID_CACHE_SIZE = 128
+
+
+class DdddocrModelRegistry:
+    """
+    ddddocr 模型注册表（进程级单例）
+
+    每个 DdddOcr 实例构造时都会从磁盘加载 ONNX 模型，因此只加载两个模型并复用：
+    检测模型与全量字符集的 beta 分类模型。
+    候选字符池不再各建一个 set_ranges 模型，而是在推理输出（logits）上按字符池做掩码，
+    字符池只对应一个字符下标集合，按 LRU 保留最近 VALID_CACHE_SIZE 个。
+
+    使用方法：
+        registry = DdddocrModelRegistry()
+        bboxes = registry.detect(image_bytes)
+        text = registry.classify(crop_bytes, pool="骋捕颁")
+    """
+
+    # 单例实例
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        """单例模式，确保全局只有一个实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """初始化模型缓存"""
+        if self._initialized:
+            return
+        # "det" / "ocr" -> (DdddOcr 实例, 该实例的推理锁)
+        self._models: Dict[str, Tuple[Any, threading.Lock]] = {}
+        self._models_lock = threading.Lock()
+        # 分类模型的 字符 -> 下标
+        self._char_index: Optional[Dict[str, int]] = None
+        # 字符池 -> 允许的字符下标集合（LRU）
+        self._valid_cache: "OrderedDict[str, frozenset]" = OrderedDict()
+        self._valid_lock = threading.Lock()
+        self._initialized = True
+
+    def _get(self, key: str, factory: Callable[[], Any]) -> Tuple[Any, threading.Lock]:
+        """按 key 取模型，不存在时在锁内构造（同一模型只加载一次）"""
+        entry = self._models.get(key)
+        if entry is None:
+            with self._models_lock:
+                entry = self._models.get(key)
+                if entry is None:
+                    entry = (factory(), threading.Lock())
+                    self._models[key] = entry
+        return entry
+
+    def detector(self) -> Tuple[Any, threading.Lock]:
+        """检测模型（det=True）"""
+        return self._get("det", lambda: ddddocr.DdddOcr(det=True, ocr=False, show_ad=False))
+
+    def classifier(self) -> Tuple[Any, threading.Lock]:
+        """分类模型（beta，全量字符集，所有字符池共用）"""
+        return self._get("ocr", lambda: ddddocr.DdddOcr(show_ad=False, beta=True))
+
+    def detect(self, image_bytes: bytes) -> list:
+        """检测文字框，返回 [[x1, y1, x2, y2], ...]"""
+        det, lock = self.detector()
+        with lock:
+            return det.detection(image_bytes)
+
+    def classify(self, image: Any, pool: str | None = None) -> str:
+        """
+        识别单个字符图片
+
+        Args:
+            image: 图片字节或 PIL.Image
+            pool: 候选字符池；为空时使用全量字符集
+        """
+        if isinstance(image, (bytes, bytearray)):
+            image = Image.open(io.BytesIO(image))
+        return self.recognize(image, pool)["text"]
+
+    def recognize(self, image: Image.Image, pool: str | None = None, top_k: int = TOP_K_CANDIDATES) -> dict:
+        """
+        识别单个字符图片并给出置信度，可多线程并发调用
+
+        直接对模型的 ONNX 会话推理（会话本身线程安全），不经过 classification；
+        传入字符池时把池外字符（blank 除外）的 logits 置为 -inf 再 softmax 与贪心 CTC 解码，
+        即只在「字符池 + blank」内取最优，置信度也在池内归一化。
+        ddddocr 内部结构不同时退回加锁的 classification，再按字符池过滤结果。
+
+        Args:
+            image: PIL.Image 裁剪图
+            pool: 候选字符池；为空时使用全量字符集
+            top_k: 返回的候选字个数
+
+        Returns:
+            {
+                "text": 识别文本,
+                "confidence": 各输出字峰值帧概率的最小值,
+                "candidates": {字: 该字在各帧上的最高概率}（按概率取前 top_k 个）,
+            }
+            退回 classification 时无法得到概率，识别出的字按 1.0 计。
+        """
+        ocr, lock = self.classifier()
+        engine = getattr(ocr, "ocr_engine", None)
+        if engine is None or not hasattr(engine, "session") or not hasattr(engine, "_preprocess_image"):
+            with lock:
+                text = ocr.classification(image)
+            if pool:
+                text = "".join(ch for ch in text if ch in pool)
+            return {
+                "text": text,
+                "confidence": 1.0 if text else 0.0,
+                "candidates": {ch: 1.0 for ch in text},
+            }
+
+        array = engine._preprocess_image(image, False)
+        session = engine.session
+        logits = session.run(None, {session.get_inputs()[0].name: array})[0]
+        # 输出为 (帧数, 1, 类别数) 或 (1, 帧数, 类别数)
+        logits = logits[:, 0, :] if logits.shape[1] == 1 else logits[0]
+        charset = engine.charset_manager.charset
+        valid = self._valid_indices(pool, charset)
+        mask = np.ones(logits.shape[1], dtype=bool)
+        if valid is not None:
+            mask[:] = False
+            mask[[i for i in valid if i < logits.shape[1]]] = True
+            mask[0] = True
+            logits = np.where(mask, logits, -np.inf)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = exp / exp.sum(axis=1, keepdims=True)
+        indices = probs.argmax(axis=1)
+
+        chars: list[str] = []
+        confidences: list[float] = []
+        prev = None
+        emitted = False
+        for frame, idx in enumerate(indices.tolist()):
+            # 贪心 CTC：跳过连续重复与 blank(0)；同一字连续多帧时取其中最高概率
+            if idx == prev:
+                if emitted:
+                    confidences[-1] = max(confidences[-1], float(probs[frame, idx]))
+                continue
+            prev = idx
+            emitted = idx != 0 and idx < len(charset)
+            if emitted:
+                chars.append(charset[idx])
+                confidences.append(float(probs[frame, idx]))
+
+        # 候选字：每个字取其在所有帧上的最高概率，排除 blank 与字符池外的字
+        char_scores = np.where(mask, probs.max(axis=0), 0.0)
+        char_scores[0] = 0.0
+        k = min(top_k, char_scores.shape[0])
+        top = np.argpartition(-char_scores, k - 1)[:k] if k > 0 else []
+        candidates = {
+            charset[i]: float(char_scores[i])
+            for i in sorted(top, key=lambda i: -char_scores[i])
+            if i < len(charset) and char_scores[i] > 0
+        }
+        return {
+            "text": "".join(chars),
+            "confidence": min(confidences) if confidences else 0.0,
+            "candidates": candidates,
+        }
+
+    def _valid_indices(self, pool: str | None, charset: list) -> Optional[frozenset]:
+        """字符池在分类模型字符集中的下标集合（含 blank 0；全量字符集返回 None，不过滤）"""
+        if not pool:
+            return None
+        key = "".join(sorted(set(pool)))
+        with self._valid_lock:
+            cached = self._valid_cache.get(key)
+            if cached is not None:
+                self._valid_cache.move_to_end(key)
+                return cached
+            if self._char_index is None:
+                # 与 set_ranges 一致取首次出现的下标
+                self._char_index = {}
+                for i, ch in enumerate(charset):
+                    if ch:
+                        self._char_index.setdefault(ch, i)
+            cached = frozenset([0] + [self._char_index[ch] for ch in key if ch in self._char_index])
+            self._valid_cache[key] = cached
+            while len(self._valid_cache) > VALID_CACHE_SIZE:
+                self._valid_cache.popitem(last=False)
+            return cached
+
+    def clear(self) -> None:
+        """清空已加载的模型（基准测试冷启动或释放内存时使用）"""
+        with self._models_lock, self._valid_lock:
+            self._models.clear()
+            self._char_index = None
+            self._valid_cache.clear()
+
+
+# 模块级注册表实例
+model_registry = DdddocrModelRegistry()
 
 
 def classify_crop(image_bytes: bytes, pool: str | None) -> str:
     """先在小字符集内识别；若为空再退回全量字符集（beta 模型）。"""
-    ocr = ddddocr.DdddOcr(show_ad=False, beta=True)
     if pool:
-        ocr.set_ranges(pool)
-        out = ocr.classification(image_bytes)
+        out = model_registry.classify(image_bytes, pool)
         if out:
             return out
-    ocr2 = ddddocr.DdddOcr(show_ad=False, beta=True)
-    return ocr2.classification(image_bytes)
+    return model_registry.classify(image_bytes)
+
+
+def recognize_crop(crop: Image.Image, pool: str | None) -> dict:
+    """同 classify_crop，入参为内存中的裁剪图，返回 {"text", "confidence"}。"""
+    if pool:
+        out = model_registry.recognize(crop, pool)
+        if out["text"]:
+            return out
+    return model_registry.recognize(crop)
+
+
+def _targets_covered(target_chars: list[str], results: list[dict], min_confidence: float) -> bool:
+    """每个题目字（按出现次数）是否都已被不同检测框以不低于 min_confidence 的置信度识别出。"""
+    remaining = list(target_chars)
+    for res in results:
+        if res["confidence"] < min_confidence:
+            continue
+        for ch in res["text"]:
+            if ch in remaining:
+                remaining.remove(ch)
+                break
+        if not remaining:
+            return True
+    return not remaining
 
 
-def detect_and_classify_items(image_bytes: bytes, char_pool: str | None) -> list[dict]:
+def detect_and_classify_items(
+    image_bytes: bytes,
+    char_pool: str | None,
+    target_chars: list[str] | None = None,
+    min_confidence: float = EARLY_EXIT_CONFIDENCE,
+    max_workers: int = CLASSIFY_WORKERS,
+) -> list[dict]:
     """
-    返回每个检测框：{"text": str, "bbox": [x1,y1,x2,y2]}（坐标相对传入的整图）。
+    返回每个检测框：{"text": str, "bbox": [x1,y1,x2,y2], "confidence": float, "candidates": {字: 概率}}
+    （坐标相对传入的整图）。
+
+    整图只解码一次，各框裁剪后直接以 PIL.Image 交给线程池分类（不再逐个 PNG 编码）。
+    传入 target_chars 时，一旦每个题目字都被高置信识别即停止分类其余框，未分类的框不返回。
     """
-    det = ddddocr.DdddOcr(det=True, ocr=False)
     pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    bboxes = det.detection(image_bytes)
-    items: list[dict] = []
-    for bbox in bboxes:
-        x1, y1, x2, y2 = bbox
-        box = [int(x1), int(y1), int(x2), int(y2)]
-        crop = pil.crop((x1, y1, x2, y2))
-        buf = io.BytesIO()
-        crop.save(buf, format="PNG")
-        text = classify_crop(buf.getvalue(), char_pool or None)
-        items.append({"text": text, "bbox": box})
-    return items
+    bboxes = model_registry.detect(image_bytes)
+    boxes = [[int(x1), int(y1), int(x2), int(y2)] for x1, y1, x2, y2 in bboxes]
+    if not boxes:
+        return []
+
+    pool = char_pool or None
+    results: list[Optional[dict]] = [None] * len(boxes)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(boxes))))
+    try:
+        futures = {executor.submit(recognize_crop, pil.crop(tuple(box)), pool): i for i, box in enumerate(boxes)}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[futures[fut]] = fut.result()
+            if target_chars and pending and _targets_covered(
+                target_chars, [r for r in results if r is not None], min_confidence
+            ):
+                for fut in pending:
+                    fut.cancel()
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [
+        {"text": res["text"], "bbox": box, "confidence": res["confidence"], "candidates": res["candidates"]}
+        for box, res in zip(boxes, results)
+        if res is not None
+    ]
 
 
 def parse_instruction_target_chars(instruction_text: str) -> list[str]:
@@ -58,31 +322,152 @@ def parse_instruction_target_chars(instruction_text: str) -> list[str]:
     return chars
 
 
+class CaptchaLowConfidenceError(ValueError):
+    """题目字与检测框的匹配置信度过低，建议刷新验证码而不是提交"""
+
+    def __init__(self, message: str, confidence: float):
+        super().__init__(message)
+        self.confidence = confidence
+
+
+def _match_score(ch: str, item: dict) -> float:
+    """题目字 ch 落在该检测框上的概率：优先用候选字概率，其次按识别文本是否包含该字估计。"""
+    candidates = item.get("candidates")
+    if candidates:
+        return float(candidates.get(ch, 0.0))
+    text = item.get("text") or ""
+    return float(item.get("confidence", 1.0)) if ch in text else 0.0
+
+
+def match_click_targets(
+    target_chars: list[str],
+    items: list[dict],
+) -> tuple[list[tuple[float, float]], float]:
+    """
+    题目字与检测框的最优匹配
+
+    代价矩阵为 -log(题目字在该框上的概率)，用匈牙利算法求最小代价指派，
+    即在「每个框最多点一次」的约束下使所有题目字同时正确的概率最大。
+
+    Args:
+        target_chars: 题目字（按点击顺序）
+        items: detect_and_classify_items 的返回值
+
+    Returns:
+        (按题目顺序的点击中心列表, 整体置信度)；整体置信度为各题目字匹配概率之积
+
+    Raises:
+        ValueError: 检测框数量少于题目字数量
+    """
+    if not target_chars:
+        return [], 1.0
+    if len(items) < len(target_chars):
+        raise ValueError(f"检测框数量不足，无法为题目字 {target_chars!r} 匹配，识别结果: {items!r}")
+
+    scores = np.array([[_match_score(ch, it) for it in items] for ch in target_chars])
+    cost = -np.log(np.clip(scores, _MIN_MATCH_SCORE, 1.0))
+    rows, cols = linear_sum_assignment(cost)
+
+    centers: list[tuple[float, float]] = [(0.0, 0.0)] * len(target_chars)
+    confidence = 1.0
+    for r, c in zip(rows, cols):
+        x1, y1, x2, y2 = items[c]["bbox"]
+        centers[r] = ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
+        confidence *= float(scores[r, c])
+    return centers, confidence
+
+
 def centers_for_click_order(
     target_chars: list[str],
     items: list[dict],
 ) -> list[tuple[float, float]]:
     """
     按题目顺序，为每个目标字匹配一个检测框，返回该框中心点在图内的坐标。
-    匹配策略：未使用的框中，优先 text == c 或 c in text。
+    匹配策略：见 match_click_targets（候选字概率 + 最小代价指派）。
+    """
+    centers, _ = match_click_targets(target_chars, items)
+    return centers
+
+
+def solve_click_captcha(
+    image_bytes: bytes,
+    instruction_text: str,
+    char_pool: str | None = None,
+    min_confidence: float | None = None,
+) -> tuple[list[tuple[float, float]], float]:
     """
+    整图字节 + 题目整段文案 -> (按顺序的点击中心, 整体置信度)。
+
+    Args:
+        image_bytes: 验证码整图字节
+        instruction_text: 题目文案，如「请依次点击：骋 捕 颁」
+        char_pool: 候选字池；未传则使用「题目中的字」拼接作为 pool
+        min_confidence: 设置后整体置信度低于该值时抛出 CaptchaLowConfidenceError，
+            调用方（登录流程）可直接刷新验证码，不必提交一次大概率错误的答案
+
+    Raises:
+        ValueError: 无法解析题目或检测框不足
+        CaptchaLowConfidenceError: 整体置信度低于 min_confidence
+    """
+    targets = parse_instruction_target_chars(instruction_text)
+    if not targets:
+        raise ValueError(f"无法从题目解析目标字: {instruction_text!r}")
+    pool = char_pool if (char_pool and char_pool.strip()) else "".join(targets)
+    items = detect_and_classify_items(image_bytes, pool, target_chars=targets)
+    centers, confidence = match_click_targets(targets, items)
+    if min_confidence is not None and confidence < min_confidence:
+        raise CaptchaLowConfidenceError(
+            f"点字验证码匹配置信度 {confidence:.3f} 低于 {min_confidence}，识别结果: {items!r}",
+            confidence,
+        )
+    return centers, confidence
+
+
+def ordered_click_centers_from_image(
+    image_bytes: bytes,
+    instruction_text: str,
+    char_pool: str | None = None,
+) -> list[tuple[float, float]]:
+    """
+    整图 PNG 字节 + 题目整段文案 -> 按顺序的点击中心（相对该图左上角，单位像素）。
+    char_pool 建议为题目候选字拼接；未传则使用「题目中的字」拼接作为 pool。
+    需要置信度（决定是否先刷新验证码）时使用 solve_click_captcha。
+    """
+    centers, _ = solve_click_captcha(image_bytes, instruction_text, char_pool)
+    return centers
+
+
+def _legacy_ordered_click_centers(
+    image_bytes: bytes,
+    instruction_text: str,
+    char_pool: str | None = None,
+) -> list[tuple[float, float]]:
+    """
+    改动前的实现（仅供 benchmark_captcha_latency 对比）：
+    每题新建检测模型，每个检测框 PNG 编码后新建 set_ranges 分类模型（结果为空时再建一个全量模型），
+    题目字按识别文本顺序贪心匹配。
+    """
+    targets = parse_instruction_target_chars(instruction_text)
+    pool = char_pool if (char_pool and char_pool.strip()) else "".join(targets)
+    det = ddddocr.DdddOcr(det=True, ocr=False, show_ad=False)
+    pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    items: list[dict] = []
+    for x1, y1, x2, y2 in det.detection(image_bytes):
+        buf = io.BytesIO()
+        pil.crop((x1, y1, x2, y2)).save(buf, format="PNG")
+        ocr = ddddocr.DdddOcr(show_ad=False, beta=True)
+        ocr.set_ranges(pool)
+        text = ocr.classification(buf.getvalue())
+        if not text:
+            text = ddddocr.DdddOcr(show_ad=False, beta=True).classification(buf.getvalue())
+        items.append({"text": text, "bbox": [int(x1), int(y1), int(x2), int(y2)]})
+
     unused = list(items)
     centers: list[tuple[float, float]] = []
-    for ch in target_chars:
-        chosen: Optional[dict] = None
-        for it in unused:
-            t = it.get("text") or ""
-            if ch == t or (len(t) == 1 and t == ch):
-                chosen = it
-                break
-            if ch in t:
-                chosen = it
-                break
+    for ch in targets:
+        chosen = next((it for it in unused if ch in (it["text"] or "")), None)
         if chosen is None:
-            for it in unused:
-                if it.get("text"):
-                    chosen = it
-                    break
+            chosen = next((it for it in unused if it["text"]), None)
         if chosen is None:
             raise ValueError(f"无法为题目字 {ch!r} 匹配检测框，识别结果: {items!r}")
         unused.remove(chosen)
@@ -91,18 +476,47 @@ def centers_for_click_order(
     return centers
 
 
-def ordered_click_centers_from_image(
+def benchmark_captcha_latency(
     image_bytes: bytes,
     instruction_text: str,
     char_pool: str | None = None,
-) -> list[tuple[float, float]]:
+    rounds: int = 5,
+) -> dict:
     """
-    整图 PNG 字节 + 题目整段文案 -> 按顺序的点击中心（相对该图左上角，单位像素）。
-    char_pool 建议为题目候选字拼接；未传则使用「题目中的字」拼接作为 pool。
+    点字验证码单题耗时基准（毫秒）：改动前的实现（_legacy_ordered_click_centers，每题每框重新加载模型）
+    与当前实现（复用模型注册表，预热后计时）的平均/最小耗时。
     """
-    targets = parse_instruction_target_chars(instruction_text)
-    if not targets:
-        raise ValueError(f"无法从题目解析目标字: {instruction_text!r}")
-    pool = char_pool if (char_pool and char_pool.strip()) else "".join(targets)
-    items = detect_and_classify_items(image_bytes, pool)
-    return centers_for_click_order(targets, items)
+    import time
+
+    def _run(solve: Callable[..., Any]) -> list[float]:
+        costs = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            solve(image_bytes, instruction_text, char_pool)
+            costs.append((time.perf_counter() - start) * 1000)
+        return costs
+
+    legacy = _run(_legacy_ordered_click_centers)
+    ordered_click_centers_from_image(image_bytes, instruction_text, char_pool)  # 预热
+    current = _run(ordered_click_centers_from_image)
+    return {
+        "legacy_avg_ms": sum(legacy) / len(legacy),
+        "legacy_min_ms": min(legacy),
+        "registry_avg_ms": sum(current) / len(current),
+        "registry_min_ms": min(current),
+    }
+
+
+if __name__ == '__main__':
+    # 基准测试：python -m utils.click_captcha_ddddocr [图片路径] [题目文案] [轮数]
+    import sys
+
+    image_path = sys.argv[1] if len(sys.argv) > 1 else "image.png"
+    instruction = sys.argv[2] if len(sys.argv) > 2 else "请依次点击：靶 尝 财"
+    n_rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    with open(image_path, "rb") as f:
+        data = f.read()
+    result = benchmark_captcha_latency(data, instruction, rounds=n_rounds)
+    print(f"点字验证码单题耗时（{n_rounds} 轮）：")
+    print(f"  改动前（每题每框加载模型）: 平均 {result['legacy_avg_ms']:.1f} ms，最小 {result['legacy_min_ms']:.1f} ms")
+    print(f"  复用模型注册表:             平均 {result['registry_avg_ms']:.1f} ms，最小 {result['registry_min_ms']:.1f} ms")
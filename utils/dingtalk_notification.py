@@ -146,7 +146,8 @@ class DingTalkNotification:
                         skipped: int,
                         duration: str,
                         failed_cases: Optional[List[str]] = None,
-                        environment: str = "测试环境") -> bool:
+                        environment: str = "测试环境",
+                        performance: Optional[Dict] = None) -> bool:
         """
         发送测试报告
         
@@ -158,6 +159,7 @@ class DingTalkNotification:
             duration: 执行时长
             failed_cases: 失败用例列表
             environment: 环境名称
+            performance: 性能统计（ActionTimer.performance_summary() 的返回值），为空时不展示
         
         Returns:
             是否发送成功
@@ -204,6 +206,10 @@ class DingTalkNotification:
             if len(failed_cases) > 10:
                 text_parts.append(f"\n... 还有 {len(failed_cases) - 10} 个失败用例\n")
         
+        # 性能统计：最慢用例 / 步骤 / 定位器
+        if performance:
+            text_parts.extend(self._performance_parts(performance))
+        
         text_parts.append(f"\n---\n")
         text_parts.append(f"*{time.strftime('%Y-%m-%d %H:%M:%S')}*\n")
         
@@ -216,6 +222,32 @@ class DingTalkNotification:
             at_all=failed > 0  # 如果有失败用例，@所有人
         )
 
+    @staticmethod
+    def _performance_parts(performance: Dict) -> List[str]:
+        """
+        把性能统计格式化为 Markdown 片段
+        
+        Args:
+            performance: {"tests": [(名称, 秒)], "steps": [...], "locators": [...]}
+        
+        Returns:
+            Markdown 文本片段列表
+        """
+        parts: List[str] = []
+        if performance.get("tests"):
+            parts.append("\n### 🐢 最慢用例\n")
+            for i, (name, seconds) in enumerate(performance["tests"], 1):
+                parts.append(f"{i}. {name}：{seconds:.1f}s\n")
+        for key, title in (("steps", "最慢步骤"), ("locators", "最慢定位器")):
+            rows = performance.get(key) or []
+            if rows:
+                parts.append(f"\n### 🐢 {title}（p50 / p95）\n")
+                for i, row in enumerate(rows, 1):
+                    parts.append(
+                        f"{i}. {row['name']}：{row['p50_ms']:.0f}ms / {row['p95_ms']:.0f}ms（{row['count']} 次）\n"
+                    )
+        return parts
+
 
 def send_dingtalk_report(webhook: str,
                         secret: Optional[str],
@@ -225,7 +257,8 @@ def send_dingtalk_report(webhook: str,
                         skipped: int,
                         duration: str,
                         failed_cases: Optional[List[str]] = None,
-                        environment: str = "测试环境") -> bool:
+                        environment: str = "测试环境",
+                        performance: Optional[Dict] = None) -> bool:
     """
     发送钉钉测试报告的便捷函数
     
@@ -239,6 +272,7 @@ def send_dingtalk_report(webhook: str,
         duration: 执行时长
         failed_cases: 失败用例列表
         environment: 环境名称
+        performance: 性能统计（最慢用例/步骤/定位器），为空时不展示
     
     Returns:
         是否发送成功
@@ -254,7 +288,8 @@ def send_dingtalk_report(webhook: str,
         skipped=skipped,
         duration=duration,
         failed_cases=failed_cases,
-        environment=environment
+        environment=environment,
+        performance=performance
     )
 
 
@@ -2,53 +2,192 @@
 # 图像识别工具
 # ========================================
 # 基于 OpenCV 的图像识别和对比功能
+# 所有方法的图片参数均支持：文件路径、图片字节（如 page.screenshot() 返回值）、
+# 已解码的 np.ndarray（BGR 或灰度），内存中的截图无需先落盘再读回
+# 按路径加载的图片以 (路径, mtime, 大小, 是否灰度) 为键做 LRU 缓存，
+# 基准图的感知哈希可持久化到所在目录的 .image_hash_index.json
 # ========================================
 
+import io
+import json
+import os
+import threading
 import cv2
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Tuple, Any
+from typing import Optional, Dict, List, Tuple, Any, Union, Sequence
+from config.settings import Settings
 from utils.logger import Logger
 
+# 图片来源：路径 / 编码后的字节 / 已解码数组
+ImageSource = Union[str, Path, bytes, bytearray, memoryview, np.ndarray]
+
+# find_all_template_matches 返回的结构化数组字段
+MATCH_DTYPE = np.dtype([
+    ("x", np.int32),
+    ("y", np.int32),
+    ("width", np.int32),
+    ("height", np.int32),
+    ("confidence", np.float32),
+    ("scale", np.float32),
+])
+
 
 class ImageRecognition:
-    """图像识别和对比工具类"""
+    """
+    图像识别和对比工具类
+
+    使用方法：
+        # 直接使用截图字节，先解码一次，再在多个调用间共享同一数组
+        screenshot = ImageRecognition.decode_image(page.screenshot(full_page=True))
+        position = ImageRecognition.find_template(screenshot, "tests/templates/button.png")
+        similarity = ImageRecognition.compare_images("tests/baseline/home.png", screenshot)
+    """
     
     logger = Logger("ImageRecognition")
     
+    # 解码结果 LRU 缓存：(绝对路径, mtime_ns, 文件大小, 是否灰度) -> 只读数组
+    _image_cache: "OrderedDict[Tuple[str, int, int, bool], np.ndarray]" = OrderedDict()
+    # 哈希缓存：(绝对路径, mtime_ns, 文件大小, 哈希类型) -> 哈希字符串（LRU，条数上限 IMAGE_HASH_CACHE_SIZE）
+    _hash_cache: "OrderedDict[Tuple[str, int, int, str], str]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    # 持久化哈希索引文件名（与图片同目录）
+    HASH_INDEX_FILENAME = ".image_hash_index.json"
+    
+    # compare_images：SSIM 窗口边长（与 skimage 默认一致）
+    SSIM_WINDOW = 7
+    # compare_images 预检：缩小到最长边像素数，以及判定「明显不同」的阈值
+    PRECHECK_MAX_SIDE = 256
+    PRECHECK_SSIM_BELOW = 0.5
+    PRECHECK_MSE_ABOVE = 2000.0
+    
+    # find_template 金字塔粗搜索（pyramid=True 时启用）：源图像素数低于该值时直接全分辨率匹配
+    PYRAMID_MIN_SOURCE_PIXELS = 1920 * 1080
+    # 可选的粗搜索缩放比例（从小到大尝试，取模板缩小后仍足够大的最小比例）
+    PYRAMID_SCALES = (0.25, 0.5)
+    # 模板缩小后的最小边长（像素），过小时粗搜索不可靠
+    PYRAMID_MIN_TEMPLATE_SIDE = 12
+    # 粗搜索阈值比最终阈值放宽的量，以及参与细化的候选数
+    PYRAMID_COARSE_MARGIN = 0.2
+    PYRAMID_CANDIDATES = 5
+    
+    @classmethod
+    def decode_image(cls, data: Union[bytes, bytearray, memoryview], grayscale: bool = False) -> Optional[np.ndarray]:
+        """
+        将编码后的图片字节（PNG/JPEG 等）解码为数组
+        
+        Args:
+            data: 图片字节，如 page.screenshot() 的返回值
+            grayscale: 是否解码为灰度图
+        
+        Returns:
+            图片数组，解码失败返回 None
+        """
+        try:
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+            img = cv2.imdecode(buffer, flag)
+            if img is None:
+                cls.logger.error("✗ 无法解码图片字节")
+            return img
+        except Exception as e:
+            cls.logger.error(f"✗ 解码图片失败: {e}")
+            return None
+    
     @classmethod
-    def load_image(cls, image_path: str, grayscale: bool = False) -> Optional[np.ndarray]:
+    def _convert_array(cls, image: np.ndarray, grayscale: bool) -> np.ndarray:
+        """
+        将已解码数组转换为所需通道格式（已符合时原样返回，不复制）
+        
+        Args:
+            image: BGR / BGRA / 灰度数组
+            grayscale: 是否需要灰度图
+        """
+        if grayscale:
+            if image.ndim == 2:
+                return image
+            code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            return cv2.cvtColor(image, code)
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        return image
+    
+    @classmethod
+    def load_image(cls, image_path: ImageSource, grayscale: bool = False,
+                   copy: bool = True) -> Optional[np.ndarray]:
         """
         加载图片
         
+        按路径加载的图片来自进程内共享的 LRU 缓存（只读数组）。默认返回可修改的副本；
+        只读取像素的调用（比对、模板匹配）传 copy=False 直接使用缓存数组，省去一次复制，
+        此时返回的数组 writeable=False，原地修改会抛出 ValueError。
+        传入字节或数组时不经过缓存，copy 不生效。
+        
         Args:
-            image_path: 图片路径
+            image_path: 图片路径、图片字节或已解码数组
             grayscale: 是否转为灰度图
+            copy: 按路径加载时是否返回缓存数组的副本
         
         Returns:
             图片数组，加载失败返回 None
         """
+        if isinstance(image_path, np.ndarray):
+            return cls._convert_array(image_path, grayscale)
+        if isinstance(image_path, (bytes, bytearray, memoryview)):
+            return cls.decode_image(image_path, grayscale)
+        
+        image_path = str(image_path)
         try:
             if not Path(image_path).exists():
                 cls.logger.error(f"✗ 图片不存在: {image_path}")
                 return None
             
-            # 读取图片
-            if grayscale:
-                img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-            else:
-                img = cv2.imread(image_path)
+            # 命中缓存直接返回（文件被修改后 mtime/大小变化，自动失效）
+            key = cls._file_key(image_path) + (grayscale,)
+            with cls._cache_lock:
+                cached = cls._image_cache.get(key)
+                if cached is not None:
+                    cls._image_cache.move_to_end(key)
+                    return cached.copy() if copy else cached
+            
+            # 读取图片（np.fromfile + imdecode，Windows 下中文路径也可读取）
+            flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+            img = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), flag)
             
             if img is None:
                 cls.logger.error(f"✗ 无法读取图片: {image_path}")
                 return None
             
+            # 缓存中的数组被多次复用，设为只读防止调用方原地修改
+            img.flags.writeable = False
+            with cls._cache_lock:
+                cls._image_cache[key] = img
+                while len(cls._image_cache) > max(Settings.IMAGE_CACHE_SIZE, 0):
+                    cls._image_cache.popitem(last=False)
+            
             cls.logger.info(f"✓ 加载图片成功: {image_path}")
-            return img
+            return img.copy() if copy else img
         except Exception as e:
             cls.logger.error(f"✗ 加载图片失败: {e}")
             return None
     
+    @classmethod
+    def _file_key(cls, image_path: str) -> Tuple[str, int, int]:
+        """文件缓存键：(绝对路径, mtime_ns, 文件大小)"""
+        stat = os.stat(image_path)
+        return os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """清空内存中的图片与哈希缓存"""
+        with cls._cache_lock:
+            cls._image_cache.clear()
+            cls._hash_cache.clear()
+    
     @classmethod
     def save_image(cls, image: np.ndarray, save_path: str) -> bool:
         """
@@ -65,7 +204,11 @@ class ImageRecognition:
             # 确保目录存在
             Path(save_path).parent.mkdir(parents=True, exist_ok=True)
             
-            result = cv2.imwrite(save_path, image)
+            # imencode + tofile，Windows 下中文路径也可写入
+            ok, encoded = cv2.imencode(Path(save_path).suffix or ".png", image)
+            result = bool(ok)
+            if ok:
+                encoded.tofile(save_path)
             if result:
                 cls.logger.info(f"✓ 保存图片成功: {save_path}")
             else:
@@ -76,73 +219,258 @@ class ImageRecognition:
             return False
     
     @classmethod
-    def compare_images(cls, image1_path: str, image2_path: str, 
-                      method: str = "ssim") -> float:
+    def _ssim_map(cls, img1: np.ndarray, img2: np.ndarray) -> np.ndarray:
         """
-        比较两张图片的相似度
+        基于 OpenCV 盒式滤波计算 SSIM 图
+        
+        参数与 skimage.metrics.structural_similarity 默认值一致（7×7 均匀窗口、样本协方差、
+        data_range=255、边缘 reflect），结果与其一致（float32 精度）。
+        
+        Returns:
+            与输入同尺寸的 SSIM 图（float32）；边缘 (窗口-1)/2 像素不参与均值
+        """
+        win = cls.SSIM_WINDOW
+        c1 = (0.01 * 255) ** 2
+        c2 = (0.03 * 255) ** 2
+        cov_norm = win * win / (win * win - 1.0)
+        
+        def _mean(x: np.ndarray) -> np.ndarray:
+            return cv2.boxFilter(x, cv2.CV_32F, (win, win), normalize=True, borderType=cv2.BORDER_REFLECT)
+        
+        x = img1.astype(np.float32)
+        y = img2.astype(np.float32)
+        ux, uy = _mean(x), _mean(y)
+        vx = cov_norm * (_mean(x * x) - ux * ux)
+        vy = cov_norm * (_mean(y * y) - uy * uy)
+        vxy = cov_norm * (_mean(x * y) - ux * uy)
+        numerator = (2 * ux * uy + c1) * (2 * vxy + c2)
+        denominator = (ux * ux + uy * uy + c1) * (vx + vy + c2)
+        return numerator / denominator
+    
+    @classmethod
+    def _tile_means(cls, values: np.ndarray, tiles: Tuple[int, int]) -> np.ndarray:
+        """按 (行数, 列数) 分块求均值，返回 (行数, 列数) 数组"""
+        rows, cols = tiles
+        h, w = values.shape[:2]
+        ys = np.linspace(0, h, rows + 1).astype(int)
+        xs = np.linspace(0, w, cols + 1).astype(int)
+        result = np.zeros((rows, cols), dtype=np.float64)
+        for r in range(rows):
+            for c in range(cols):
+                block = values[ys[r]:ys[r + 1], xs[c]:xs[c + 1]]
+                result[r, c] = float(block.mean()) if block.size else 0.0
+        return result
+    
+    @classmethod
+    def _score(cls, img1: np.ndarray, img2: np.ndarray, method: str,
+               tiles: Optional[Tuple[int, int]] = None) -> Tuple[float, Optional[np.ndarray]]:
+        """计算整体分数与分块分数（两图为同尺寸灰度图）"""
+        if method == "ssim":
+            ssim_map = cls._ssim_map(img1, img2)
+            pad = (cls.SSIM_WINDOW - 1) // 2
+            inner = ssim_map[pad:-pad, pad:-pad] if min(ssim_map.shape) > 2 * pad else ssim_map
+            score = float(inner.mean(dtype=np.float64))
+            return score, (cls._tile_means(ssim_map, tiles) if tiles else None)
+        # MSE：cv2.norm 在内部以 double 累加平方差，uint8 不会回绕，也不产生整图临时数组
+        score = cv2.norm(img1, img2, cv2.NORM_L2SQR) / img1.size
+        if not tiles:
+            return score, None
+        diff = cv2.absdiff(img1, img2).astype(np.float32)
+        return score, cls._tile_means(diff * diff, tiles)
+    
+    @classmethod
+    def compare_images_detailed(cls, image1_path: ImageSource, image2_path: ImageSource,
+                                method: str = "ssim", precheck: bool = False,
+                                tiles: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        比较两张图片，返回整体分数、分块分数与是否提前结束
+        
+        - 两图逐像素相同时直接返回（SSIM 1.0 / MSE 0.0），不做任何卷积
+        - precheck=True 时先在缩小到最长边 PRECHECK_MAX_SIDE 的图上比较，
+          明显不同（SSIM < PRECHECK_SSIM_BELOW 或 MSE > PRECHECK_MSE_ABOVE）时直接返回缩小图上的分数
+        - tiles=(行数, 列数) 时额外返回每块的分数，便于定位变化区域
         
         Args:
-            image1_path: 第一张图片路径
-            image2_path: 第二张图片路径
+            image1_path: 第一张图片（路径、字节或数组）
+            image2_path: 第二张图片（路径、字节或数组）
             method: 比较方法 ("ssim" 或 "mse")
-                - ssim: 结构相似性指数，范围 0-1，值越大越相似
-                - mse: 均方误差，值越小越相似
+            precheck: 是否启用缩小图预检
+            tiles: 分块数 (行数, 列数)，None 表示不分块
         
         Returns:
-            相似度值（SSIM: 0-1，MSE: 0-无穷大）
+            {"score": float, "method": str, "tiles": np.ndarray 或 None,
+             "early_exit": None / "identical" / "precheck"}
+            比较失败时 score 为 0.0
         
         示例：
-            similarity = ImageRecognition.compare_images("expected.png", "actual.png")
-            assert similarity > 0.95  # SSIM > 95% 表示高度相似
+            detail = ImageRecognition.compare_images_detailed(baseline, screenshot, tiles=(4, 4))
+            worst = np.unravel_index(detail["tiles"].argmin(), detail["tiles"].shape)
         """
+        method = method.lower()
+        failed = {"score": 0.0, "method": method, "tiles": None, "early_exit": None}
         try:
+            if method not in ("ssim", "mse"):
+                cls.logger.error(f"✗ 不支持的比较方法: {method}")
+                return failed
+            
             # 加载图片（灰度）
-            img1 = cls.load_image(image1_path, grayscale=True)
-            img2 = cls.load_image(image2_path, grayscale=True)
+            img1 = cls.load_image(image1_path, grayscale=True, copy=False)
+            img2 = cls.load_image(image2_path, grayscale=True, copy=False)
             
             if img1 is None or img2 is None:
-                return 0.0
+                return failed
             
             # 调整尺寸一致
             if img1.shape != img2.shape:
                 cls.logger.warning("图片尺寸不一致，正在调整...")
                 img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
             
-            if method.lower() == "ssim":
-                # 使用 SSIM（结构相似性指数）
-                from skimage.metrics import structural_similarity as ssim
-                similarity = ssim(img1, img2)
-                cls.logger.info(f"✓ SSIM 相似度: {similarity:.4f}")
-                return similarity
-            
-            elif method.lower() == "mse":
-                # 使用 MSE（均方误差）
-                mse = np.mean((img1 - img2) ** 2)
-                cls.logger.info(f"✓ MSE 误差: {mse:.4f}")
-                return mse
-            
+            same_score = 1.0 if method == "ssim" else 0.0
+            if np.array_equal(img1, img2):
+                cls.logger.info(f"✓ 图片完全相同，{method.upper()}: {same_score:.4f}")
+                same_tiles = np.full(tiles, same_score) if tiles else None
+                return {"score": same_score, "method": method, "tiles": same_tiles, "early_exit": "identical"}
+            
+            if precheck:
+                factor = cls.PRECHECK_MAX_SIDE / max(img1.shape)
+                if factor < 1.0:
+                    small1 = cv2.resize(img1, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+                    small2 = cv2.resize(img2, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+                    small_score, small_tiles = cls._score(small1, small2, method, tiles)
+                    clearly_different = (small_score < cls.PRECHECK_SSIM_BELOW if method == "ssim"
+                                         else small_score > cls.PRECHECK_MSE_ABOVE)
+                    if clearly_different:
+                        cls.logger.info(f"✓ 缩小图预检差异明显，{method.upper()}: {small_score:.4f}")
+                        return {"score": small_score, "method": method, "tiles": small_tiles,
+                                "early_exit": "precheck"}
+            
+            score, tile_scores = cls._score(img1, img2, method, tiles)
+            if method == "ssim":
+                cls.logger.info(f"✓ SSIM 相似度: {score:.4f}")
             else:
-                cls.logger.error(f"✗ 不支持的比较方法: {method}")
-                return 0.0
+                cls.logger.info(f"✓ MSE 误差: {score:.4f}")
+            return {"score": score, "method": method, "tiles": tile_scores, "early_exit": None}
         
         except Exception as e:
             cls.logger.error(f"✗ 图片比较失败: {e}")
-            return 0.0
+            return failed
+    
+    @classmethod
+    def compare_images(cls, image1_path: ImageSource, image2_path: ImageSource, 
+                      method: str = "ssim", precheck: bool = False) -> float:
+        """
+        比较两张图片的相似度
+        
+        Args:
+            image1_path: 第一张图片（路径、字节或数组）
+            image2_path: 第二张图片（路径、字节或数组）
+            method: 比较方法 ("ssim" 或 "mse")
+                - ssim: 结构相似性指数，范围 0-1，值越大越相似
+                - mse: 均方误差，值越小越相似
+            precheck: 是否先在缩小图上预检，明显不同时直接返回（见 compare_images_detailed）
+        
+        Returns:
+            相似度值（SSIM: 0-1，MSE: 0-无穷大）
+        
+        示例：
+            similarity = ImageRecognition.compare_images("expected.png", "actual.png")
+            assert similarity > 0.95  # SSIM > 95% 表示高度相似
+        """
+        return cls.compare_images_detailed(image1_path, image2_path, method, precheck)["score"]
+    
+    @classmethod
+    def _search_window(cls, region: Optional[Union[Dict[str, float], Sequence[float]]],
+                       source_shape: Tuple[int, ...],
+                       template_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        """
+        计算搜索窗口 (x0, y0, x1, y1)
+        
+        region 为 {"x", "y", "width", "height"}（Playwright bounding_box() 的格式）或 (x, y, width, height)；
+        超出图片的部分被裁掉，窗口小于模板时以窗口中心扩展到模板大小。
+        """
+        src_h, src_w = source_shape[:2]
+        if region is None:
+            return 0, 0, src_w, src_h
+        if isinstance(region, dict):
+            x, y, w, h = region["x"], region["y"], region["width"], region["height"]
+        else:
+            x, y, w, h = region
+        tpl_h, tpl_w = template_shape[:2]
+        cx, cy = x + w / 2.0, y + h / 2.0
+        w, h = max(w, tpl_w), max(h, tpl_h)
+        x0 = int(max(0, min(src_w - w, cx - w / 2.0)))
+        y0 = int(max(0, min(src_h - h, cy - h / 2.0)))
+        return x0, y0, int(min(src_w, x0 + np.ceil(w))), int(min(src_h, y0 + np.ceil(h)))
+    
+    @classmethod
+    def _pyramid_scale(cls, source_shape: Tuple[int, ...], template_shape: Tuple[int, ...]) -> float:
+        """粗搜索缩放比例：源图足够大且模板缩小后仍不小于 PYRAMID_MIN_TEMPLATE_SIDE 时取最小的可用比例，否则 1.0"""
+        if source_shape[0] * source_shape[1] < cls.PYRAMID_MIN_SOURCE_PIXELS:
+            return 1.0
+        min_side = min(template_shape[:2])
+        for scale in cls.PYRAMID_SCALES:
+            if min_side * scale >= cls.PYRAMID_MIN_TEMPLATE_SIDE:
+                return scale
+        return 1.0
+    
+    @classmethod
+    def _coarse_to_fine_match(cls, source: np.ndarray, template: np.ndarray, scale: float,
+                              threshold: float) -> Tuple[float, Tuple[int, int]]:
+        """
+        金字塔粗到细匹配
+        
+        在缩小 scale 倍的图上找出候选峰值，再只在候选附近的小区域内做全分辨率匹配。
+        
+        Returns:
+            (最佳置信度, 最佳位置 (x, y))；没有候选时置信度为 -1
+        """
+        h, w = template.shape[:2]
+        coarse_source = cv2.resize(source, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        coarse_template = cv2.resize(template, (max(int(round(w * scale)), 1), max(int(round(h * scale)), 1)),
+                                     interpolation=cv2.INTER_AREA)
+        boxes, scores = cls._template_peaks(coarse_source, coarse_template,
+                                            threshold - cls.PYRAMID_COARSE_MARGIN)
+        best_val, best_loc = -1.0, (0, 0)
+        # 粗图上 1 个像素对应原图 1/scale 个像素，细化窗口四周各留出该误差
+        margin = int(np.ceil(1.0 / scale)) * 2
+        for i in np.argsort(-scores)[:cls.PYRAMID_CANDIDATES]:
+            fx, fy = int(boxes[i, 0] / scale), int(boxes[i, 1] / scale)
+            x0, y0 = max(fx - margin, 0), max(fy - margin, 0)
+            x1 = min(fx + w + margin, source.shape[1])
+            y1 = min(fy + h + margin, source.shape[0])
+            roi = source[y0:y1, x0:x1]
+            if roi.shape[0] < h or roi.shape[1] < w:
+                continue
+            _, max_val, _, max_loc = cv2.minMaxLoc(cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED))
+            if max_val > best_val:
+                best_val, best_loc = max_val, (x0 + max_loc[0], y0 + max_loc[1])
+        return best_val, best_loc
     
     @classmethod
-    def find_template(cls, source_image_path: str, template_image_path: str,
-                     threshold: float = 0.8) -> Optional[Dict[str, int]]:
+    def find_template(cls, source_image_path: ImageSource, template_image_path: ImageSource,
+                     threshold: float = 0.8,
+                     region: Optional[Union[Dict[str, float], Sequence[float]]] = None,
+                     pyramid: bool = False) -> Optional[Dict[str, int]]:
         """
         在源图片中查找模板图片的位置
         
+        默认整图（或 region 内）全分辨率匹配；传入 region 时只在该区域内搜索，耗时与页面长度无关。
+        pyramid=True 时大图先在缩小的图上粗搜索，再只在候选附近做全分辨率匹配，
+        细化结果低于阈值时回退到全分辨率匹配。
+        
         Args:
-            source_image_path: 源图片路径（大图）
-            template_image_path: 模板图片路径（小图）
+            source_image_path: 源图片（大图；路径、字节或数组）
+            template_image_path: 模板图片（小图；路径、字节或数组）
             threshold: 匹配阈值（0-1），值越大要求越严格
+            region: 搜索区域，{"x", "y", "width", "height"}（如 locator.bounding_box() 的返回值）
+                或 (x, y, width, height)，坐标相对源图；None 表示整图
+            pyramid: 是否启用金字塔粗到细搜索，默认 False。纹理细密的小模板在缩小后容易丢失特征，
+                粗搜索可能返回高于阈值的错误位置，只建议用于较大、特征明显的模板
+                （源图较小或模板过小时自动退化为全分辨率匹配）
         
         Returns:
             匹配位置字典 {"x": int, "y": int, "width": int, "height": int, "confidence": float}
-            未找到返回 None
+            （坐标相对整张源图），未找到返回 None
         
         示例：
             position = ImageRecognition.find_template("screenshot.png", "button.png")
@@ -150,31 +478,51 @@ class ImageRecognition:
                 print(f"按钮位置: ({position['x']}, {position['y']})")
                 page.mouse.click(position['x'] + position['width']//2, 
                                 position['y'] + position['height']//2)
+            
+            # 只在某个元素范围内查找（视口截图时 bounding_box 坐标与截图一致）
+            box = page.locator(".el-tree").bounding_box()
+            position = ImageRecognition.find_template(page.screenshot(), "icon.png", region=box)
         """
         try:
-            # 加载图片（灰度）
-            source = cls.load_image(source_image_path, grayscale=True)
-            template = cls.load_image(template_image_path, grayscale=True)
+            # 加载图片（灰度）；已解码的数组先裁剪搜索区域再转灰度，避免整页转换
+            if isinstance(source_image_path, np.ndarray):
+                source = source_image_path
+            else:
+                source = cls.load_image(source_image_path, grayscale=True, copy=False)
+            template = cls.load_image(template_image_path, grayscale=True, copy=False)
             
             if source is None or template is None:
                 return None
             
+            # 获取模板尺寸
+            h, w = template.shape
+            
+            # 限定搜索区域
+            x0, y0, x1, y1 = cls._search_window(region, source.shape, template.shape)
+            window = cls._convert_array(source[y0:y1, x0:x1], grayscale=True)
+            if window.shape[0] < h or window.shape[1] < w:
+                cls.logger.warning(f"✗ 搜索区域小于模板，无法匹配: {window.shape[1]}x{window.shape[0]} < {w}x{h}")
+                return None
+            
             # 模板匹配
-            result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            scale = cls._pyramid_scale(window.shape, template.shape) if pyramid else 1.0
+            max_val = -1.0
+            if scale < 1.0:
+                max_val, max_loc = cls._coarse_to_fine_match(window, template, scale, threshold)
+            if max_val < threshold:
+                # 未启用粗搜索，或粗搜索的候选细化后未达到阈值：全分辨率匹配
+                result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
             
             # 检查是否满足阈值
             if max_val < threshold:
                 cls.logger.warning(f"✗ 未找到匹配，置信度: {max_val:.4f} < {threshold}")
                 return None
             
-            # 获取模板尺寸
-            h, w = template.shape
-            
             # 返回匹配位置
             position = {
-                "x": int(max_loc[0]),
-                "y": int(max_loc[1]),
+                "x": int(max_loc[0] + x0),
+                "y": int(max_loc[1] + y0),
                 "width": int(w),
                 "height": int(h),
                 "confidence": float(max_val)
@@ -189,64 +537,259 @@ class ImageRecognition:
             return None
     
     @classmethod
-    def find_all_templates(cls, source_image_path: str, template_image_path: str,
-                          threshold: float = 0.8) -> list:
+    def _non_max_suppression(cls, boxes: np.ndarray, scores: np.ndarray,
+                             iou_threshold: float) -> np.ndarray:
+        """
+        非极大值抑制（按分数从高到低保留，去掉与已保留框 IoU 超过阈值的框）
+        
+        Args:
+            boxes: (N, 4) 数组，每行 [x, y, width, height]
+            scores: (N,) 置信度
+            iou_threshold: IoU 阈值
+        
+        Returns:
+            保留框的下标（按分数降序）
+        """
+        x1, y1 = boxes[:, 0].astype(np.float64), boxes[:, 1].astype(np.float64)
+        x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+        areas = boxes[:, 2].astype(np.float64) * boxes[:, 3]
+        order = np.argsort(-scores, kind="stable")
+        keep = []
+        while order.size:
+            i = order[0]
+            keep.append(i)
+            rest = order[1:]
+            inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+            inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+            inter = inter_w * inter_h
+            iou = inter / (areas[i] + areas[rest] - inter)
+            order = rest[iou <= iou_threshold]
+        return np.asarray(keep, dtype=np.int64)
+    
+    @classmethod
+    def _template_peaks(cls, source: np.ndarray, template: np.ndarray,
+                        threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        单一尺度模板匹配并提取局部峰值
+        
+        先用与模板半尺寸相当的膨胀核求局部最大值，只保留「等于邻域最大值且超过阈值」的点，
+        同一处匹配周围成片超过阈值的像素因此只剩峰值一个候选。
+        
+        Returns:
+            (候选框 (N, 4) [x, y, w, h], 置信度 (N,))
+        """
+        h, w = template.shape[:2]
+        result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED)
+        kernel = np.ones((max(h // 2, 1) | 1, max(w // 2, 1) | 1), dtype=np.uint8)
+        local_max = cv2.dilate(result, kernel)
+        ys, xs = np.nonzero((result >= threshold) & (result >= local_max))
+        boxes = np.column_stack([xs, ys, np.full_like(xs, w), np.full_like(xs, h)])
+        return boxes, result[ys, xs]
+    
+    @classmethod
+    def find_all_templates(cls, source_image_path: ImageSource, template_image_path: ImageSource,
+                          threshold: float = 0.8, max_results: Optional[int] = None,
+                          iou_threshold: float = 0.3,
+                          scales: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
         """
         在源图片中查找所有模板匹配位置
         
+        每处匹配只返回一个结果：先提取匹配结果图的局部峰值，再按 IoU 做非极大值抑制。
+        需要 NumPy 结构化数组（便于向量化筛选、排序）时使用 find_all_template_matches()。
+        
         Args:
-            source_image_path: 源图片路径
-            template_image_path: 模板图片路径
+            source_image_path: 源图片（路径、字节或数组）
+            template_image_path: 模板图片（路径、字节或数组）
             threshold: 匹配阈值
+            max_results: 最多返回的结果数（按置信度从高到低），None 表示不限制
+            iou_threshold: 非极大值抑制的 IoU 阈值，重叠超过该值的结果只保留置信度最高的
+            scales: 模板缩放比例列表（如 [0.8, 1.0, 1.25]），None 表示只按原尺寸匹配
         
         Returns:
-            匹配位置列表
+            匹配位置列表（按置信度降序），每项为
+            {"x", "y", "width", "height", "confidence", "scale"}；未找到时为空列表
         
         示例：
             positions = ImageRecognition.find_all_templates("page.png", "icon.png")
             for pos in positions:
                 print(f"找到图标: ({pos['x']}, {pos['y']})")
         """
+        matches = cls.find_all_template_matches(
+            source_image_path, template_image_path, threshold=threshold,
+            max_results=max_results, iou_threshold=iou_threshold, scales=scales,
+        )
+        return [
+            {"x": int(x), "y": int(y), "width": int(w), "height": int(h),
+             "confidence": float(confidence), "scale": float(scale)}
+            for x, y, w, h, confidence, scale in matches.tolist()
+        ]
+    
+    @classmethod
+    def find_all_template_matches(cls, source_image_path: ImageSource, template_image_path: ImageSource,
+                                  threshold: float = 0.8, max_results: Optional[int] = None,
+                                  iou_threshold: float = 0.3,
+                                  scales: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        在源图片中查找所有模板匹配位置，返回结构化数组（find_all_templates 的数组形式）
+        
+        Args:
+            source_image_path: 源图片（路径、字节或数组）
+            template_image_path: 模板图片（路径、字节或数组）
+            threshold: 匹配阈值
+            max_results: 最多返回的结果数（按置信度从高到低），None 表示不限制
+            iou_threshold: 非极大值抑制的 IoU 阈值，重叠超过该值的结果只保留置信度最高的
+            scales: 模板缩放比例列表（如 [0.8, 1.0, 1.25]），用于 DPI/缩放不一致的页面；
+                None 表示只按原尺寸匹配
+        
+        Returns:
+            结构化数组（按置信度降序），字段 x / y / width / height / confidence / scale，
+            可按 pos['x'] 访问；未找到时为空数组（用 len() 判断）
+        
+        示例：
+            matches = ImageRecognition.find_all_template_matches("page.png", "icon.png")
+            top = matches[matches["confidence"] > 0.95]
+            centers_x = top["x"] + top["width"] // 2
+        """
+        empty = np.zeros(0, dtype=MATCH_DTYPE)
         try:
             # 加载图片
-            source = cls.load_image(source_image_path, grayscale=True)
-            template = cls.load_image(template_image_path, grayscale=True)
+            source = cls.load_image(source_image_path, grayscale=True, copy=False)
+            template = cls.load_image(template_image_path, grayscale=True, copy=False)
             
             if source is None or template is None:
-                return []
-            
-            # 模板匹配
-            result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED)
-            h, w = template.shape
-            
-            # 找到所有匹配位置
-            locations = np.where(result >= threshold)
-            positions = []
-            
-            for pt in zip(*locations[::-1]):
-                position = {
-                    "x": int(pt[0]),
-                    "y": int(pt[1]),
-                    "width": int(w),
-                    "height": int(h),
-                    "confidence": float(result[pt[1], pt[0]])
-                }
-                positions.append(position)
+                return empty
+            
+            all_boxes, all_scores, all_scales = [], [], []
+            for scale in (scales or [1.0]):
+                if scale == 1.0:
+                    scaled = template
+                else:
+                    size = (max(int(round(template.shape[1] * scale)), 1),
+                            max(int(round(template.shape[0] * scale)), 1))
+                    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+                    scaled = cv2.resize(template, size, interpolation=interpolation)
+                if scaled.shape[0] > source.shape[0] or scaled.shape[1] > source.shape[1]:
+                    continue
+                boxes, scores = cls._template_peaks(source, scaled, threshold)
+                all_boxes.append(boxes)
+                all_scores.append(scores)
+                all_scales.append(np.full(len(scores), scale, dtype=np.float32))
+            
+            if not all_boxes or not sum(len(sc) for sc in all_scores):
+                cls.logger.info("✓ 找到 0 个匹配位置")
+                return empty
+            
+            boxes = np.concatenate(all_boxes)
+            scores = np.concatenate(all_scores)
+            keep = cls._non_max_suppression(boxes, scores, iou_threshold)
+            if max_results is not None:
+                keep = keep[:max_results]
+            
+            positions = np.zeros(len(keep), dtype=MATCH_DTYPE)
+            positions["x"], positions["y"] = boxes[keep, 0], boxes[keep, 1]
+            positions["width"], positions["height"] = boxes[keep, 2], boxes[keep, 3]
+            positions["confidence"] = scores[keep]
+            positions["scale"] = np.concatenate(all_scales)[keep]
             
             cls.logger.info(f"✓ 找到 {len(positions)} 个匹配位置")
             return positions
         
         except Exception as e:
             cls.logger.error(f"✗ 批量模板匹配失败: {e}")
-            return []
+            return empty
     
     @classmethod
-    def get_image_hash(cls, image_path: str) -> Optional[str]:
+    def _open_pil(cls, image: ImageSource):
+        """
+        以 PIL.Image 打开图片（imagehash 使用）
+        
+        路径与字节均由 PIL 直接解码，结果与按路径打开一致；数组按 BGR/灰度转换。
+        """
+        from PIL import Image
+        
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return Image.fromarray(image)
+            code = cv2.COLOR_BGRA2RGBA if image.shape[2] == 4 else cv2.COLOR_BGR2RGB
+            return Image.fromarray(cv2.cvtColor(image, code))
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return Image.open(io.BytesIO(bytes(image)))
+        return Image.open(str(image))
+    
+    @classmethod
+    def _compute_hash(cls, image: ImageSource, hash_type: str) -> str:
+        """计算感知哈希（phash / dhash / ahash）"""
+        return cls._hash_pil(cls._open_pil(image), hash_type)
+    
+    @staticmethod
+    def _hash_pil(pil_image, hash_type: str) -> str:
+        """对已打开的 PIL.Image 计算感知哈希，同一张图计算多种哈希时只解码一次"""
+        import imagehash
+        
+        funcs = {"phash": imagehash.phash, "dhash": imagehash.dhash, "ahash": imagehash.average_hash}
+        if hash_type not in funcs:
+            raise ValueError(f"不支持的哈希类型: {hash_type}")
+        return str(funcs[hash_type](pil_image))
+    
+    @classmethod
+    def _read_hash_index(cls, index_path: Path) -> dict:
+        """读取哈希索引文件，不存在或损坏时返回空字典"""
+        try:
+            if index_path.exists():
+                with open(index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            cls.logger.warning(f"读取哈希索引失败，将重新计算: {index_path}, 错误: {e}")
+        return {}
+    
+    @classmethod
+    def _indexed_hash(cls, image_path: str, hash_type: str) -> str:
+        """
+        从图片所在目录的哈希索引读取哈希，缺失或文件已变化时计算并写回
+        
+        索引项按文件名存储 mtime_ns、大小与各类哈希；写入先写临时文件再 os.replace，
+        多个 worker 并发写入时最多导致某一项被重复计算，不会产生损坏的索引。
+        """
+        path = Path(image_path)
+        index_path = path.parent / cls.HASH_INDEX_FILENAME
+        _, mtime_ns, size = cls._file_key(image_path)
+        
+        entry = cls._read_hash_index(index_path).get(path.name)
+        if entry and entry.get("mtime_ns") == mtime_ns and entry.get("size") == size and entry.get(hash_type):
+            return entry[hash_type]
+        
+        # 一次解码同时计算常用哈希，后续换哈希类型无需再读图
+        with cls._open_pil(image_path) as pil_image:
+            pil_image.load()
+            names = dict.fromkeys(("phash", "dhash", hash_type))
+            hashes = {name: cls._hash_pil(pil_image, name) for name in names}
+        
+        with cls._cache_lock:
+            index = cls._read_hash_index(index_path)
+            index[path.name] = {"mtime_ns": mtime_ns, "size": size, **hashes}
+            tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+                os.replace(tmp_path, index_path)
+            except Exception as e:
+                cls.logger.warning(f"写入哈希索引失败: {index_path}, 错误: {e}")
+        return hashes[hash_type]
+    
+    @classmethod
+    def get_image_hash(cls, image_path: ImageSource, hash_type: str = "phash",
+                       use_index: bool = False) -> Optional[str]:
         """
         计算图片的感知哈希值（用于快速比较）
         
+        按路径计算的哈希在内存中按 (路径, mtime, 大小) 缓存；
+        use_index=True 时还会持久化到图片所在目录的 .image_hash_index.json，
+        适合基准图（跨测试、跨 worker、跨会话只计算一次）。
+        
         Args:
-            image_path: 图片路径
+            image_path: 图片路径、字节或数组
+            hash_type: 哈希类型（phash / dhash / ahash）
+            use_index: 路径输入时是否使用磁盘哈希索引
         
         Returns:
             哈希值字符串
@@ -258,11 +801,24 @@ class ImageRecognition:
                 print("图片相同")
         """
         try:
-            import imagehash
-            from PIL import Image
-            
-            img = Image.open(image_path)
-            hash_value = str(imagehash.phash(img))
+            if isinstance(image_path, (str, Path)):
+                image_path = str(image_path)
+                key = cls._file_key(image_path) + (hash_type,)
+                with cls._cache_lock:
+                    hash_value = cls._hash_cache.get(key)
+                    if hash_value is not None:
+                        cls._hash_cache.move_to_end(key)
+                if hash_value is None:
+                    if use_index:
+                        hash_value = cls._indexed_hash(image_path, hash_type)
+                    else:
+                        hash_value = cls._compute_hash(image_path, hash_type)
+                    with cls._cache_lock:
+                        cls._hash_cache[key] = hash_value
+                        while len(cls._hash_cache) > max(Settings.IMAGE_HASH_CACHE_SIZE, 0):
+                            cls._hash_cache.popitem(last=False)
+            else:
+                hash_value = cls._compute_hash(image_path, hash_type)
             cls.logger.info(f"✓ 图片哈希: {hash_value}")
             return hash_value
         
@@ -274,15 +830,16 @@ class ImageRecognition:
             return None
     
     @classmethod
-    def compare_image_hashes(cls, image1_path: str, image2_path: str,
-                           max_difference: int = 5) -> bool:
+    def compare_image_hashes(cls, image1_path: ImageSource, image2_path: ImageSource,
+                           max_difference: int = 5, use_index: bool = False) -> bool:
         """
         通过哈希值快速比较两张图片是否相似
         
         Args:
-            image1_path: 第一张图片路径
-            image2_path: 第二张图片路径
+            image1_path: 第一张图片（路径、字节或数组）
+            image2_path: 第二张图片（路径、字节或数组）
             max_difference: 最大允许差异（0-64），值越小要求越严格
+            use_index: 路径输入时是否使用磁盘哈希索引（基准图推荐开启）
         
         Returns:
             是否相似
@@ -294,15 +851,13 @@ class ImageRecognition:
         """
         try:
             import imagehash
-            from PIL import Image
             
-            img1 = Image.open(image1_path)
-            img2 = Image.open(image2_path)
-            
-            hash1 = imagehash.phash(img1)
-            hash2 = imagehash.phash(img2)
+            hash1 = cls.get_image_hash(image1_path, use_index=use_index)
+            hash2 = cls.get_image_hash(image2_path, use_index=use_index)
+            if hash1 is None or hash2 is None:
+                return False
             
-            difference = hash1 - hash2
+            difference = imagehash.hex_to_hash(hash1) - imagehash.hex_to_hash(hash2)
             is_similar = difference <= max_difference
             
             cls.logger.info(f"✓ 哈希差异: {difference}, 相似: {is_similar}")
@@ -316,13 +871,13 @@ class ImageRecognition:
             return False
     
     @classmethod
-    def crop_image(cls, image_path: str, x: int, y: int, width: int, height: int,
+    def crop_image(cls, image_path: ImageSource, x: int, y: int, width: int, height: int,
                   save_path: Optional[str] = None) -> Optional[np.ndarray]:
         """
         裁剪图片
         
         Args:
-            image_path: 源图片路径
+            image_path: 源图片（路径、字节或数组）
             x: 起始 X 坐标
             y: 起始 Y 坐标
             width: 宽度
@@ -339,12 +894,12 @@ class ImageRecognition:
             ImageRecognition.crop_image("full.png", 100, 100, 200, 150, "cropped.png")
         """
         try:
-            img = cls.load_image(image_path)
+            img = cls.load_image(image_path, copy=False)
             if img is None:
                 return None
             
-            # 裁剪
-            cropped = img[y:y+height, x:x+width]
+            # 裁剪（复制一份，缓存中的原图为只读）
+            cropped = img[y:y+height, x:x+width].copy()
             
             # 保存（如果指定了路径）
             if save_path:
@@ -358,13 +913,13 @@ class ImageRecognition:
             return None
     
     @classmethod
-    def resize_image(cls, image_path: str, width: int, height: int,
+    def resize_image(cls, image_path: ImageSource, width: int, height: int,
                     save_path: Optional[str] = None) -> Optional[np.ndarray]:
         """
         调整图片尺寸
         
         Args:
-            image_path: 源图片路径
+            image_path: 源图片（路径、字节或数组）
             width: 目标宽度
             height: 目标高度
             save_path: 保存路径（可选）
@@ -373,7 +928,7 @@ class ImageRecognition:
             调整后的图片数组
         """
         try:
-            img = cls.load_image(image_path)
+            img = cls.load_image(image_path, copy=False)
             if img is None:
                 return None
             
@@ -392,14 +947,14 @@ class ImageRecognition:
             return None
     
     @classmethod
-    def highlight_difference(cls, image1_path: str, image2_path: str,
+    def highlight_difference(cls, image1_path: ImageSource, image2_path: ImageSource,
                            save_path: str) -> bool:
         """
         高亮显示两张图片的差异区域
         
         Args:
-            image1_path: 第一张图片路径
-            image2_path: 第二张图片路径
+            image1_path: 第一张图片（路径、字节或数组）
+            image2_path: 第二张图片（路径、字节或数组）
             save_path: 差异图保存路径
         
         Returns:
@@ -411,8 +966,8 @@ class ImageRecognition:
         """
         try:
             # 加载图片
-            img1 = cls.load_image(image1_path)
-            img2 = cls.load_image(image2_path)
+            img1 = cls.load_image(image1_path, copy=False)
+            img2 = cls.load_image(image2_path, copy=False)
             
             if img1 is None or img2 is None:
                 return False
@@ -455,7 +1010,7 @@ if __name__ == '__main__':
     print("\n主要功能:")
     print("1. compare_images() - 比较图片相似度")
     print("2. find_template() - 查找模板位置")
-    print("3. find_all_templates() - 查找所有匹配位置")
+    print("3. find_all_templates() / find_all_template_matches() - 查找所有匹配位置")
     print("4. get_image_hash() - 计算图片哈希")
     print("5. crop_image() - 裁剪图片")
     print("6. resize_image() - 调整尺寸")
@@ -0,0 +1,263 @@
+# ========================================
+# 请求拦截模块
+# ========================================
+# 通过 context.route 拦截用例不关心的请求（统计埋点、字体、视频、大图等），加快页面加载、节省带宽：
+# - 规则来自环境配置 config/environments/*.yaml 的 request_routing 节点
+# - 按资源类型（image/font/media/...）和 URL 规则匹配，动作为 abort（中断）或 stub（返回空响应）
+# - allow_urls 中的请求（如验证码图片）始终放行
+# - 只用规则中的 URL 构造一个路由正则注册，其余请求不进入 Python 回调；
+#   存在只按资源类型匹配的规则时无法收窄，退化为拦截全部请求（**/*），每个请求都要经过 Python 回调
+# - 每个用例结束时统计拦截数量；节省的字节数默认只取有上界的 Range 请求头给出的大小（请求的 Content-Length 是上传大小，不计入），
+#   浏览器请求通常没有，此时记为「大小未知」而不是 0；
+#   开启 measure_bytes 后对 abort 的资源用浏览器上下文（带 Cookie）发 HEAD 补全，stub 的请求从不重新访问
+#
+# 注意：注册任意路由后 Chromium 不再使用 HTTP 缓存，同一用例内重复加载的 JS/CSS 会重新下载，
+#       开启前应对比实际页面耗时，规则应只覆盖确实不需要的资源
+# ========================================
+
+import base64
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+from playwright.sync_api import BrowserContext, Page, Request, Route
+
+from config.settings import Settings
+from utils.logger import Logger
+from utils.request_tracker import url_matches
+
+logger = Logger("RequestRouter")
+
+# 1x1 透明 GIF，stub 图片时使用，避免页面显示破图
+_TRANSPARENT_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+# stub 动作按资源类型返回的默认响应：(content_type, body)
+_STUB_RESPONSES = {
+    "image": ("image/gif", _TRANSPARENT_GIF),
+    "script": ("application/javascript", b""),
+    "stylesheet": ("text/css", b""),
+    "xhr": ("application/json", b"{}"),
+    "fetch": ("application/json", b"{}"),
+}
+
+ACTIONS = ("abort", "stub")
+
+# 资源大小缓存的最大条目数（进程内共享，按 URL，LRU 淘汰）
+SIZE_CACHE_MAX = 512
+
+
+def compile_pattern(pattern: str) -> Union[str, re.Pattern]:
+    """配置中的 URL 规则：以 re: 开头按正则处理，其它按 URL 片段 / glob 处理（与 HAR_URL_FILTER 一致）"""
+    return re.compile(pattern[3:]) if pattern.startswith("re:") else pattern
+
+
+def route_regex(pattern: Union[str, re.Pattern]) -> str:
+    """
+    把 URL 规则转为 context.route 可用的正则源码（Playwright 按 JS 正则 test 匹配）
+
+    与 url_matches 一致：glob（含 *）匹配完整 URL，* 可跨越 /，? 匹配单个字符；其它字符串按包含匹配。
+    glob 中的 [...] 按字面处理，需要字符集时请用 re: 正则。
+    """
+    if isinstance(pattern, re.Pattern):
+        return pattern.pattern
+    if "*" not in pattern:
+        return re.escape(pattern)
+    translated = "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in pattern)
+    return f"^{translated}$"
+
+
+class _RouteRule:
+    """单条拦截规则"""
+
+    def __init__(self, config: dict):
+        self.resource_types = {t.lower() for t in config.get("resource_types") or []}
+        self.urls = [compile_pattern(p) for p in config.get("urls") or []]
+        self.action = str(config.get("action", "abort")).lower()
+        if self.action not in ACTIONS:
+            raise ValueError(f"未知的请求拦截动作: {self.action}，可选: {', '.join(ACTIONS)}")
+        self.status = int(config.get("status", 200))
+        self.content_type = config.get("content_type")
+        self.body = config.get("body")
+
+    def matches(self, request: Request) -> bool:
+        """资源类型与 URL 规则同时配置时需同时满足"""
+        if self.resource_types and request.resource_type not in self.resource_types:
+            return False
+        if self.urls and not any(url_matches(request.url, p) for p in self.urls):
+            return False
+        return bool(self.resource_types or self.urls)
+
+    def fulfill(self, route: Route, request: Request) -> None:
+        """stub：返回配置的响应，未配置时按资源类型返回空内容"""
+        content_type, body = _STUB_RESPONSES.get(request.resource_type, ("text/plain", b""))
+        if self.body is not None:
+            body = self.body.encode("utf-8") if isinstance(self.body, str) else self.body
+        route.fulfill(status=self.status, content_type=self.content_type or content_type, body=body)
+
+
+class RequestRouter:
+    """
+    请求拦截器（每个 BrowserContext 一个实例，统计随用例结束输出）
+
+    环境配置示例（config/environments/gqkt/prod.yaml）：
+        request_routing:
+          enabled: true
+          measure_bytes: false
+          rules:
+            - urls: ["re:\\.(mp4|webm|m3u8|mp3)(\\?|$)"]
+              action: abort
+            - urls: ["*hm.baidu.com*", "re:google-analytics\\.com"]
+              action: stub
+
+    每条规则都配置了 urls 时只拦截匹配这些 URL 的请求；存在只有 resource_types 的规则时拦截全部请求。
+
+    使用方法：
+        router = RequestRouter(env_config.get("request_routing", {}))
+        router.install(context)
+        ...
+        stats = router.summary(context)   # {"blocked": 12, "stubbed": 3, "bytes": 1048576, "unmeasured": 0, ...}
+    """
+
+    # URL -> 资源字节数（进程内共享，同一资源只查询一次，超过 SIZE_CACHE_MAX 时淘汰最久未用的）
+    _size_cache: "OrderedDict[str, int]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        Args:
+            config: 环境配置中的 request_routing 节点
+        """
+        config = config or {}
+        self.enabled = bool(config.get("enabled", False)) and Settings.REQUEST_ROUTING and bool(config.get("rules"))
+        self.rules: List[_RouteRule] = [_RouteRule(rule) for rule in config.get("rules") or []]
+        self.allow_urls = [compile_pattern(p) for p in config.get("allow_urls") or []]
+        self.measure = bool(config.get("measure_bytes", Settings.REQUEST_ROUTING_MEASURE))
+
+        self._lock = threading.Lock()
+        self._blocked: Dict[str, int] = {}
+        self._stubbed = 0
+        # 被 abort 的请求：(URL, 请求本身可知的字节数或 None)
+        self._aborted: List[tuple] = []
+
+    def route_pattern(self) -> Union[str, re.Pattern]:
+        """
+        注册路由用的 URL 匹配：所有规则 URL 合并成的一个正则
+
+        存在只按资源类型匹配的规则时无法按 URL 收窄，返回 **/*（拦截全部请求）。
+        """
+        if any(not rule.urls for rule in self.rules):
+            return "**/*"
+        sources = dict.fromkeys(route_regex(p) for rule in self.rules for p in rule.urls)
+        return re.compile("|".join(f"(?:{source})" for source in sources))
+
+    def install(self, target: Union[BrowserContext, Page]) -> "RequestRouter":
+        """在 BrowserContext（覆盖所有页面与 iframe）或单个 Page 上注册路由"""
+        if self.enabled:
+            target.route(self.route_pattern(), self._handle)
+        return self
+
+    def _handle(self, route: Route, request: Request) -> None:
+        url = request.url
+        if url.startswith("data:") or any(url_matches(url, p) for p in self.allow_urls):
+            route.fallback()
+            return
+        for rule in self.rules:
+            if rule.matches(request):
+                if rule.action == "stub":
+                    rule.fulfill(route, request)
+                else:
+                    route.abort("blockedbyclient")
+                self._record(request, stubbed=rule.action == "stub")
+                return
+        route.fallback()
+
+    def _record(self, request: Request, stubbed: bool) -> None:
+        with self._lock:
+            resource_type = request.resource_type
+            self._blocked[resource_type] = self._blocked.get(resource_type, 0) + 1
+            if stubbed:
+                # stub 的多为统计埋点，URL 带追踪参数，不记录也不重新访问
+                self._stubbed += 1
+            else:
+                self._aborted.append((request.url, self._exposed_size(request.headers)))
+
+    @staticmethod
+    def _exposed_size(headers: Dict[str, str]) -> Optional[int]:
+        """
+        请求头中已知的响应大小：只有有上界的 Range（bytes=a-b）
+
+        请求的 Content-Length 是上传请求体的大小，不是被拦截的响应大小，不计入。
+        """
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", headers.get("range", "").strip())
+        if match:
+            return int(match.group(2)) - int(match.group(1)) + 1
+        return None
+
+    @classmethod
+    def _cached_size(cls, url: str) -> Optional[int]:
+        with cls._cache_lock:
+            if url not in cls._size_cache:
+                return None
+            cls._size_cache.move_to_end(url)
+            return cls._size_cache[url]
+
+    @classmethod
+    def _cache_size(cls, url: str, size: int) -> None:
+        with cls._cache_lock:
+            cls._size_cache[url] = size
+            cls._size_cache.move_to_end(url)
+            while len(cls._size_cache) > SIZE_CACHE_MAX:
+                cls._size_cache.popitem(last=False)
+
+    def _head_size(self, context: BrowserContext, url: str) -> int:
+        """用浏览器上下文的 APIRequestContext 发 HEAD（共享 Cookie），读取 Content-Length"""
+        try:
+            response = context.request.head(url, timeout=3000, max_redirects=3)
+            size = int(response.headers.get("content-length", 0) or 0)
+            response.dispose()
+        except Exception as e:
+            logger.debug(f"获取资源大小失败: {url}, 错误: {e}")
+            size = 0
+        self._cache_size(url, size)
+        return size
+
+    def summary(self, context: Optional[BrowserContext] = None) -> dict:
+        """
+        统计本实例拦截的请求（需在上下文关闭前调用）
+
+        节省的字节数：请求本身可知的大小 + 缓存中已有的大小；
+        measure_bytes 开启且传入 context 时，对其余 abort 的资源逐个发 HEAD 补全（每个 URL 只查一次）。
+        仍不知道大小的 abort 请求不计入 bytes，数量记在 unmeasured；stub 的请求不统计字节数。
+
+        Args:
+            context: 浏览器上下文，用于 measure_bytes 时发 HEAD 请求
+
+        Returns:
+            {"blocked": 总数, "stubbed": stub 数, "bytes": 已知节省字节数,
+             "unmeasured": 大小未知的 abort 数, "by_type": {资源类型: 数量}}
+        """
+        with self._lock:
+            aborted = list(self._aborted)
+            by_type = dict(self._blocked)
+            stubbed = self._stubbed
+        saved = 0
+        unmeasured = 0
+        for url, exposed in aborted:
+            if exposed is not None:
+                saved += exposed
+                continue
+            size = self._cached_size(url)
+            if size is None and self.measure and context is not None and url.startswith(("http://", "https://")):
+                size = self._head_size(context, url)
+            if size:
+                saved += size
+            else:
+                unmeasured += 1
+        return {
+            "blocked": stubbed + len(aborted),
+            "stubbed": stubbed,
+            "bytes": saved,
+            "unmeasured": unmeasured,
+            "by_type": by_type,
+        }
@@ -0,0 +1,220 @@
+# ========================================
+# 请求跟踪模块
+# ========================================
+# 监听页面的 request / requestfinished / requestfailed 事件，统计进行中的请求，
+# 用于替代 networkidle：
+# - networkidle 要求整个页面 500ms 无任何请求，控制台的轮询和长连接会让它一直等到超时
+# - 这里只关心指定资源类型、匹配 include/exclude 规则的请求，
+#   并忽略挂起超过 Settings.REQUEST_LONG_POLL_MS 的长轮询请求
+# - 不跟踪的 URL = Settings.REQUEST_TRACKER_EXCLUDE + 环境配置 request_tracker.exclude（各系统的轮询接口）
+# 每个 Page 只挂一个跟踪器（RequestTracker.for_page），所有页面对象共用；
+# BasePage 在首次访问 request_tracker 时才创建，不使用请求等待的页面不挂监听
+# ========================================
+
+import fnmatch
+import functools
+import re
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Union
+
+from playwright.sync_api import Page, Request
+
+from config.env_config import get_env_config
+from config.settings import Settings
+from utils.logger import Logger
+
+UrlPattern = Union[str, re.Pattern]
+
+
+def url_matches(url: str, pattern: Optional[UrlPattern]) -> bool:
+    """
+    URL 匹配
+
+    Args:
+        url: 完整 URL
+        pattern: None 全部匹配；正则用 re.search；含 * 的字符串按 glob 匹配完整 URL；
+                 其它字符串按包含匹配
+
+    Returns:
+        是否匹配
+    """
+    if pattern is None:
+        return True
+    if isinstance(pattern, re.Pattern):
+        return pattern.search(url) is not None
+    if "*" in pattern:
+        return fnmatch.fnmatchcase(url, pattern)
+    return pattern in url
+
+
+def _split_patterns(value: str) -> List[str]:
+    """逗号分隔的配置项转为列表"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@functools.lru_cache(maxsize=1)
+def _env_exclude() -> tuple:
+    """环境配置中 request_tracker.exclude 的 URL 规则（进程内只读取一次）"""
+    return tuple(get_env_config().get("request_tracker.exclude", []) or [])
+
+
+class RequestTracker:
+    """
+    页面请求跟踪器
+
+    使用方法：
+        tracker = RequestTracker.for_page(page)
+
+        page.get_by_role("button", name="登录").click()
+        # 等待登录相关接口结束且 300ms 内没有新的请求
+        tracker.wait_for_settled(patterns=["/api/auth/", "/api/user/"], quiet_ms=300)
+
+        # 当前进行中的请求
+        tracker.pending()
+    """
+
+    # Page -> RequestTracker，页面关闭回收后自动移除
+    # 按 URL 记录最近活动时间的条数上限（超出时淘汰最久未活动的 URL，避免长用例中无限增长）
+    MAX_TRACKED_URLS = 256
+    _trackers: "weakref.WeakKeyDictionary[Page, RequestTracker]" = weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        page: Page,
+        include: Optional[Iterable[UrlPattern]] = None,
+        exclude: Optional[Iterable[UrlPattern]] = None,
+        resource_types: Optional[Iterable[str]] = None,
+    ):
+        """
+        初始化并开始监听页面请求
+
+        Args:
+            page: Playwright 的 Page 对象
+            include: 只跟踪匹配这些规则的请求，默认 Settings.REQUEST_TRACKER_INCLUDE（为空时不限）
+            exclude: 不跟踪匹配这些规则的请求（轮询、埋点等），
+                     默认 Settings.REQUEST_TRACKER_EXCLUDE + 环境配置 request_tracker.exclude
+            resource_types: 跟踪的资源类型，默认 Settings.REQUEST_TRACKER_TYPES（document,xhr,fetch）
+        """
+        self.page = page
+        self.logger = Logger("RequestTracker")
+        self.include = list(include) if include is not None else _split_patterns(Settings.REQUEST_TRACKER_INCLUDE)
+        if exclude is None:
+            exclude = _split_patterns(Settings.REQUEST_TRACKER_EXCLUDE) + list(_env_exclude())
+        self.exclude = list(exclude)
+        types = resource_types if resource_types is not None else _split_patterns(Settings.REQUEST_TRACKER_TYPES)
+        self.resource_types = {t.lower() for t in types}
+
+        # 进行中的请求 -> 开始时间（time.monotonic）
+        self._inflight: Dict[Request, float] = {}
+        # 最近一次跟踪的请求开始或结束的时间（按 URL 记录，用于按 patterns 计算静默时长）
+        self._last_activity: "OrderedDict[str, float]" = OrderedDict()
+        self._last_any_activity = time.monotonic()
+
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+
+    @classmethod
+    def for_page(cls, page: Page) -> "RequestTracker":
+        """获取页面的跟踪器，不存在时创建（同一个 Page 只挂一次监听）"""
+        tracker = cls._trackers.get(page)
+        if tracker is None:
+            tracker = cls._trackers[page] = cls(page)
+        return tracker
+
+    # ==================== 事件处理 ====================
+
+    def _is_tracked(self, request: Request) -> bool:
+        """请求是否需要跟踪（资源类型 + include/exclude 规则）"""
+        if self.resource_types and request.resource_type not in self.resource_types:
+            return False
+        url = request.url
+        if self.include and not any(url_matches(url, p) for p in self.include):
+            return False
+        return not any(url_matches(url, p) for p in self.exclude)
+
+    def _touch(self, url: str) -> None:
+        now = time.monotonic()
+        self._last_activity[url] = now
+        self._last_activity.move_to_end(url)
+        while len(self._last_activity) > self.MAX_TRACKED_URLS:
+            self._last_activity.popitem(last=False)
+        self._last_any_activity = now
+
+    def _on_request(self, request: Request) -> None:
+        if self._is_tracked(request):
+            self._inflight[request] = time.monotonic()
+            self._touch(request.url)
+
+    def _on_request_done(self, request: Request) -> None:
+        if self._inflight.pop(request, None) is not None:
+            self._touch(request.url)
+
+    # ==================== 查询与等待 ====================
+
+    def pending(self, patterns: Optional[Iterable[UrlPattern]] = None) -> List[str]:
+        """
+        进行中的请求 URL（不含挂起超过 Settings.REQUEST_LONG_POLL_MS 的长轮询）
+
+        Args:
+            patterns: 只看匹配这些规则的请求，None 表示全部跟踪的请求
+        """
+        patterns = list(patterns) if patterns is not None else None
+        long_poll = Settings.REQUEST_LONG_POLL_MS / 1000
+        now = time.monotonic()
+        return [
+            request.url
+            for request, started in list(self._inflight.items())
+            if (long_poll <= 0 or now - started < long_poll) and self._matches_any(request.url, patterns)
+        ]
+
+    def _matches_any(self, url: str, patterns: Optional[List[UrlPattern]]) -> bool:
+        return patterns is None or any(url_matches(url, p) for p in patterns)
+
+    def _last_activity_for(self, patterns: Optional[List[UrlPattern]]) -> float:
+        """匹配 patterns 的请求最近一次开始/结束的时间"""
+        if patterns is None:
+            return self._last_any_activity
+        times = [t for url, t in self._last_activity.items() if self._matches_any(url, patterns)]
+        return max(times, default=0.0)
+
+    def wait_for_settled(
+        self,
+        patterns: Optional[Iterable[UrlPattern]] = None,
+        quiet_ms: Optional[int] = None,
+        timeout: Optional[int] = None,
+        poll_ms: int = 50,
+    ) -> None:
+        """
+        等待匹配的请求全部结束，并且 quiet_ms 内没有新的匹配请求
+
+        Args:
+            patterns: 只等待匹配这些规则的请求（URL 片段、glob 或正则），None 表示全部跟踪的请求
+            quiet_ms: 静默时长（毫秒），默认 Settings.REQUEST_QUIET_MS
+            timeout: 超时时间（毫秒），默认 Settings.DEFAULT_TIMEOUT
+            poll_ms: 检查间隔（毫秒），期间由 Playwright 分发请求事件
+
+        Raises:
+            TimeoutError: 超时后仍有进行中的请求
+        """
+        patterns = list(patterns) if patterns is not None else None
+        quiet_s = (Settings.REQUEST_QUIET_MS if quiet_ms is None else quiet_ms) / 1000
+        timeout = timeout or Settings.DEFAULT_TIMEOUT
+        deadline = time.monotonic() + timeout / 1000
+        # 从开始等待时计算静默，操作刚触发、请求还没发出时也至少等待 quiet_ms
+        started = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            pending = self.pending(patterns)
+            last = max(self._last_activity_for(patterns), started)
+            if not pending and now - last >= quiet_s:
+                return
+            if now >= deadline:
+                error_msg = f"等待请求完成超时（{timeout}ms），进行中的请求: {pending[:5]}"
+                self.logger.error(error_msg)
+                raise TimeoutError(error_msg)
+            # page.wait_for_timeout 期间 Playwright 才会分发 request/requestfinished 事件
+            self.page.wait_for_timeout(poll_ms)
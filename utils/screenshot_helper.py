@@ -6,17 +6,267 @@
 # - 元素截图
 # - 全页面截图
 # - 截图对比（可选）
+# - 后台写盘（用例线程取截图字节并立即挂到当前 Allure 步骤，写文件在后台线程）
+# - 截图格式/质量/尺寸、内容去重与保留策略（Settings.SCREENSHOT_*）
 # ========================================
 
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
 from playwright.sync_api import Page, Locator
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import allure
 from config.settings import Settings
 from utils.logger import Logger
 
 
+class ScreenshotWriter:
+    """
+    截图后台写入器（进程内单例）
+
+    page.screenshot() 只返回字节，写文件交给后台线程，用例线程不再等待磁盘 IO。
+    Allure 附件在 submit() 时同步挂载（Allure 按线程记录当前用例和步骤，
+    在调用线程挂载才能出现在调用方的 allure.step 下）；需要转码或缩放时先在调用线程
+    按 SCREENSHOT_FORMAT / SCREENSHOT_MAX_DIMENSION 编码，附件与落盘文件用同一份字节。
+    不挂 Allure 附件的截图（attach_to_allure=False）转码也在后台完成。
+    conftest 在每个用例 teardown 报告阶段和会话结束时调用 flush() 等待写盘完成。
+
+    由 Settings 控制（均可在 .env 中设置）：
+    - SCREENSHOT_FORMAT / SCREENSHOT_QUALITY: png / jpeg / webp 及有损格式的质量（同时作用于 Allure 附件）
+    - SCREENSHOT_FULL_PAGE: take_screenshot 与失败截图是否截整页（False 只截可视区域）
+    - SCREENSHOT_MAX_DIMENSION: 长边超过该像素时等比缩小（0 不缩放；同时作用于 Allure 附件）
+    - SCREENSHOT_DEDUP: 内容相同的截图只存一份，后续引用已有文件
+    - SCREENSHOT_MAX_COUNT / SCREENSHOT_MAX_SIZE_MB: 本进程写入截图的数量/体积上限，超出时删除最早的文件
+      （Allure 附件在 submit 时已写入报告目录，删除本地文件不影响报告）
+    - SCREENSHOT_ASYNC: false 时在调用线程同步处理，便于排查
+
+    使用方法：
+        writer = ScreenshotWriter()
+        data = page.screenshot(**writer.screenshot_options())
+        writer.submit(data, Settings.SCREENSHOTS_DIR / "home.png", name="home")
+
+        # 等待写盘完成（conftest 中已处理）
+        writer.flush()
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    # 配置值 -> (文件扩展名, Allure 附件类型；allure 未内置 webp，按 MIME 字符串传入)
+    _FORMATS = {
+        "png": ("png", allure.attachment_type.PNG),
+        "jpeg": ("jpg", allure.attachment_type.JPG),
+        "jpg": ("jpg", allure.attachment_type.JPG),
+        "webp": ("webp", "image/webp"),
+    }
+
+    def __new__(cls):
+        """单例模式，确保每个进程只有一个写入线程"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.logger = Logger("ScreenshotWriter")
+        self._queue: "queue.Queue[Tuple[bytes, Path, str, Optional[bytes]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # 去重索引：截图字节 sha1 -> 已保存文件；保留队列：按写入顺序的 (文件, 字节数)
+        self._digests: Dict[str, Path] = {}
+        self._written: "OrderedDict[Path, int]" = OrderedDict()
+        self._written_bytes = 0
+        self._state_lock = threading.Lock()
+        self._initialized = True
+
+    @property
+    def format(self) -> str:
+        """当前截图格式（未知配置回退为 png）"""
+        fmt = Settings.SCREENSHOT_FORMAT.lower()
+        return fmt if fmt in self._FORMATS else "png"
+
+    @property
+    def extension(self) -> str:
+        """当前格式对应的文件扩展名"""
+        return self._FORMATS[self.format][0]
+
+    def _needs_transcode(self) -> bool:
+        """浏览器直接给出的字节能否原样落盘（Playwright 只支持 png/jpeg，且不支持缩放）"""
+        return self.format == "webp" or Settings.SCREENSHOT_MAX_DIMENSION > 0
+
+    def screenshot_options(self, full_page: Optional[bool] = None) -> dict:
+        """
+        生成 page.screenshot() 的参数
+
+        jpeg 且无需缩放时直接让浏览器编码 jpeg（比 png 编码快、体积小）；
+        其余情况取 png 原图，由后台线程转码。
+
+        Args:
+            full_page: 是否截整页，None 表示使用 Settings.SCREENSHOT_FULL_PAGE
+
+        Returns:
+            dict: 可直接展开传给 page.screenshot() 的参数
+        """
+        options = {"full_page": Settings.SCREENSHOT_FULL_PAGE if full_page is None else full_page}
+        if self.format in ("jpeg", "jpg") and not self._needs_transcode():
+            options.update(type="jpeg", quality=Settings.SCREENSHOT_QUALITY)
+        else:
+            options["type"] = "png"
+        return options
+
+    def submit(self, data: bytes, filepath: Path, name: str, attach_to_allure: bool = True) -> str:
+        """
+        提交一张截图
+
+        文件扩展名按 SCREENSHOT_FORMAT 修正；开启去重时内容相同的截图直接引用已保存的文件。
+        Allure 附件在当前线程立即挂载（需要转码/缩放时先在当前线程编码，与落盘文件一致），写盘在后台。
+
+        Args:
+            data: page.screenshot(**screenshot_options()) 返回的图片字节
+            filepath: 目标文件路径
+            name: 截图名称（Allure 附件名）
+            attach_to_allure: 是否附加到当前 Allure 步骤
+
+        Returns:
+            截图文件路径（异步模式下返回时文件可能尚未写完；去重命中时为已有文件）
+        """
+        filepath = Path(filepath).with_suffix(f".{self.extension}")
+        encoded = None
+        if attach_to_allure:
+            try:
+                encoded = self._encode(data)
+            except Exception as e:
+                self.logger.warning(f"截图转码失败，附加原图: {name}, 错误: {e}")
+            self._attach(encoded or data, name)
+        # 原始字节的 sha1（GB 级/秒，远快于编码写盘），命中时既不排队也不写盘
+        digest = hashlib.sha1(data).hexdigest() if Settings.SCREENSHOT_DEDUP else ""
+        if digest:
+            with self._state_lock:
+                existing = self._digests.get(digest)
+                if existing is not None:
+                    return str(existing)
+                self._digests[digest] = filepath
+
+        job = (data, filepath, digest, encoded)
+        if not Settings.SCREENSHOT_ASYNC:
+            self._process(job)
+            return str(filepath)
+        self._ensure_worker()
+        self._queue.put(job)
+        return str(filepath)
+
+    def _ensure_worker(self) -> None:
+        """首次提交时启动后台线程（守护线程，进程退出前由 flush 等待写完）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            except Exception as e:
+                self.logger.warning(f"后台写入截图失败: {job[1]}, 错误: {e}")
+                if job[2]:
+                    with self._state_lock:
+                        self._digests.pop(job[2], None)
+            finally:
+                self._queue.task_done()
+
+    def _encode(self, data: bytes) -> bytes:
+        """按配置缩放并转码（浏览器已直接给出目标格式时原样返回）"""
+        if not self._needs_transcode():
+            return data
+
+        import cv2
+        import numpy as np
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("无法解码截图字节")
+        max_side = Settings.SCREENSHOT_MAX_DIMENSION
+        height, width = image.shape[:2]
+        if max_side > 0 and max(height, width) > max_side:
+            ratio = max_side / max(height, width)
+            image = cv2.resize(image, (max(1, round(width * ratio)), max(1, round(height * ratio))),
+                               interpolation=cv2.INTER_AREA)
+
+        fmt = self.format
+        if fmt == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, Settings.SCREENSHOT_QUALITY]
+        elif fmt in ("jpeg", "jpg"):
+            params = [cv2.IMWRITE_JPEG_QUALITY, Settings.SCREENSHOT_QUALITY]
+        else:
+            params = []
+        ok, buffer = cv2.imencode(f".{self.extension}", image, params)
+        if not ok:
+            raise ValueError(f"截图编码失败: {fmt}")
+        return buffer.tobytes()
+
+    def _attach(self, data: bytes, name: str) -> None:
+        """把截图字节挂到当前 Allure 步骤（png / jpeg / webp，按文件头判断）"""
+        if data[:3] == b"\xff\xd8\xff":
+            extension, attachment_type = self._FORMATS["jpeg"]
+        elif data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            extension, attachment_type = self._FORMATS["webp"]
+        else:
+            extension, attachment_type = self._FORMATS["png"]
+        try:
+            allure.attach(data, name=name, attachment_type=attachment_type, extension=extension)
+        except Exception as e:
+            self.logger.warning(f"无法附加截图到 Allure: {name}, 错误: {e}")
+
+    def _process(self, job: Tuple[bytes, Path, str, Optional[bytes]]) -> None:
+        """转码（submit 已编码时直接使用）、写文件并执行保留策略"""
+        data, filepath, _digest, encoded = job
+        if encoded is None:
+            encoded = self._encode(data)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_bytes(encoded)
+        with self._state_lock:
+            self._written[filepath] = len(encoded)
+            self._written_bytes += len(encoded)
+            self._enforce_retention(keep=filepath)
+
+    def _enforce_retention(self, keep: Path) -> None:
+        """超出数量/体积上限时删除最早写入的截图（调用方持有 _state_lock；keep 为刚写入的文件）"""
+        max_count = Settings.SCREENSHOT_MAX_COUNT
+        max_bytes = Settings.SCREENSHOT_MAX_SIZE_MB * 1024 * 1024
+        while len(self._written) > 1 and (
+            (max_count > 0 and len(self._written) > max_count)
+            or (max_bytes > 0 and self._written_bytes > max_bytes)
+        ):
+            oldest = next((path for path in self._written if path != keep), None)
+            if oldest is None:
+                break
+            self._written_bytes -= self._written.pop(oldest)
+            for digest in [d for d, path in self._digests.items() if path == oldest]:
+                del self._digests[digest]
+            try:
+                oldest.unlink()
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """等待队列中的截图全部写完（Allure 附件已在 submit 时挂载）"""
+        if self._thread is not None:
+            self._queue.join()
+
+
+# 进程内共享的截图写入器
+screenshot_writer = ScreenshotWriter()
+
+
 class ScreenshotHelper:
     """
     截图助手类
@@ -79,7 +329,7 @@ class ScreenshotHelper:
             attach_to_allure: 是否附加到 Allure 报告
         
         Returns:
-            截图文件路径
+            截图文件路径（后台写入，Allure 附件在调用时挂载）
         
         使用方法：
             screenshot_helper.capture_full_page("order_page")
@@ -88,18 +338,9 @@ class ScreenshotHelper:
         
         # self.logger.info(f"截取完整页面: {name}")
         
-        self.page.screenshot(
-            path=str(filepath),
-            full_page=True  # 截取完整页面
-        )
-        
-        # self.logger.info(f"截图已保存: {filepath}")
-        
-        # 附加到 Allure 报告
-        if attach_to_allure:
-            self._attach_to_allure(filepath, name)
-        
-        return str(filepath)
+        # 只取字节，Allure 附件当场挂载，写文件交给后台写入器
+        data = self.page.screenshot(**screenshot_writer.screenshot_options(full_page=True))  # 截取完整页面
+        return screenshot_writer.submit(data, filepath, name, attach_to_allure=attach_to_allure)
     
     def capture_viewport(
         self, 
@@ -122,17 +363,8 @@ class ScreenshotHelper:
         
         # self.logger.info(f"截取可视区域: {name}")
         
-        self.page.screenshot(
-            path=str(filepath),
-            full_page=False  # 只截取可视区域
-        )
-        
-        # self.logger.info(f"截图已保存: {filepath}")
-        
-        if attach_to_allure:
-            self._attach_to_allure(filepath, name)
-        
-        return str(filepath)
+        data = self.page.screenshot(**screenshot_writer.screenshot_options(full_page=False))  # 只截取可视区域
+        return screenshot_writer.submit(data, filepath, name, attach_to_allure=attach_to_allure)
     
     def capture_element(
         self, 
@@ -149,7 +381,7 @@ class ScreenshotHelper:
             attach_to_allure: 是否附加到 Allure 报告
         
         Returns:
-            截图文件路径
+            截图文件路径（后台写入，Allure 附件在调用时挂载）
         
         使用方法：
             # 截取图表元素
@@ -165,15 +397,11 @@ class ScreenshotHelper:
         # 确保元素可见
         locator.wait_for(state="visible", timeout=10000)
         
-        # 截取元素
-        locator.screenshot(path=str(filepath))
-        
-        # self.logger.info(f"元素截图已保存: {filepath}")
-        
-        if attach_to_allure:
-            self._attach_to_allure(filepath, name)
-        
-        return str(filepath)
+        # 与整页截图一致：按 SCREENSHOT_FORMAT/QUALITY 取字节，缩放、去重、保留数量与写盘交给后台写入器
+        options = screenshot_writer.screenshot_options()
+        options.pop("full_page")  # 元素截图不支持 full_page
+        data = locator.screenshot(**options)  # 截取元素
+        return screenshot_writer.submit(data, filepath, name, attach_to_allure=attach_to_allure)
     
     def capture_on_failure(
         self, 
@@ -210,8 +438,11 @@ class ScreenshotHelper:
         
         self.logger.error(f"测试失败，正在截图: {name}")
         
-        # 截取完整页面
-        filepath = self.capture_full_page(name, attach_to_allure=True)
+        # 按 SCREENSHOT_FULL_PAGE 截取完整页面或可视区域
+        if Settings.SCREENSHOT_FULL_PAGE:
+            filepath = self.capture_full_page(name, attach_to_allure=True)
+        else:
+            filepath = self.capture_viewport(name, attach_to_allure=True)
         
         return filepath
     
@@ -255,24 +486,6 @@ class ScreenshotHelper:
         
         return filepath
     
-    def _attach_to_allure(self, filepath: Path, name: str) -> None:
-        """
-        将截图附加到 Allure 报告
-        
-        Args:
-            filepath: 截图文件路径
-            name: 截图名称
-        """
-        try:
-            allure.attach.file(
-                str(filepath),
-                name=name,
-                attachment_type=allure.attachment_type.PNG
-            )
-            self.logger.debug(f"截图已附加到 Allure 报告: {name}")
-        except Exception as e:
-            self.logger.warning(f"无法附加截图到 Allure: {e}")
-    
     def save_page_source(self, name: str = "page_source") -> str:
         """
         保存页面 HTML 源代码
@@ -0,0 +1,322 @@
+# ========================================
+# 视觉回归基准图管理
+# ========================================
+# 按「用例 nodeid + 步骤名」保存基准截图，并维护 phash/dhash 索引：
+# - 先用哈希汉明距离判断（O(1)，不解码基准图）：哈希完全一致直接通过，距离很大直接不通过
+# - 其余情况用分块 SSIM 确认（整体与最差分块都需达到阈值，局部改动不会被整图均值掩盖）
+# - 不通过时生成差异高亮图，通过 AllureHelper 附加到报告
+# ========================================
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+import cv2
+
+from config.settings import Settings
+from utils.allure_helper import AllureHelper
+from utils.image_recognition import ImageRecognition, ImageSource
+from utils.logger import Logger
+
+
+class VisualBaseline:
+    """
+    视觉回归基准图库
+
+    基准图保存在 Settings.VISUAL_BASELINE_DIR 下，目录结构为 <用例>/<步骤>.png，
+    同目录的 index.json 记录每张基准图的 phash、dhash 与尺寸。
+    首次运行（基准不存在）或 UPDATE_BASELINE=true 时以当前截图作为基准。
+
+    判定规则（phash 与 dhash 汉明距离取较大值 d；任一哈希无法计算时按不一致处理）：
+    - d <= hash_match_distance（默认 0，即哈希完全一致）：直接通过
+    - d >= hash_mismatch_distance：直接判定不通过
+    - 介于两者之间：按 SSIM_TILES 分块计算 SSIM，整体与最差分块都不低于 ssim_threshold 则通过
+      （页面上一小块被遮挡、少一行表格时哈希距离可能只有个位数，整图 SSIM 也仍在 0.99 以上）
+
+    使用方法：
+        baseline = VisualBaseline()
+        result = baseline.check(page.screenshot(full_page=True), step="首页")
+        assert result["passed"], result["message"]
+
+        # 或直接断言
+        baseline.assert_matches(page.screenshot(), step="登录弹窗")
+    """
+
+    INDEX_FILENAME = "index.json"
+
+    # 哈希距离阈值（0-64）与临界区间内的 SSIM 阈值
+    HASH_MATCH_DISTANCE = 0
+    HASH_MISMATCH_DISTANCE = 16
+    SSIM_THRESHOLD = 0.98
+    # SSIM 分块数（行数, 列数），取最差分块判定
+    SSIM_TILES = (8, 8)
+    # 哈希位数：无法计算哈希时的距离
+    HASH_BITS = 64
+
+    _lock = threading.Lock()
+
+    def __init__(self, baseline_dir: Optional[Path] = None, update: Optional[bool] = None):
+        """
+        初始化基准图库
+
+        Args:
+            baseline_dir: 基准图目录，不传则使用 Settings.VISUAL_BASELINE_DIR
+            update: 是否用当前截图覆盖基准，不传则使用 Settings.UPDATE_BASELINE
+        """
+        self.baseline_dir = Path(baseline_dir or Settings.VISUAL_BASELINE_DIR)
+        self.update = Settings.UPDATE_BASELINE if update is None else update
+        self.index_path = self.baseline_dir / self.INDEX_FILENAME
+        self.diff_dir = Settings.SCREENSHOTS_DIR / "visual_diff"
+        self.logger = Logger("VisualBaseline")
+        self.allure_helper = AllureHelper()
+
+    # ==================== 键与路径 ====================
+
+    @staticmethod
+    def _current_nodeid() -> str:
+        """当前用例的 nodeid（来自 pytest 设置的 PYTEST_CURRENT_TEST）"""
+        current = os.environ.get("PYTEST_CURRENT_TEST", "")
+        return current.rsplit(" ", 1)[0] if current else "unknown"
+
+    @staticmethod
+    def _safe_name(name: str) -> str:
+        """转换为可作为文件名的字符串（保留中文）"""
+        return re.sub(r'[\\/:*?"<>|\s\[\]]+', "_", name).strip("_.") or "_"
+
+    @classmethod
+    def make_key(cls, nodeid: str, step: str) -> str:
+        """索引键：<用例>/<步骤>"""
+        return f"{cls._safe_name(nodeid.replace('::', '__'))}/{cls._safe_name(step)}"
+
+    def baseline_path(self, key: str) -> Path:
+        """基准图路径"""
+        return self.baseline_dir / f"{key}.png"
+
+    # ==================== 索引读写 ====================
+
+    def _read_index(self) -> Dict[str, Any]:
+        """读取索引，不存在或损坏时返回空字典"""
+        try:
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取基准索引失败: {self.index_path}, 错误: {e}")
+        return {}
+
+    def _write_index_entry(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        更新单个索引项
+
+        重新读取后合并再写临时文件、os.replace 替换，多个 worker 并发写入不会产生损坏的索引。
+        """
+        with self._lock:
+            index = self._read_index()
+            index[key] = entry
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(f"{self.INDEX_FILENAME}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.index_path)
+
+    def _hashes(self, image: ImageSource) -> Dict[str, str]:
+        """计算 phash 与 dhash"""
+        return {
+            "phash": ImageRecognition.get_image_hash(image, "phash"),
+            "dhash": ImageRecognition.get_image_hash(image, "dhash"),
+        }
+
+    def _baseline_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        取基准图索引项
+
+        基准图被手工替换（mtime/大小与索引不一致）或索引缺失时重新计算哈希并写回。
+        """
+        path = self.baseline_path(key)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        entry = self._read_index().get(key)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            return entry
+        image = ImageRecognition.load_image(str(path))
+        if image is None:
+            return None
+        entry = {
+            **self._hashes(image),
+            "width": int(image.shape[1]),
+            "height": int(image.shape[0]),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._write_index_entry(key, entry)
+        return entry
+
+    def save_baseline(self, key: str, image: ImageSource) -> Path:
+        """
+        保存（或覆盖）基准图并更新索引
+
+        Args:
+            key: 索引键（make_key 的返回值）
+            image: 截图（路径、字节或数组）
+
+        Returns:
+            基准图路径
+        """
+        array = ImageRecognition.load_image(image)
+        if array is None:
+            raise ValueError(f"无法读取截图，基准未保存: {key}")
+        path = self.baseline_path(key)
+        if not ImageRecognition.save_image(array, str(path)):
+            raise IOError(f"写入基准图失败: {path}")
+        stat = path.stat()
+        self._write_index_entry(key, {
+            **self._hashes(array),
+            "width": int(array.shape[1]),
+            "height": int(array.shape[0]),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        self.logger.info(f"✓ 已保存基准图: {path}")
+        return path
+
+    # ==================== 比较 ====================
+
+    @classmethod
+    def _hamming(cls, hash1: Optional[str], hash2: Optional[str]) -> int:
+        """两个十六进制哈希的汉明距离；任一哈希为空（图片无法读取）时视为完全不一致"""
+        if not hash1 or not hash2:
+            return cls.HASH_BITS
+        return bin(int(hash1, 16) ^ int(hash2, 16)).count("1")
+
+    def check(
+        self,
+        actual: ImageSource,
+        step: str,
+        nodeid: Optional[str] = None,
+        hash_match_distance: Optional[int] = None,
+        hash_mismatch_distance: Optional[int] = None,
+        ssim_threshold: Optional[float] = None,
+        attach: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        将截图与基准图比较
+
+        Args:
+            actual: 当前截图（路径、字节或数组，推荐直接传 page.screenshot() 的返回值）
+            step: 步骤名，同一用例内唯一
+            nodeid: 用例 nodeid，不传则取当前正在执行的用例
+            hash_match_distance: 哈希距离不超过该值直接通过
+            hash_mismatch_distance: 哈希距离不低于该值直接判定不通过
+            ssim_threshold: 临界区间内 SSIM（整体与最差分块）的通过阈值
+            attach: 不通过时是否把当前截图与差异图附加到 Allure
+
+        Returns:
+            {
+                "passed": bool,
+                "status": "created" / "updated" / "hash_match" / "hash_mismatch" / "ssim_match" / "ssim_mismatch" / "size_mismatch",
+                "distance": 哈希距离（无基准时为 None）,
+                "ssim": 整体 SSIM（未计算时为 None）,
+                "ssim_min_tile": 最差分块的 SSIM（未计算时为 None）,
+                "baseline_path": 基准图路径,
+                "diff_path": 差异图路径（未生成时为 None）,
+                "message": 说明文字,
+            }
+        """
+        match_distance = self.HASH_MATCH_DISTANCE if hash_match_distance is None else hash_match_distance
+        mismatch_distance = self.HASH_MISMATCH_DISTANCE if hash_mismatch_distance is None else hash_mismatch_distance
+        threshold = self.SSIM_THRESHOLD if ssim_threshold is None else ssim_threshold
+
+        key = self.make_key(nodeid or self._current_nodeid(), step)
+        path = self.baseline_path(key)
+        result: Dict[str, Any] = {
+            "passed": True, "status": "", "distance": None, "ssim": None, "ssim_min_tile": None,
+            "baseline_path": str(path), "diff_path": None, "message": "",
+        }
+
+        # 截图只解码一次，后续哈希、SSIM、差异图共用
+        array = ImageRecognition.load_image(actual)
+        if array is None:
+            raise ValueError(f"无法读取截图: {step}")
+
+        entry = None if self.update else self._baseline_entry(key)
+        if entry is None:
+            existed = path.exists()
+            self.save_baseline(key, array)
+            result["status"] = "updated" if existed else "created"
+            result["message"] = f"{'已更新' if existed else '已创建'}基准图: {path}"
+            self.logger.info(f"✓ {result['message']}")
+            return result
+
+        hashes = self._hashes(array)
+        distance = max(self._hamming(hashes["phash"], entry.get("phash")),
+                       self._hamming(hashes["dhash"], entry.get("dhash")))
+        result["distance"] = distance
+        size_matches = (int(array.shape[1]), int(array.shape[0])) == (entry["width"], entry["height"])
+
+        if not size_matches:
+            result.update(passed=False, status="size_mismatch")
+            result["message"] = (f"截图尺寸 {array.shape[1]}x{array.shape[0]} 与基准 "
+                                 f"{entry['width']}x{entry['height']} 不一致")
+        elif distance <= match_distance:
+            result["status"] = "hash_match"
+        elif distance >= mismatch_distance:
+            result.update(passed=False, status="hash_mismatch")
+            result["message"] = f"哈希距离 {distance} >= {mismatch_distance}"
+        else:
+            detail = ImageRecognition.compare_images_detailed(str(path), array, method="ssim", tiles=self.SSIM_TILES)
+            similarity = detail["score"]
+            worst_tile = float(detail["tiles"].min()) if detail["tiles"] is not None else similarity
+            result.update(ssim=similarity, ssim_min_tile=worst_tile)
+            if min(similarity, worst_tile) >= threshold:
+                result["status"] = "ssim_match"
+            else:
+                result.update(passed=False, status="ssim_mismatch")
+                result["message"] = (f"哈希距离 {distance}，SSIM {similarity:.4f}，"
+                                     f"最差分块 {worst_tile:.4f} < {threshold}")
+
+        if result["passed"]:
+            result["message"] = f"与基准一致（{result['status']}，哈希距离 {distance}）"
+            self.logger.info(f"✓ 视觉检查通过 [{step}]: {result['message']}")
+            return result
+
+        self.logger.error(f"✗ 视觉检查不通过 [{step}]: {result['message']}")
+        result["diff_path"] = self._make_diff(key, path, array)
+        if attach:
+            self._attach(step, array, result["diff_path"])
+        return result
+
+    def assert_matches(self, actual: ImageSource, step: str, nodeid: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """
+        断言截图与基准一致，不一致时抛出 AssertionError
+
+        参数同 check。
+        """
+        result = self.check(actual, step, nodeid=nodeid, **kwargs)
+        assert result["passed"], f"视觉回归不通过 [{step}]: {result['message']}"
+        return result
+
+    def _make_diff(self, key: str, baseline_path: Path, actual) -> Optional[str]:
+        """生成差异高亮图，返回路径"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        diff_path = self.diff_dir / f"{key.replace('/', '__')}_{timestamp}.png"
+        if ImageRecognition.highlight_difference(str(baseline_path), actual, str(diff_path)):
+            return str(diff_path)
+        return None
+
+    def _attach(self, step: str, actual, diff_path: Optional[str]) -> None:
+        """把当前截图与差异图附加到 Allure 报告"""
+        try:
+            ok, encoded = cv2.imencode(".png", actual)
+            if ok:
+                self.allure_helper.attach_image_bytes(f"视觉回归-{step}-当前截图", encoded.tobytes())
+            if diff_path:
+                self.allure_helper.attach_image(f"视觉回归-{step}-差异", diff_path)
+        except Exception as e:
+            self.logger.warning(f"无法附加视觉回归结果到 Allure: {e}")